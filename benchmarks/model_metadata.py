@@ -0,0 +1,112 @@
+"""
+Per-call cost of the model introspection helpers, before and after the metadata precomputation.
+
+    python -m benchmarks.model_metadata [--number 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+from collections import OrderedDict
+
+from sqlalchemy import Column
+from sqlalchemy import ForeignKey
+from sqlalchemy import inspect
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import relationship
+from sqlalchemy.orm import RelationshipProperty
+
+from sqlalchemy_wrapper.manager import Manager
+from sqlalchemy_wrapper.utils import get_model_attrs
+from sqlalchemy_wrapper.utils import get_primary_key
+
+Base = declarative_base(cls=Manager)
+
+
+class Parent(Base):
+    __tablename__ = "bench_metadata_parent"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+
+    children = relationship("Child", back_populates="parent")
+
+
+class Child(Base):
+    __tablename__ = "bench_metadata_child"
+    id = Column(Integer, primary_key=True)
+    label = Column(String)
+    description = Column(String)
+    score = Column(Integer)
+    parent_id = Column(ForeignKey(Parent.id))
+
+    parent = relationship("Parent", back_populates="children")
+
+
+def legacy_get_model_attrs(model):
+    current_all_fields = set(inspect(model).attrs)
+    many_to_many_rels = set(
+        filter(
+            lambda rel: getattr(rel, "secondary", None) is not None,
+            current_all_fields,
+        ),
+    )
+    fk_attrs = set(
+        filter(
+            lambda rel: getattr(rel, "secondary", None) is None
+            and isinstance(rel, RelationshipProperty)
+            or getattr(rel, "foreign_keys", None),
+            current_all_fields,
+        ),
+    )
+    simple_attrs = current_all_fields.difference(fk_attrs).difference(many_to_many_rels)
+    return OrderedDict(
+        {
+            "simple_attrs": list(simple_attrs),
+            "fk_attrs": list(fk_attrs),
+            "many_to_many_rel": list(many_to_many_rels),
+        },
+    )
+
+
+def legacy_get_primary_key(model_class):
+    mapper_attrs = dict(inspect(model_class).attrs)
+    for column_attr_name, column_object in mapper_attrs.items():
+        if not hasattr(column_object, "target"):
+            mapper_attrs.update({column_attr_name: column_object.columns[0]})
+
+    return {
+        attr_name: column
+        for attr_name, column in mapper_attrs.items()
+        if getattr(column, "primary_key", False)
+    }
+
+
+def legacy_get_simple_column(model):
+    return [col.key for col in inspect(model).mapper.column_attrs]
+
+
+CASES = [
+    ("get_model_attrs", legacy_get_model_attrs, get_model_attrs),
+    ("get_primary_key", legacy_get_primary_key, get_primary_key),
+    ("get_simple_column", legacy_get_simple_column, lambda m: m.get_simple_column()),
+]
+
+
+def run(number: int):
+    configure_mappers()
+    print(f"{'helper':<20}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for name, before, after in CASES:
+        before_us = timeit.timeit(lambda: before(Child), number=number) / number * 1e6
+        after_us = timeit.timeit(lambda: after(Child), number=number) / number * 1e6
+        print(
+            f"{name:<20}{before_us:>14.2f}{after_us:>14.2f}{before_us / after_us:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    run(parser.parse_args().number)
@@ -0,0 +1,61 @@
+"""
+Per-row cost of serializing loaded objects: as_json one by one against the bulk ModelSerializer.
+
+    python -m benchmarks.serializer [--rows 50000] [--number 5]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import timeit
+
+from sqlalchemy import Column
+from sqlalchemy import Integer
+from sqlalchemy import String
+
+from sqlalchemy_wrapper.db.settings import DBSettings
+from sqlalchemy_wrapper.db.settings import DriverEnum
+from sqlalchemy_wrapper.manager import Manager
+
+Base = Manager.as_base_model(
+    DBSettings(driver=DriverEnum.SQLITE, is_test=True, log_queries=False)
+)
+
+
+class Document(Base):
+    __tablename__ = "bench_serializer_document"
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    body = Column(String)
+    score = Column(Integer)
+
+
+def setup(rows: int):
+    Base.metadata.create_all(Manager.db_context.engine)
+    Document.create_multiple(
+        [{"title": f"doc {i}", "body": "x" * 200, "score": i} for i in range(rows)]
+    )
+    return Document.all()
+
+
+def run(rows: int, number: int):
+    documents = setup(rows)
+    serializer = Document.serializer()
+    cases = [
+        ("as_json", lambda: [document.as_json() for document in documents]),
+        ("dump_many", lambda: serializer.dump_many(documents)),
+        ("write_jsonl", lambda: serializer.write_jsonl(documents, io.BytesIO())),
+    ]
+
+    print(f"{'method':<22}{'per row (us)':>14}")
+    for name, case in cases:
+        seconds = timeit.timeit(case, number=number) / number
+        print(f"{name:<22}{seconds / rows * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.number)
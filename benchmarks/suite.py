@@ -0,0 +1,354 @@
+"""
+Micro-benchmarks of the filter builder, the lookups, the bulk insert and the serialization,
+on a synthetic SQLite schema. Save a run as JSON, then compare it to another one to flag regressions.
+
+    python -m benchmarks.suite run [--width 8] [--depth 3] [--rows 5000] [--repeat 5] [--output run.json]
+    python -m benchmarks.suite compare baseline.json run.json [--threshold 0.15]
+
+The schema mirrors tests/models.py: a chain of models Level0 -> Level1 -> ... -> Level<depth>, each one
+holding a foreign key and a relationship to the next, like User.file -> File.item -> Item.
+Every result is the best time of repeat rounds, in seconds per operation or per row: lower is better.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import io
+import json
+import platform
+import sys
+import timeit
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import sqlalchemy
+from sqlalchemy import Column
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.orm import relationship
+
+from sqlalchemy_wrapper.db.operators import And
+from sqlalchemy_wrapper.db.operators import Or
+from sqlalchemy_wrapper.db.query import BaseQueryBuilder
+from sqlalchemy_wrapper.db.query import FilterPlanCache
+from sqlalchemy_wrapper.db.settings import DBSettings
+from sqlalchemy_wrapper.db.settings import DriverEnum
+from sqlalchemy_wrapper.manager import Manager
+from sqlalchemy_wrapper.utils import get_model_from_rel
+from sqlalchemy_wrapper.utils import get_operator
+
+TREE_SIZES = (1, 4, 16, 64)
+
+
+def make_schema(width: int, depth: int) -> List:
+    """
+    :param width: number of plain columns of each model, alternately Integer and String
+    :param depth: number of relationships from Level0 to the last model
+    :return: the models, Level0 first
+    """
+    base = Manager.as_base_model(
+        DBSettings(driver=DriverEnum.SQLITE, is_test=True, log_queries=False)
+    )
+    models = []
+    for level in range(depth + 1):
+        attrs = {
+            "__tablename__": f"bench_suite_level{level}",
+            "id": Column(Integer, primary_key=True),
+        }
+        for i in range(width):
+            attrs[f"col_{i}"] = Column(String if i % 2 else Integer)
+
+        if level < depth:
+            attrs["parent_id"] = Column(
+                ForeignKey(f"bench_suite_level{level + 1}.id"), index=True
+            )
+            attrs["parent"] = relationship(
+                f"BenchLevel{level + 1}", back_populates="children"
+            )
+        if level > 0:
+            attrs["children"] = relationship(
+                f"BenchLevel{level - 1}", back_populates="parent"
+            )
+
+        models.append(type(f"BenchLevel{level}", (base,), attrs))
+
+    configure_mappers()
+    base.metadata.create_all(Manager.db_context.engine)
+    return models
+
+
+def row_values(width: int, index: int) -> Dict:
+    return {f"col_{i}": f"value {index}" if i % 2 else index for i in range(width)}
+
+
+def populate(models: List, width: int, rows: int) -> None:
+    """
+    Fill every model above Level0, which is filled by the bulk insert case
+    """
+    for level, model in reversed(list(enumerate(models))):
+        if level == 0:
+            break
+
+        data = [row_values(width, i) for i in range(rows)]
+        if level < len(models) - 1:
+            for i, values in enumerate(data):
+                values["parent_id"] = i + 1
+
+        model.create_multiple(data)
+
+
+def trim(model, rows: int) -> None:
+    """
+    Delete the rows of model after the first rows ones
+    """
+    session = Manager.db_context.session
+    session.query(model).filter(model.id > rows).delete(synchronize_session=False)
+    session.commit()
+    session.expunge_all()
+
+
+def best(case: Callable, number: int, repeat: int) -> float:
+    """
+    :return: best seconds per call of case, over repeat rounds of number calls
+    """
+    return min(timeit.repeat(case, number=number, repeat=repeat)) / number
+
+
+def path_to(depth: int) -> str:
+    return "__".join(["parent"] * depth + ["col_0"])
+
+
+def filter_build_cases(models: List, width: int) -> List[Tuple[str, Callable, int]]:
+    level0 = models[0]
+    cases = []
+
+    for depth in range(len(models)):
+        path = path_to(depth)
+
+        def cold(path=path):
+            BaseQueryBuilder(
+                level0, And(**{path: 1}), None, plan_cache=None
+            ).make_filter()
+
+        plan_cache = FilterPlanCache()
+
+        def warm(path=path, plan_cache=plan_cache):
+            BaseQueryBuilder(
+                level0, And(**{path: 1}), None, plan_cache=plan_cache
+            ).make_filter()
+
+        cases.append((f"filter_build/depth={depth}", cold, 200))
+        cases.append((f"filter_build/depth={depth}/plan_cached", warm, 200))
+
+    for size in TREE_SIZES:
+
+        def tree(size=size):
+            clause = Or(
+                *[And(**{f"col_{i % width}__ne": i}) for i in range(size - 1)],
+                col_0=size,
+            )
+            BaseQueryBuilder(level0, clause, None, plan_cache=None).make_filter()
+
+        cases.append((f"filter_build/tree={size}", tree, 50))
+
+    return cases
+
+
+def lookup_cases(models: List) -> List[Tuple[str, Callable, int]]:
+    level0 = models[0]
+    path = path_to(len(models) - 1).split("__")
+    session = Manager.db_context.session
+
+    def dive():
+        builder = BaseQueryBuilder(level0, And(id=1), None, plan_cache=None)
+        builder.dive(level0, list(path))
+
+    def get_by_pks():
+        session.expunge_all()
+        level0.get_by_pks(1)
+
+    return [
+        ("lookup/get_operator", lambda: get_operator("startswith"), 10000),
+        (
+            "lookup/get_model_from_rel",
+            lambda: get_model_from_rel(f"{level0.__tablename__}.id"),
+            10000,
+        ),
+        (f"lookup/dive(depth={len(models) - 1})", dive, 500),
+        ("lookup/get_by_pks", get_by_pks, 500),
+    ]
+
+
+def row_cases(models: List, width: int, rows: int) -> List[Tuple[str, Callable]]:
+    """
+    Cases over rows rows, measured per row
+    """
+    level0 = models[0]
+    session = Manager.db_context.session
+    data = [row_values(width, i) for i in range(rows)]
+    if len(models) > 1:
+        for i, values in enumerate(data):
+            values["parent_id"] = i + 1
+
+    def create_multiple():
+        level0.create_multiple(data)
+
+    objects = []
+
+    def load():
+        session.expunge_all()
+        objects[:] = level0.filter(id__le=rows)
+
+    serializer = level0.serializer()
+    return [
+        ("bulk_insert/create_multiple", create_multiple),
+        ("read/filter", load),
+        ("serialize/as_json", lambda: [obj.as_json() for obj in objects]),
+        ("serialize/dump_many", lambda: serializer.dump_many(objects)),
+        (
+            "serialize/write_jsonl",
+            lambda: serializer.write_jsonl(objects, io.BytesIO()),
+        ),
+        (
+            "serialize/export_csv",
+            lambda: level0.export(io.BytesIO(), id__le=rows),
+        ),
+    ]
+
+
+def run(width: int, depth: int, rows: int, repeat: int) -> Dict:
+    """
+    :return: the run as a JSON-able dict: {"meta": {...}, "results": {case: seconds per unit}}
+    """
+    models = make_schema(width, depth)
+    populate(models, width, rows)
+    results = {}
+
+    for name, case, number in filter_build_cases(models, width):
+        results[name] = {"seconds": best(case, number, repeat), "unit": "op"}
+
+    # create_multiple comes first: the other row cases read the rows it inserted
+    for name, case in row_cases(models, width, rows):
+        results[name] = {"seconds": best(case, 1, repeat) / rows, "unit": "row"}
+
+    # each round of create_multiple inserted rows more rows: back to rows rows for the lookups
+    trim(models[0], rows)
+    for name, case, number in lookup_cases(models):
+        results[name] = {"seconds": best(case, number, repeat), "unit": "op"}
+
+    return {
+        "meta": {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "width": width,
+            "depth": depth,
+            "rows": rows,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def print_run(data: Dict) -> None:
+    print(f"{'case':<40}{'time (us)':>12}{'per second':>14}")
+    for name, result in data["results"].items():
+        seconds = result["seconds"]
+        print(
+            f"{name:<40}{seconds * 1e6:>12.2f}"
+            f"{1 / seconds if seconds else 0:>12.0f}/{result['unit']}"
+        )
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """
+    Print the change of each case between two runs
+    :param threshold: relative slowdown above which a case is a regression, 0.15 for 15%
+    :return: names of the regressed cases
+    """
+    regressions = []
+    print(f"{'case':<40}{'baseline (us)':>14}{'current (us)':>14}{'change':>10}")
+
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<40}{'-':>14}{result['seconds'] * 1e6:>14.2f}{'new':>10}")
+            continue
+
+        change = result["seconds"] / before["seconds"] - 1 if before["seconds"] else 0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+
+        print(
+            f"{name:<40}{before['seconds'] * 1e6:>14.2f}{result['seconds'] * 1e6:>14.2f}"
+            f"{change:>+10.1%}{flag}"
+        )
+
+    for name in baseline["results"].keys() - current["results"].keys():
+        print(
+            f"{name:<40}{baseline['results'][name]['seconds'] * 1e6:>14.2f}{'-':>14}{'removed':>10}"
+        )
+
+    for key in ("width", "depth", "rows", "python", "sqlalchemy"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(
+                f"warning: {key} differs, {baseline['meta'].get(key)} against {current['meta'].get(key)}"
+            )
+
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--width", type=int, default=8)
+    run_parser.add_argument("--depth", type=int, default=3)
+    run_parser.add_argument("--rows", type=int, default=5000)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--output", help="save the results to this JSON file")
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare two saved runs, exit with 1 on regression"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        if args.width < 1:
+            parser.error("--width must be at least 1")
+
+        data = run(args.width, args.depth, args.rows, args.repeat)
+        print_run(data)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(data, file, indent=2)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+"""
+Filtering through a one-to-many relationship on skewed data: JOIN against correlated EXISTS.
+A few authors own most of the comments, so the JOIN repeats them once per matching comment.
+
+    python -m benchmarks.to_many [--authors 2000] [--comments 50000] [--number 5]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+
+from sqlalchemy import Column
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy.orm import relationship
+
+from sqlalchemy_wrapper.db.operators import And
+from sqlalchemy_wrapper.db.operators import Or
+from sqlalchemy_wrapper.db.settings import DBSettings
+from sqlalchemy_wrapper.db.settings import DriverEnum
+from sqlalchemy_wrapper.db.settings import ToManyStrategyEnum
+from sqlalchemy_wrapper.manager import Manager
+
+Base = Manager.as_base_model(
+    DBSettings(driver=DriverEnum.SQLITE, is_test=True, log_queries=False)
+)
+
+
+class Author(Base):
+    __tablename__ = "bench_to_many_author"
+    id = Column(Integer, primary_key=True)
+    username = Column(String)
+
+    comments = relationship("Comment", back_populates="author")
+
+
+class Comment(Base):
+    __tablename__ = "bench_to_many_comment"
+    id = Column(Integer, primary_key=True)
+    body = Column(String)
+    author_id = Column(ForeignKey(Author.id), index=True)
+
+    author = relationship("Author", back_populates="comments")
+
+
+def setup(authors: int, comments: int):
+    Base.metadata.create_all(Manager.db_context.engine)
+    Author.create_multiple([{"username": f"author {i}"} for i in range(authors)])
+
+    # Zipf like: author n writes about 1/n of the comments
+    weights = [1 / (i + 1) for i in range(authors)]
+    random.seed(0)
+    owners = random.choices(range(1, authors + 1), weights=weights, k=comments)
+    Comment.create_multiple(
+        [
+            {"body": "spam" if i % 10 == 0 else "ham", "author_id": owner}
+            for i, owner in enumerate(owners)
+        ]
+    )
+
+
+def run_filter(strategy: ToManyStrategyEnum, clause):
+    def case():
+        data = Author.filter(clause, to_many_strategy=strategy)
+        Manager.db_context.session.expunge_all()
+        return data
+
+    return case
+
+
+CLAUSES = [
+    ("comments__body", And(comments__body="spam")),
+    ("Or(comments__body, username)", Or(comments__body="spam", username="author 1")),
+]
+
+
+def run(authors: int, comments: int, number: int):
+    setup(authors, comments)
+    print(f"{'filter':<28}{'join (ms)':>12}{'exists (ms)':>14}")
+    for name, clause in CLAUSES:
+        timings = [
+            timeit.timeit(run_filter(strategy, clause), number=number) / number * 1e3
+            for strategy in (ToManyStrategyEnum.JOIN, ToManyStrategyEnum.EXISTS)
+        ]
+        print(f"{name:<28}{timings[0]:>12.2f}{timings[1]:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--authors", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+    run(args.authors, args.comments, args.number)
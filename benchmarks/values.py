@@ -0,0 +1,85 @@
+"""
+Per-row cost of reading a few columns: filter() + as_json() against values() / values_list().
+
+    python -m benchmarks.values [--rows 5000] [--number 5]
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from sqlalchemy import Column
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import String
+
+from sqlalchemy_wrapper.db.settings import DBSettings
+from sqlalchemy_wrapper.db.settings import DriverEnum
+from sqlalchemy_wrapper.manager import Manager
+
+Base = Manager.as_base_model(
+    DBSettings(driver=DriverEnum.SQLITE, is_test=True, log_queries=False)
+)
+
+
+class Folder(Base):
+    __tablename__ = "bench_values_folder"
+    id = Column(Integer, primary_key=True)
+    path = Column(String)
+
+
+class Document(Base):
+    __tablename__ = "bench_values_document"
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    body = Column(String)
+    score = Column(Integer)
+    folder = Column(ForeignKey(Folder.id))
+
+
+def setup(rows: int):
+    Base.metadata.create_all(Manager.db_context.engine)
+    Folder.create_multiple([{"path": f"/folder/{i}"} for i in range(10)])
+    Document.create_multiple(
+        [
+            {"title": f"doc {i}", "body": "x" * 200, "score": i, "folder": i % 10 + 1}
+            for i in range(rows)
+        ]
+    )
+
+
+def filter_as_json():
+    session = Manager.db_context.session
+    data = [
+        {"id": doc.id, "title": doc.title, "score": doc.score}
+        for doc in Document.filter(score__ge=0)
+    ]
+    session.expunge_all()
+    return data
+
+
+CASES = [
+    ("filter + attributes", filter_as_json),
+    ("values", lambda: Document.values("id", "title", "score", score__ge=0)),
+    ("values_list", lambda: Document.values_list("id", "title", "score", score__ge=0)),
+    (
+        "values_list (join)",
+        lambda: Document.values_list("id", "folder__path", score__ge=0),
+    ),
+]
+
+
+def run(rows: int, number: int):
+    setup(rows)
+    print(f"{'method':<22}{'per row (us)':>14}")
+    for name, case in CASES:
+        seconds = timeit.timeit(case, number=number) / number
+        print(f"{name:<22}{seconds / rows * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.number)
@@ -1,19 +1,196 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Dict
+from typing import Set
+from typing import Tuple
 from typing import Union
 
 import sqlalchemy
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_scoped_session
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm import Session
+from sqlalchemy.orm import sessionmaker
 
+from sqlalchemy_wrapper.db.cache import MemoryCacheBackend
+from sqlalchemy_wrapper.db.cache import result_cache
+from sqlalchemy_wrapper.db.pool import pool_stats
+from sqlalchemy_wrapper.db.pool import PoolStats
+from sqlalchemy_wrapper.db.pool import TimedQueuePool
+from sqlalchemy_wrapper.db.query import filter_plan_cache
+from sqlalchemy_wrapper.db.routing import ReplicaRouter
+from sqlalchemy_wrapper.db.routing import RoutingSession
 from sqlalchemy_wrapper.db.settings import DBSettings
 from sqlalchemy_wrapper.db.settings import DriverEnum
+from sqlalchemy_wrapper.db.settings import SessionScopeEnum
+from sqlalchemy_wrapper.logger import configure_query_logging
 from sqlalchemy_wrapper.logger import logger as logging
 
 
+ASYNC_DRIVERS = {
+    DriverEnum.SQLITE: "sqlite+aiosqlite",
+    DriverEnum.MYSQL: "mysql+aiomysql",
+    DriverEnum.POSTGRES: "postgresql+asyncpg",
+}
+
+
+def database_url(settings: Dict, async_driver: bool = False) -> str:
+    """
+    Build the database url from the settings
+    :param settings: DBSettings as dict
+    :param async_driver: use the asyncio DBAPI of the driver (see ASYNC_DRIVERS)
+    :return: str
+    """
+    driver = DriverEnum(settings.get("driver"))
+    scheme = ASYNC_DRIVERS[driver] if async_driver else driver.value
+
+    if driver in [DriverEnum.MYSQL, DriverEnum.POSTGRES]:
+        return (
+            f"{scheme}://{settings.get('username')}:{settings.get('password')}@{settings.get('host')}"
+            f":{settings.get('port')}/{settings.get('name')}"
+        )
+
+    return f"{scheme}://{'/:memory:' if settings.get('is_test') else settings.get('sqlite_db_path')}"
+
+
+def engine_options(settings: Dict) -> Dict:
+    """
+    Keyword arguments of create_engine / create_async_engine given by the settings.
+    The pool options are only given to server databases, SQLite keeps the pool chosen by its dialect.
+    :param settings: DBSettings as dict
+    :return: Dict
+    """
+    options = {"echo": settings.get("echo"), "future": True}
+    if settings.get("driver") in [DriverEnum.MYSQL, DriverEnum.POSTGRES]:
+        options.update(
+            pool_size=settings.get("pool_size"),
+            max_overflow=settings.get("max_overflow"),
+            pool_recycle=settings.get("pool_recycle"),
+            pool_timeout=settings.get("pool_timeout"),
+            pool_pre_ping=settings.get("pool_pre_ping"),
+        )
+
+    return options
+
+
+_session_scope: ContextVar = ContextVar("sqlalchemy_wrapper_session_scope")
+
+
+class _Scope:
+    """
+    Scope of a contextvars context, owned by the thread which created it
+    """
+
+    def __init__(self):
+        self.thread = threading.get_ident()
+
+
+class ContextScope:
+    """
+    Scope function of scoped_session for the "context" session scope: one session per asyncio task,
+    and outside of a task one per contextvars context. A context copied to another thread (run_in_executor)
+    gets its own scope there; a context copied in the same thread shares the one of its parent.
+    The session of a scope is closed and forgotten when its task is done or its context garbage collected,
+    so that the registry doesn't grow with the scopes which never called remove().
+    """
+
+    def __init__(self):
+        self.registry: Union[Dict, None] = None
+        # tasks whose session is released when they are done
+        self._tasks: Set[Tuple] = set()
+
+    def bind(self, registry: Dict) -> None:
+        """
+        :param registry: dict of the sessions by scope, see ScopedRegistry.registry
+        """
+        self.registry = registry
+
+    def __call__(self) -> Tuple:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:  # no running event loop
+            task = None
+
+        if task is not None:
+            key = ("task", id(task))
+            if key not in self._tasks:
+                self._tasks.add(key)
+                task.add_done_callback(lambda _: self.release(key))
+            return key
+
+        scope = _session_scope.get(None)
+        if scope is None or scope.thread != threading.get_ident():
+            scope = _Scope()
+            _session_scope.set(scope)
+            weakref.finalize(scope, self.release, ("context", id(scope)))
+
+        return "context", id(scope)
+
+    def release(self, key: Tuple) -> None:
+        self._tasks.discard(key)
+        session = self.registry.pop(key, None) if self.registry is not None else None
+        if session is not None:
+            session.close()
+
+
+class AsyncTaskScope:
+    """
+    Scope function of async_scoped_session: one session per asyncio task. The session of a task is forgotten
+    when the task is done and closed in the background, so that the registry doesn't keep the sessions, their
+    identity map and connection, of the tasks which never called release_session().
+    """
+
+    def __init__(self):
+        self.registry: Union[Dict, None] = None
+        # tasks whose session is released when they are done
+        self._tasks: Set[asyncio.Task] = set()
+        # close() of the released sessions, referenced until it's done
+        self._closing: Set[asyncio.Task] = set()
+
+    def bind(self, registry: Dict) -> None:
+        """
+        :param registry: dict of the sessions by task, see ScopedRegistry.registry
+        """
+        self.registry = registry
+
+    def __call__(self) -> asyncio.Task:
+        task = asyncio.current_task()
+        if task not in self._tasks:
+            self._tasks.add(task)
+            task.add_done_callback(self.release)
+        return task
+
+    def release(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        session = self.registry.pop(task, None) if self.registry is not None else None
+        if session is not None:
+            closing = task.get_loop().create_task(session.close())
+            self._closing.add(closing)
+            closing.add_done_callback(self._closing.discard)
+
+
+def session_scopefunc(scope: SessionScopeEnum) -> Union[ContextScope, None]:
+    """
+    Scope function of scoped_session for the session_scope setting
+    :param scope:
+    :return: None for the thread scope, scoped_session then uses a thread local
+    """
+    if SessionScopeEnum(scope) == SessionScopeEnum.CONTEXT:
+        return ContextScope()
+
+    return None
+
+
 class DBContextMeta(type):
     _instance = None
 
@@ -25,36 +202,53 @@ class DBContextMeta(type):
 
 
 class DBContext(metaclass=DBContextMeta):
+    """
+    Engine and sessions of the application.
+    The engine is shared, each thread (or asyncio task / contextvars context, see the session_scope setting) gets its own
+    session, so the Manager methods can be called concurrently. Use request_scope() to release it.
+    """
+
     def __init__(self, settings: DBSettings):
-        self._engine = None
-        self._session: Union[Session, None] = None
+        # created on first use, see the engine property
+        self._engine: Union[Engine, None] = None
+        self._engine_lock = threading.Lock()
+        self._replica_router: Union[ReplicaRouter, None] = None
         self._settings = settings.dict()
-        self.setup_engine()
+        scopefunc = session_scopefunc(self._settings["session_scope"])
+        self._sessions = scoped_session(
+            sessionmaker(class_=RoutingSession), scopefunc=scopefunc
+        )
+        if scopefunc is not None:
+            scopefunc.bind(self._sessions.registry.registry)
+        filter_plan_cache.resize(self._settings.get("filter_plan_cache_size"))
+        result_cache.set_backend(
+            MemoryCacheBackend(
+                self._settings.get("result_cache_size"),
+                self._settings.get("result_cache_ttl"),
+            )
+        )
+        configure_query_logging(
+            enabled=self._settings.get("log_queries"),
+            sample_rate=self._settings.get("query_log_sample_rate"),
+            max_length=self._settings.get("query_log_max_length"),
+        )
 
     def setup_engine(self) -> Union[Engine, None]:
+        """
+        Create the engine of the context and check that the database can be reached.
+        The engine, so its connection pool, is shared by every session of the context.
+        :return: Engine
+        """
         if not self._settings:
             raise ValueError("Cannot setup engine without settings")
 
-        driver = self._settings.get("driver")
-
         try:
             logging.info("Setting up new engine")
-            if driver in [DriverEnum.MYSQL, DriverEnum.POSTGRES]:
-
-                engine_ = create_engine(
-                    f"{driver}://{self._settings.get('username')}:{self._settings.get('password')}@{self._settings.get('host')}"
-                    f":{self._settings.get('port')}/{self._settings.get('name')}",
-                    echo=True,
-                    future=True,
-                    pool_size=self._settings.get("DB_MAX_POOL", 10),
-                    pool_pre_ping=True,
-                )
-            else:
-                engine_ = create_engine(
-                    f"{driver}://{'/:memory:' if self._settings.get('is_test') else self._settings.get('sqlite_db_path')}"
-                )
+            engine_ = self._create_engine(database_url(self._settings))
+
+            with engine_.connect():
+                pass
 
-            engine_.connect()
             self._engine = engine_
             return engine_
         except sqlalchemy.exc.OperationalError as e:
@@ -64,35 +258,212 @@ class DBContext(metaclass=DBContextMeta):
             logging.error(str(e))
             raise e
 
+    def _create_engine(self, url: str) -> Engine:
+        options = engine_options(self._settings)
+        if self._settings.get("driver") in [DriverEnum.MYSQL, DriverEnum.POSTGRES]:
+            options["poolclass"] = TimedQueuePool
+
+        return create_engine(url, **options)
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    self.setup_engine()
+
+        return self._engine
+
+    @property
+    def replica_router(self) -> Union[ReplicaRouter, None]:
+        """
+        Router over the engines of the replicas setting, None without replicas
+        """
+        if self._replica_router is None and self._settings.get("replicas"):
+            with self._engine_lock:
+                if self._replica_router is None:
+                    self._replica_router = ReplicaRouter(
+                        [
+                            self._create_engine(url)
+                            for url in self._settings.get("replicas")
+                        ],
+                        self._settings.get("replica_strategy"),
+                    )
+
+        return self._replica_router
+
     @property
     def settings(self) -> Dict:
         return self._settings
 
+    def pool_stats(self) -> PoolStats:
+        """
+        Usage of the connection pool of the engine: checked out connections, overflow, wait time...
+        :return: PoolStats
+        """
+        return pool_stats(self.engine.pool)
+
+    @contextmanager
+    def replica_reads(self, force_primary: bool = False):
+        """
+        Let the SELECT run in the block go to a replica, used by the read methods of Manager.
+        Nothing changes without replicas, inside use_primary() or when force_primary is True.
+        """
+        session = self.session
+        previous = getattr(session, "replica_reads", False)
+        session.replica_reads = not force_primary
+        try:
+            yield session
+        finally:
+            session.replica_reads = previous
+
+    @contextmanager
+    def use_primary(self):
+        """
+        Send every statement of the block to the primary, to read your own writes
+        Ex:
+            with Manager.db_context.use_primary():
+                User.get_by_pks(user_id)
+        """
+        session = self.session
+        previous = getattr(session, "force_primary", False)
+        session.force_primary = True
+        try:
+            yield session
+        finally:
+            session.force_primary = previous
+
     @property
-    def session(self):
-        if not self._session or not self._session.is_active:
-            session_ = Session(bind=self.setup_engine())
-            self._session = session_
+    def session(self) -> Session:
+        """
+        Session of the current scope
+        """
+        if self._sessions.registry.has():
+            session_ = self._sessions()
+            if session_.is_active:
+                return session_
+
+            self._sessions.remove()
 
-        return self._session
+        return self._sessions(bind=self.engine, router=self.replica_router)
 
     @session.setter
-    def session(self, session):
-        self._session = session
+    def session(self, session: Union[Session, None]):
+        if session is None:
+            self._sessions.remove()
+        else:
+            self._sessions.registry.set(session)
+
+    def release_session(self) -> None:
+        """
+        Close the session of the current scope and forget it
+        """
+        logging.debug("Freeing remote database resources")
+        self._sessions.remove()
+
+    @contextmanager
+    def request_scope(self):
+        """
+        Run a unit of work (a web request, a job...) in the session of the current scope:
+        commit at the end, rollback on error, then release the session.
+        Ex:
+            with Manager.db_context.request_scope():
+                User.create(first_name="...")
+        """
+        with self:
+            yield self.session
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type:
+                logging.error(
+                    "An error occurred while doing database operation. Rolling back...",
+                )
+                logging.exception(exc_tb)
+                self.session.rollback()
+
+            else:
+                self.session.commit()
+        finally:
+            self.release_session()
+
+
+class AsyncDBContext(metaclass=DBContextMeta):
+    """
+    asyncio counterpart of DBContext, built on create_async_engine and AsyncSession.
+    The DBAPI used for each driver is given by ASYNC_DRIVERS (aiosqlite, aiomysql, asyncpg), it has to be installed.
+    Objects are not expired on commit: reading an expired attribute would need IO outside an await.
+    Each asyncio task gets its own session, released when the task is done, or earlier by `async with context:`
+    or release_session().
+    """
+
+    def __init__(self, settings: DBSettings):
+        self._settings = settings.dict()
+        self._engine = create_async_engine(
+            database_url(self._settings, async_driver=True),
+            **engine_options(self._settings),
+        )
+        scopefunc = AsyncTaskScope()
+        self._sessions = async_scoped_session(
+            sessionmaker(
+                bind=self._engine, class_=AsyncSession, expire_on_commit=False
+            ),
+            scopefunc=scopefunc,
+        )
+        scopefunc.bind(self._sessions.registry.registry)
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine
+
+    @property
+    def settings(self) -> Dict:
+        return self._settings
+
+    def pool_stats(self) -> PoolStats:
+        return pool_stats(self._engine.sync_engine.pool)
+
+    @property
+    def session(self) -> AsyncSession:
+        """
+        Session of the current task
+        """
+        session_ = self._sessions()
+        if not session_.is_active:
+            self._sessions.registry.clear()
+            session_ = self._sessions()
+
+        return session_
+
+    @session.setter
+    def session(self, session: Union[AsyncSession, None]):
+        if session is None:
+            self._sessions.registry.clear()
+        else:
+            self._sessions.registry.set(session)
+
+    async def release_session(self) -> None:
+        """
+        Close the session of the current task and forget it
+        """
+        logging.debug("Freeing remote database resources")
+        await self._sessions.remove()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
         if exc_type:
             logging.error(
                 "An error occurred while doing database operation. Rolling back...",
             )
             logging.exception(exc_tb)
-            self.session.rollback()
+            await self.session.rollback()
 
         else:
-            self.session.commit()
+            await self.session.commit()
 
-        logging.debug("Freeing remote database resources")
-        self.session.close()
+        await self.release_session()
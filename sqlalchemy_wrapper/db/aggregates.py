@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Tuple
+from typing import Union
+
+from sqlalchemy import distinct
+from sqlalchemy import func
+from sqlalchemy.orm import RelationshipProperty
+
+from sqlalchemy_wrapper.db.query import BaseQueryBuilder
+from sqlalchemy_wrapper.registry import model_registry
+
+
+class Aggregate:
+    """
+    SQL aggregate function over a path, such as Sum("file__size"), computed by the database.
+    The relationships of the path are LEFT OUTER JOINed, so that rows without related row still count.
+    A path ending on a relationship (Count("addresses")) counts the distinct related rows.
+    The join of a to-many path repeats the rows, see QuerySet.aggregate for mixing such aggregates with others.
+    """
+
+    function: str = ""
+
+    def __init__(self, path: Union[str, None] = None, distinct: bool = False):
+        self.path = path
+        self.distinct = distinct
+
+    def expression(self, query_builder: BaseQueryBuilder):
+        """
+        Resolve the path on the query of query_builder, adding the joins it needs
+        :param query_builder:
+        :return: SQLAlchemy Expression
+        """
+        if self.path is None:
+            raise ValueError(f"{type(self).__name__} needs a path")
+
+        column = query_builder.resolve_column(self.path, isouter=True)
+        is_distinct = self.distinct
+        relationship = getattr(column, "property", None)
+        if isinstance(relationship, RelationshipProperty):
+            primary_key = model_registry.metadata(
+                relationship.mapper.class_
+            ).primary_key_names[0]
+            column = query_builder.resolve_column(
+                f"{self.path}__{primary_key}", isouter=True
+            )
+            is_distinct = True
+
+        return getattr(func, self.function)(distinct(column) if is_distinct else column)
+
+    def to_many_path(
+        self, query_builder: BaseQueryBuilder
+    ) -> Union[Tuple[str, ...], None]:
+        """
+        Relationship path up to the first to-many relationship of the path, whose join repeats the rows
+        :param query_builder:
+        :return: Tuple, None when the path only goes through to-one relationships
+        """
+        if self.path is None:
+            return None
+
+        fields = tuple(self.path.split("__"))
+        depth = query_builder.to_many_depth(fields)
+        return None if depth is None else fields[: depth + 1]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path!r})"
+
+
+class Count(Aggregate):
+    """
+    Count("addresses") or Count("file__path", distinct=True).
+    Count() counts the rows of the query: the rows added by a join to a to-many relationship included.
+    """
+
+    function = "count"
+
+    def expression(self, query_builder: BaseQueryBuilder):
+        if self.path is None:
+            return func.count()
+
+        return super().expression(query_builder)
+
+
+class Sum(Aggregate):
+    function = "sum"
+
+
+class Avg(Aggregate):
+    function = "avg"
+
+
+class Min(Aggregate):
+    function = "min"
+
+
+class Max(Aggregate):
+    function = "max"
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import Tuple
+from typing import Union
+
+from sqlalchemy import event
+from sqlalchemy import inspect
+from sqlalchemy import Table
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.util import find_tables
+
+from sqlalchemy_wrapper.db.operators import And
+from sqlalchemy_wrapper.db.operators import Or
+from sqlalchemy_wrapper.registry import model_registry
+
+# session.info key of the tables written by the current transaction
+_WRITTEN_TABLES = "result_cache_written_tables"
+
+
+class CacheBackend:
+    """
+    Storage of ResultCache: values by key, and a version per table. ResultCache invalidates the entries
+    reading a table by bumping its version, which changes their keys. Values are plain python data (picklable).
+    A backend shared by several processes has to share the versions as well (ex: INCR of a key per table),
+    otherwise the writes of a process don't invalidate the entries read by the others.
+    """
+
+    def get(self, key: str) -> Union[Any, None]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def get_versions(self, tables: Iterable[str]) -> Dict[str, int]:
+        """
+        :return: version of each table, 0 for a table never written
+        """
+        raise NotImplementedError
+
+    def bump_versions(self, tables: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU backend, whose entries also expire ttl seconds after being set
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Union[float, None] = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Union[Any, None]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(self.maxsize, 0):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_versions(self, tables: Iterable[str]) -> Dict[str, int]:
+        with self._lock:
+            return {name: self._versions.get(name, 0) for name in tables}
+
+    def bump_versions(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for name in tables:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "evictions": self.evictions,
+        }
+
+
+def clause_key(operand: Union[And, Or]) -> Tuple:
+    """
+    Description of an And/Or tree with its values, the same for the same filter
+    :param operand:
+    :return: Tuple
+    """
+    return (
+        operand.sqlalchemy_operator.__name__,
+        tuple(sorted(operand.simple_expression.items(), key=lambda item: item[0])),
+        tuple(clause_key(wrapped) for wrapped in operand.wrapped_expression),
+    )
+
+
+def statement_tables(statement) -> FrozenSet[str]:
+    """
+    Names of the tables a statement reads, joined and aliased tables included
+    :param statement:
+    :return: FrozenSet
+    """
+    names = set()
+    for table in find_tables(statement, include_aliases=True, include_joins=True):
+        table = getattr(table, "element", table)
+        if isinstance(table, Table):
+            names.add(table.name)
+
+    return frozenset(names)
+
+
+class ResultCache:
+    """
+    Cache of Manager.filter results, for the models which set `__cache_results__ = True`.
+    Entries are keyed by the model, the And/Or tree with its values, and the version of every table
+    read by the query. A write on a table (flush, commit, bulk statement) bumps its version,
+    so that the entries reading it are never used again: the backend forgets them by LRU / TTL.
+    The objects are cached as column values, and merged in the session of the caller on a hit.
+    """
+
+    def __init__(self, backend: Union[CacheBackend, None] = None):
+        self.backend = backend or MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+    def make_key(self, model, filter_key: Tuple, tables: Iterable[str]):
+        """
+        :param model:
+        :param filter_key: clause_key of the filter
+        :param tables: tables read by the query, see statement_tables
+        :return: str, None when the values of the filter can't be part of a key
+        """
+        try:
+            hash(filter_key)
+        except TypeError:
+            return None
+
+        versions = sorted(self.backend.get_versions(tables).items())
+
+        digest = hashlib.sha1(f"{filter_key!r}{versions!r}".encode()).hexdigest()
+        return f"{model.__module__}.{model.__qualname__}:{digest}"
+
+    def get(self, key: str, session: Session) -> Union[List, None]:
+        rows = self.backend.get(key)
+        with self._lock:
+            if rows is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return [_restore(session, model, values) for model, values in rows]
+
+    def set(self, key: str, objects: List) -> None:
+        self.backend.set(key, [_snapshot(obj) for obj in objects])
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        tables = list(tables)
+        if not tables:
+            return
+
+        self.backend.bump_versions(tables)
+        with self._lock:
+            self.invalidations += len(tables)
+
+    def clear(self) -> None:
+        """
+        Drop every entry and reset the counters
+        :return:
+        """
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            **self.backend.stats(),
+        }
+
+
+def _snapshot(obj) -> Tuple:
+    mapper = inspect(obj).mapper
+    return (
+        mapper.class_,
+        {
+            key: getattr(obj, key)
+            for key in model_registry.metadata(mapper.class_).column_keys
+        },
+    )
+
+
+def _restore(session: Session, model, values: Dict):
+    """
+    Rebuild an object from its column values, without emitting SQL
+    """
+    obj = inspect(model).class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(obj, key, value)
+
+    make_transient_to_detached(obj)
+    return session.merge(obj, load=False)
+
+
+result_cache = ResultCache()
+
+
+def _mapper_tables(mapper) -> List[str]:
+    names = [table.name for table in mapper.tables if isinstance(table, Table)]
+    names.extend(
+        relationship.secondary.name
+        for relationship in mapper.relationships
+        if isinstance(relationship.secondary, Table)
+    )
+    return names
+
+
+def _record_writes(session: Session, tables: Iterable[str]) -> None:
+    tables = set(tables)
+    if tables:
+        # invalidate now for the session itself, and again at commit for the others
+        result_cache.invalidate(tables)
+        session.info.setdefault(_WRITTEN_TABLES, set()).update(tables)
+
+
+def has_uncommitted_writes(session: Session) -> bool:
+    """
+    Whether the transaction of session wrote tables: its reads may see rows the other sessions can't,
+    they must neither use nor fill the cache until it ends
+    """
+    return bool(session.info.get(_WRITTEN_TABLES))
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed(session: Session, flush_context) -> None:
+    _record_writes(
+        session,
+        (
+            name
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+            for name in _mapper_tables(inspect(obj).mapper)
+        ),
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_executed(orm_execute_state) -> None:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        table = getattr(orm_execute_state.statement, "table", None)
+        table = getattr(table, "element", table)
+        if isinstance(table, Table):
+            _record_writes(orm_execute_state.session, [table.name])
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    result_cache.invalidate(session.info.pop(_WRITTEN_TABLES, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _invalidate_rolled_back(session: Session) -> None:
+    result_cache.invalidate(session.info.pop(_WRITTEN_TABLES, ()))
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
 from sqlalchemy import and_
+from sqlalchemy import not_
 from sqlalchemy import or_
 
 
+def not_and(*clauses):
+    """
+    Negation of the and of clauses: NOT (c1 AND c2 ...)
+    """
+    return not_(and_(*clauses))
+
+
 class BaseFilter:
     """
     Parent class for any wrapper clause.
@@ -31,6 +39,20 @@ class BaseFilter:
     def __or__(self, other):
         return self._set_operation(Or, other)
 
+    def __invert__(self):
+        return Not(self)
+
+    def copy(self):
+        """
+        Copy of the tree, with the same values. The query builder rewrites the clauses it builds,
+        a clause which is built several times has to be copied first.
+        :return:
+        """
+        return type(self)(
+            *[expression.copy() for expression in self.wrapped_expression],
+            **self.simple_expression,
+        )
+
     def __eq__(self, other):
         return (
             isinstance(self, BooleanOperator)
@@ -84,3 +106,12 @@ class Or(BooleanOperator):
 
     def __init__(self, *tmp, **fields):
         super().__init__(or_, *tmp, **fields)
+
+
+class Not(BooleanOperator):
+    """
+    BooleanOperator that represent the negation of the and operation
+    """
+
+    def __init__(self, *tmp, **fields):
+        super().__init__(not_and, *tmp, **fields)
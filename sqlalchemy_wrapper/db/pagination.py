@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import datetime
+import decimal
+import hashlib
+import json
+import uuid
+from typing import Any
+from typing import List
+from typing import NamedTuple
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from sqlalchemy import and_
+from sqlalchemy import case
+from sqlalchemy import false
+from sqlalchemy import or_
+
+_TYPE_TAG = "__type__"
+
+
+class Page(NamedTuple):
+    """
+    A page of a keyset pagination.
+    next_cursor is None on the last page, otherwise it's passed as `after` to get the next one
+    """
+
+    items: List
+    next_cursor: Union[str, None]
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime.datetime):
+        return {_TYPE_TAG: "datetime", "value": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {_TYPE_TAG: "date", "value": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {_TYPE_TAG: "time", "value": value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {_TYPE_TAG: "decimal", "value": str(value)}
+    if isinstance(value, uuid.UUID):
+        return {_TYPE_TAG: "uuid", "value": str(value)}
+    if isinstance(value, bytes):
+        return {_TYPE_TAG: "bytes", "value": base64.b64encode(value).decode()}
+    return value
+
+
+_DECODERS = {
+    "datetime": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat,
+    "time": datetime.time.fromisoformat,
+    "decimal": decimal.Decimal,
+    "uuid": uuid.UUID,
+    "bytes": base64.b64decode,
+}
+
+
+def _decode_value(value: Any):
+    if isinstance(value, dict) and _TYPE_TAG in value:
+        return _DECODERS[value[_TYPE_TAG]](value["value"])
+    return value
+
+
+def ordering_signature(ordering: Sequence[Tuple[str, bool]]) -> str:
+    """
+    Short fingerprint of an ordering, so that a cursor is not used with another ordering
+    :param ordering: (path, descending) pairs
+    :return: str
+    """
+    return hashlib.sha1(json.dumps(list(ordering)).encode()).hexdigest()[:8]
+
+
+def encode_cursor(values: Sequence, ordering: Sequence[Tuple[str, bool]]) -> str:
+    """
+    Make an opaque cursor from the ordering values of the last row of a page
+    :param values:
+    :param ordering: (path, descending) pairs the values come from
+    :return: str
+    """
+    payload = json.dumps(
+        {"o": ordering_signature(ordering), "v": [_encode_value(v) for v in values]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: Sequence[Tuple[str, bool]]) -> List:
+    """
+    Get back the values of a cursor made by encode_cursor
+    :param cursor:
+    :param ordering: (path, descending) pairs of the current pagination
+    :return: List
+    """
+    try:
+        payload = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        )
+        signature, values = payload["o"], payload["v"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+
+    if signature != ordering_signature(ordering) or len(values) != len(ordering):
+        raise ValueError("The cursor was made for another ordering")
+
+    return [_decode_value(value) for value in values]
+
+
+def keyset_order_by(columns: Sequence[Tuple[Any, bool, bool]]) -> List:
+    """
+    ORDER BY of a keyset pagination. NULL is sorted after every value (before them in descending order)
+    on every database, as keyset_predicate expects. Only the nullable columns pay for it: the others are ordered
+    as is, so that an index on them can still serve the ordering
+    :param columns: (column, descending, nullable) triples
+    :return: List of SQLAlchemy Expression
+    """
+    order_by = []
+    for column, descending, nullable in columns:
+        if nullable:
+            is_null = case((column.is_(None), 1), else_=0)
+            order_by.append(is_null.desc() if descending else is_null.asc())
+        order_by.append(column.desc() if descending else column.asc())
+
+    return order_by
+
+
+def _after(column, descending: bool, nullable: bool, value):
+    """
+    Rows whose column is strictly after value, in the order of keyset_order_by
+    """
+    if value is None:
+        # NULL is the last value ascending, and only the values come after it descending
+        return column.is_not(None) if descending else false()
+    if descending:
+        return column < value
+    if nullable:
+        return or_(column > value, column.is_(None))
+
+    return column > value
+
+
+def keyset_predicate(columns: Sequence[Tuple[Any, bool, bool]], values: Sequence):
+    """
+    Build the seek condition selecting rows strictly after values, given the ordering:
+    (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...  ("<" for descending columns)
+    NULL values of the nullable columns are compared as in keyset_order_by
+    :param columns: (column, descending, nullable) triples
+    :param values:
+    :return: SQLAlchemy Expression
+    """
+    clauses = []
+    for index, ((column, descending, nullable), value) in enumerate(
+        zip(columns, values)
+    ):
+        equalities = [
+            previous_column.is_(None)
+            if previous_value is None
+            else previous_column == previous_value
+            for (previous_column, _, __), previous_value in zip(
+                columns[:index], values[:index]
+            )
+        ]
+        clauses.append(and_(*equalities, _after(column, descending, nullable, value)))
+
+    return or_(*clauses)
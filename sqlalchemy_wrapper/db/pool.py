@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict
+from typing import NamedTuple
+from typing import Union
+
+from sqlalchemy.pool import Pool
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats(NamedTuple):
+    """
+    Snapshot of a connection pool. The wait fields are only measured by TimedQueuePool
+    """
+
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    # connections which had to wait for a free connection, and how long in total (seconds)
+    waits: int
+    total_wait_time: float
+    max_wait_time: float
+    timeouts: int
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool measuring how long a checkout waits for a connection.
+    A waiting checkout means that the pool (pool_size + max_overflow) is exhausted.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._waits = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+
+    def _do_get(self):
+        exhausted = (
+            self._max_overflow > -1
+            and self.checkedin() == 0
+            and self.overflow() >= self._max_overflow
+        )
+        if not exhausted:
+            return super()._do_get()
+
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            self._record_wait(time.perf_counter() - start)
+
+    def _record_wait(self, wait_time: float) -> None:
+        with self._stats_lock:
+            self._waits += 1
+            self._total_wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def wait_stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "waits": self._waits,
+                "total_wait_time": self._total_wait_time,
+                "max_wait_time": self._max_wait_time,
+                "timeouts": self._timeouts,
+            }
+
+
+def pool_stats(pool: Union[Pool, None]) -> PoolStats:
+    """
+    Get the current usage of pool. The counters a pool class does not have are 0
+    :param pool:
+    :return: PoolStats
+    """
+    wait_stats = (
+        pool.wait_stats()
+        if isinstance(pool, TimedQueuePool)
+        else {"waits": 0, "total_wait_time": 0.0, "max_wait_time": 0.0, "timeouts": 0}
+    )
+
+    def counter(name: str) -> int:
+        method = getattr(pool, name, None)
+        return method() if callable(method) else 0
+
+    return PoolStats(
+        size=counter("size"),
+        checked_in=counter("checkedin"),
+        checked_out=counter("checkedout"),
+        # QueuePool.overflow() starts at -pool_size, only the connections above pool_size are overflow
+        overflow=max(counter("overflow"), 0),
+        **wait_stats,
+    )
@@ -1,33 +1,208 @@
 from __future__ import annotations
 
 import copy
+import threading
+from collections import OrderedDict
+from logging import INFO
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import NamedTuple
+from typing import Sequence
 from typing import Tuple
 from typing import Union
 
+from sqlalchemy import exists
 from sqlalchemy import inspect
+from sqlalchemy.exc import CompileError
 from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.orm import aliased
+from sqlalchemy.orm import contains_eager
 from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm import Query
 from sqlalchemy.orm import RelationshipProperty
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import AliasedClass
+from sqlalchemy.sql.elements import BindParameter
 
 from sqlalchemy_wrapper.db.operators import And
 from sqlalchemy_wrapper.db.operators import Or
+from sqlalchemy_wrapper.db.settings import ToManyStrategyEnum
+from sqlalchemy_wrapper.logger import LazyStr
 from sqlalchemy_wrapper.logger import logger as logging
+from sqlalchemy_wrapper.logger import should_log_query
+from sqlalchemy_wrapper.registry import model_registry
 from sqlalchemy_wrapper.utils import _lookup_model_foreign_key
 from sqlalchemy_wrapper.utils import _lookup_model_manytomany_rel
 from sqlalchemy_wrapper.utils import get_model_attrs
-from sqlalchemy_wrapper.utils import get_model_from_rel
+from sqlalchemy_wrapper.utils import get_model_from_table
 from sqlalchemy_wrapper.utils import get_operator
 
 
+def render_sql(query: Query) -> str:
+    """
+    Render the SQL of a query with its values inlined, for logging purposes only
+    :param query:
+    :return: str
+    """
+    try:
+        return str(query.statement.compile(compile_kwargs={"literal_binds": True}))
+    except (NotImplementedError, CompileError):
+        # Some types can't be rendered as literal, show the bound parameters instead
+        return str(query.statement)
+
+
+class FilterPlan(NamedTuple):
+    """
+    Everything resolved for a filter shape except the values:
+    joins: ordered (target, onclause, isouter) applied to the base query
+    clause: (sqlalchemy_operator, leaves, children) tree mirroring the And/Or clause,
+    where each leaf is (filter_path, column or SemiJoin, operator)
+    joined_paths: (relationship path, joined entity) pairs, see BaseQueryBuilder.resolve_column
+    visited / discovered: the entities joined and met by dive, so that a later join of the same
+    entity (resolve_column) is skipped or aliased as on the first build
+    """
+
+    joins: Tuple
+    clause: Tuple
+    joined_paths: Tuple = ()
+    visited: Tuple = ()
+    discovered: Tuple = ()
+
+
+class SemiJoin:
+    """
+    Filter on the to-many part of a path, compiled to correlated EXISTS subqueries
+    (relationship any / has) instead of joins: the filtered rows are never multiplied.
+    entity: where the path starts, the base model or the entity joined for its to-one prefix
+    hops: relationships and foreign keys followed from entity, the first one being to-many
+    """
+
+    def __init__(self, entity, hops: Tuple[str, ...], field: str):
+        self.entity = entity
+        self.hops = hops
+        self.field = field
+
+    def bind(self, operator: str, value):
+        """
+        :param operator: attribute name on ColumnOperators as returned by get_operator
+        :param value:
+        :return: SQLAlchemy Expression
+        """
+        return self._predicate(self.entity, self.hops, operator, value)
+
+    def _predicate(self, entity, hops: Tuple[str, ...], operator: str, value):
+        if not hops:
+            return BaseQueryBuilder.bind_expression(
+                getattr(entity, self.field), operator, value
+            )
+
+        attribute = getattr(entity, hops[0])
+        relationship = getattr(attribute, "property", None)
+        if isinstance(relationship, RelationshipProperty):
+            criterion = self._predicate(
+                relationship.mapper.class_, hops[1:], operator, value
+            )
+            if relationship.uselist:
+                return attribute.any(criterion)
+
+            return attribute.has(criterion)
+
+        target = _lookup_model_foreign_key(attribute)
+        if target is None:
+            raise InvalidRequestError(f"Unable to find {hops[0]} field in {entity}")
+
+        foreign_key = next(iter(attribute.foreign_keys))
+        criterion = self._predicate(target, hops[1:], operator, value)
+        return exists().where(foreign_key.column == attribute, criterion)
+
+
+class FilterPlanCache:
+    """
+    Bounded LRU cache of FilterPlan keyed by (model, shape of the And/Or tree).
+    The shape holds the filter paths (with their operator suffix) but never the values.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._plans: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Union[FilterPlan, None]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def set(self, key, plan: FilterPlan) -> None:
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            self._evict()
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Drop every plan and reset the counters
+        :return:
+        """
+        with self._lock:
+            self._plans.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._plans),
+            "maxsize": self.maxsize,
+        }
+
+    def _evict(self) -> None:
+        while len(self._plans) > max(self.maxsize, 0):
+            self._plans.popitem(last=False)
+            self.evictions += 1
+
+
+filter_plan_cache = FilterPlanCache()
+
+
+def clause_shape(operand: Union[And, Or]) -> Tuple:
+    """
+    Hashable description of an And/Or tree without its values
+    :param operand:
+    :return: Tuple
+    """
+    return (
+        operand.sqlalchemy_operator,
+        tuple(operand.simple_expression),
+        tuple(clause_shape(wrapped) for wrapped in operand.wrapped_expression),
+    )
+
+
 class BaseQueryBuilder:
     def __init__(
-        self, base_model: object, bool_clause: Union[And, Or], session: Session
+        self,
+        base_model: object,
+        bool_clause: Union[And, Or],
+        session: Union[Session, None],
+        plan_cache: Union[FilterPlanCache, None] = filter_plan_cache,
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
     ):
         if not bool_clause:
             raise ValueError("Resolving path cannot be None")
@@ -35,9 +210,17 @@ class BaseQueryBuilder:
         self.current = ""
         self.discovered: List = []
         self.visited: List = []
+        self.joins: List[Tuple] = []
+        self.joined_paths: Dict[Tuple[str, ...], Any] = {}
         self.base_model = base_model
-        self.base_query = session.query(base_model)
+        # Without session (asyncio), the query is only used to build the statement
+        self.base_query = (
+            session.query(base_model) if session is not None else Query(base_model)
+        )
         self.complex_filter_clause = bool_clause
+        self.plan_cache = plan_cache
+        # how the to-many relationships of the filter paths are filtered: correlated EXISTS or JOIN
+        self.to_many_strategy = ToManyStrategyEnum(to_many_strategy)
 
     # noinspection PyNoneFunctionAssignment
     def make_filter(self):
@@ -47,32 +230,55 @@ class BaseQueryBuilder:
         """
         expressions = self.build_final_filter_expression()
         query: Union[Query, None] = self.base_query.filter(expressions)
+        self.base_query = query
+
+        if should_log_query(INFO):
+            logging.info("Resulting query is: %s", LazyStr(lambda: render_sql(query)))
 
-        logging.info(
-            f"Resulting query is: {query.statement.compile(compile_kwargs={'literal_binds': True})}"
-        )
         return query
 
     @staticmethod
-    def build_expression(model, field, operator_name, value):
+    def build_expression(model, field, operator_name, value, semi_join=None):
         """
         Build the expression for the current field_path that will be used in the filter() of baseQuery
         :param operator_name:
         :param model:
         :param field:
         :param value:
+        :param semi_join: SemiJoin of the path, when its to-many part is filtered by EXISTS
         :return:
         """
+        if semi_join is not None:
+            return semi_join.bind(get_operator(operator_name), value)
+
         model = list(model)[-1] if isinstance(model, tuple) else model
         column = getattr(model, field)
 
         if not column:
             raise Exception("Invalid filter column")
 
-        operator = get_operator(operator_name)
+        return BaseQueryBuilder.bind_expression(
+            column, get_operator(operator_name), value
+        )
+
+    @staticmethod
+    def bind_expression(column, operator, value):
+        """
+        Apply an already resolved operator on a column with the searched value
+        :param column:
+        :param operator: attribute name on ColumnOperators as returned by get_operator
+        :param value:
+        :return:
+        """
+        if isinstance(column, SemiJoin):
+            return column.bind(operator, value)
 
+        # a list bound when the statement is executed, see db.template
+        expanding = isinstance(value, BindParameter) and value.expanding
         if operator in ["in_", "notin_", "not_in", "between"]:  # notin_ is deprecated
-            if not isinstance(value, (list, set, tuple)):
+            if not isinstance(value, (list, set, tuple)) and not (
+                expanding and operator != "between"
+            ):
                 raise ValueError(
                     f"Iterable object expected when using {operator} operator",
                 )
@@ -86,7 +292,8 @@ class BaseQueryBuilder:
             try:
                 filter_ = (
                     getattr(column, operator)(value)
-                    if operator
+                    if expanding
+                    or operator
                     not in [
                         "between",
                         "tuple",
@@ -133,6 +340,19 @@ class BaseQueryBuilder:
             if operator:
                 filter_request.pop(-1)  # remote from the filter literal string
 
+            relationship_path = tuple(filter_request[:-1])
+            to_many_depth = None
+            if self.to_many_strategy == ToManyStrategyEnum.EXISTS:
+                to_many_depth = self.to_many_depth(relationship_path)
+
+            if to_many_depth is not None:
+                content = self._semi_join_search(
+                    relationship_path, to_many_depth, filter_request[-1]
+                )
+                content.update(operator_name=operator or "__eq__", value=value)
+                data.append({self.current: content})
+                continue
+
             collected_rel_object, lookup_field = self.dive(
                 self.base_model,
                 filter_request,
@@ -142,6 +362,7 @@ class BaseQueryBuilder:
                 self.updated_base_query(**rel_info)
 
             models = [obj.get("model") for obj in collected_rel_object]
+            self.remember_joined_paths(relationship_path, models)
 
             data.append(
                 {
@@ -156,14 +377,85 @@ class BaseQueryBuilder:
 
         return data
 
+    def to_many_depth(self, relationship_path: Tuple[str, ...]) -> Union[int, None]:
+        """
+        Position of the first to-many relationship (one-to-many, many-to-many) of a path
+        :param relationship_path: ex: ("file", "user") for file__user__first_name
+        :return: int, None when the path only goes through to-one relationships or foreign keys
+        """
+        model = self.base_model
+        for depth, name in enumerate(relationship_path):
+            attribute = getattr(model, name, None)
+            relationship = getattr(attribute, "property", None)
+            if isinstance(relationship, RelationshipProperty):
+                if relationship.uselist:
+                    return depth
+
+                model = relationship.mapper.class_
+            else:
+                model = (
+                    _lookup_model_foreign_key(attribute)
+                    if attribute is not None
+                    else None
+                )
+                if model is None:
+                    # invalid path, reported by dive
+                    return None
+
+        return None
+
+    def _semi_join_search(
+        self, relationship_path: Tuple[str, ...], to_many_depth: int, field: str
+    ) -> Dict[str, Any]:
+        """
+        Join the to-one prefix of a path, and filter the rest of it by EXISTS
+        :return: dict, the searched content of the filter without its operator and value
+        """
+        entity = self.base_model
+        if to_many_depth:
+            prefix = relationship_path[:to_many_depth]
+            collected_rel_object, _ = self.dive(self.base_model, list(prefix))
+            for rel_info in collected_rel_object:
+                self.updated_base_query(**rel_info)
+
+            entity = collected_rel_object[-1]["model"]
+            self.remember_joined_paths(
+                prefix, [rel_info["model"] for rel_info in collected_rel_object]
+            )
+
+        return {
+            "model": entity,
+            "field": field,
+            "semi_join": SemiJoin(entity, relationship_path[to_many_depth:], field),
+        }
+
+    def remember_joined_paths(self, relationship_path: Tuple[str, ...], models: List):
+        """
+        Record the entity joined for a relationship path, and for each of its prefixes when every hop
+        joined a single entity (no many-to-many secondary table), so that resolve_column reuses them
+        :param relationship_path:
+        :param models: joined entities, as collected by dive
+        :return:
+        """
+        if not models or not relationship_path:
+            return
+
+        if len(models) == len(relationship_path):
+            for depth, model in enumerate(models, 1):
+                self.joined_paths.setdefault(relationship_path[:depth], model)
+        else:
+            self.joined_paths.setdefault(relationship_path, models[-1])
+
     def updated_base_query(
         self,
         model,
         local_join_column=None,
         remote_join_column=None,
+        isouter: bool = False,
     ):
         """
         After fetch concerned model, we build the base query which will be used to filter data
+        :param isouter: LEFT OUTER JOIN the model, to keep the rows without related row
         :return:
         """
         if model not in self.visited:
@@ -176,15 +468,29 @@ class BaseQueryBuilder:
                         or getattr(local_join_column.prop, "columns", None),
                     )[0]
 
-                self.base_query = self.base_query.join(
-                    model,
-                    local_join_column == remote_join_column,
+                self.join(
+                    model, local_join_column == remote_join_column, isouter=isouter
                 )
             else:
-                self.base_query = self.base_query.join(model)
+                self.join(model, isouter=isouter)
 
         self.visited.append(model)
 
+    def join(self, target, onclause=None, isouter: bool = False):
+        """
+        Join target on the base query and keep track of it, so that the plan can be replayed
+        :param target:
+        :param onclause:
+        :param isouter:
+        :return:
+        """
+        if onclause is None:
+            self.base_query = self.base_query.join(target, isouter=isouter)
+        else:
+            self.base_query = self.base_query.join(target, onclause, isouter=isouter)
+
+        self.joins.append((target, onclause, isouter))
+
     def build_final_filter_expression(self):
         """
         Build expression which will be used in the filter.
@@ -203,11 +509,181 @@ class BaseQueryBuilder:
 
             return operand.sqlalchemy_operator(*expression_list)
 
+        plan_key = None
+        if self.plan_cache is not None:
+            plan_key = (
+                self.base_model,
+                self.to_many_strategy,
+                clause_shape(self.complex_filter_clause),
+            )
+            plan = self.plan_cache.get(plan_key)
+
+            if plan is not None:
+                return self.apply_plan(plan, self.complex_filter_clause)
+
         complex_filter_clause = self.run_search(self.complex_filter_clause)
         final_expression = _build_expression(complex_filter_clause)
 
+        if plan_key is not None:
+            self.plan_cache.set(
+                plan_key,
+                FilterPlan(
+                    joins=tuple(self.joins),
+                    clause=self.make_plan_clause(complex_filter_clause),
+                    joined_paths=tuple(self.joined_paths.items()),
+                    visited=tuple(self.visited),
+                    discovered=tuple(self.discovered),
+                ),
+            )
+
         return final_expression
 
+    def make_plan_clause(self, operand: Union[And, Or]) -> Tuple:
+        """
+        Freeze a searched clause (see run_search) into the value-less clause of a FilterPlan
+        :param operand:
+        :return: Tuple
+        """
+        leaves = []
+        for expression_argument in operand.simple_expression:
+            for filter_, content in expression_argument.items():
+                model = content["model"]
+                model = list(model)[-1] if isinstance(model, tuple) else model
+                column = content.get("semi_join")
+                if column is None:
+                    column = getattr(model, content["field"])
+
+                leaves.append((filter_, column, get_operator(content["operator_name"])))
+
+        return (
+            operand.sqlalchemy_operator,
+            tuple(leaves),
+            tuple(self.make_plan_clause(arg) for arg in operand.wrapped_expression),
+        )
+
+    def apply_plan(self, plan: FilterPlan, operand: Union[And, Or]):
+        """
+        Replay the joins of a cached plan and bind the values of operand on its columns
+        :param plan:
+        :param operand: clause with the same shape as the one the plan was made from
+        :return: SQLAlchemy Expression
+        """
+        for target, onclause, isouter in plan.joins:
+            self.join(target, onclause, isouter=isouter)
+
+        self.joined_paths.update(plan.joined_paths)
+        self.visited.extend(plan.visited)
+        self.discovered.extend(plan.discovered)
+
+        def _bind(plan_clause, clause):
+            sqlalchemy_operator, leaves, children = plan_clause
+            expression_list = [
+                self.bind_expression(column, operator, clause.simple_expression[key])
+                for key, column, operator in leaves
+            ]
+            expression_list.extend(
+                _bind(child, wrapped)
+                for child, wrapped in zip(children, clause.wrapped_expression)
+            )
+
+            return sqlalchemy_operator(*expression_list)
+
+        return _bind(plan.clause, operand)
+
+    def eager_load(self, prefetch: Sequence[str] = (), join_load: Sequence[str] = ()):
+        """
+        Load relationships with the filtered rows instead of lazily, row by row
+        :param prefetch: relationship paths (ex: houses__house) loaded by SELECT ... IN, see selectinload
+        :param join_load: relationship paths loaded in the same query by LEFT OUTER JOIN, see joinedload
+        Relationships the filter already joins are filled from its join (see contains_eager): they then hold
+        only the rows matching the filter.
+        :return: Query
+        """
+        options = [self.loader_option(path, selectinload) for path in prefetch]
+        options.extend(self.loader_option(path, joinedload) for path in join_load)
+
+        if options:
+            self.base_query = self.base_query.options(*options)
+
+        return self.base_query
+
+    def loader_option(self, path: str, strategy):
+        """
+        Build the loader option of a relationship path, with contains_eager on the part already joined
+        :param path:
+        :param strategy: selectinload / joinedload
+        :return: Load
+        """
+        entity = self.base_model
+        option = option_strategy = None
+        names = path.split("__")
+
+        for depth, name in enumerate(names, 1):
+            attribute = getattr(entity, name, None)
+            relationship = getattr(attribute, "property", None)
+            if not isinstance(relationship, RelationshipProperty):
+                raise InvalidRequestError(f"{name} is not a relationship of {entity}")
+
+            joined_entity = self.joined_paths.get(tuple(names[:depth]))
+            reuse_join = (
+                (option is None or option_strategy is contains_eager)
+                and joined_entity is not None
+                and inspect(joined_entity).mapper is relationship.mapper
+            )
+
+            if reuse_join:
+                option_strategy = contains_eager
+                if isinstance(joined_entity, AliasedClass):
+                    attribute = attribute.of_type(joined_entity)
+                entity = joined_entity
+            else:
+                option_strategy = strategy
+                entity = relationship.mapper.class_
+
+            option = (
+                option_strategy(attribute)
+                if option is None
+                else getattr(option, option_strategy.__name__)(attribute)
+            )
+
+        return option
+
+    def resolve_column(self, path: str, isouter: bool = False):
+        """
+        Resolve a path such as file__item__content to the column it targets, to order or select on it.
+        Joins already made for the same relationship path by the filter are reused, the missing ones are added
+        :param path:
+        :param isouter: add the missing joins as LEFT OUTER JOIN
+        :return: InstrumentedAttribute
+        """
+        fields = path.split("__")
+        relationship_path, field = tuple(fields[:-1]), fields[-1]
+        entity = self.base_model
+
+        for depth in range(len(relationship_path), 0, -1):
+            joined_entity = self.joined_paths.get(relationship_path[:depth])
+            if joined_entity is not None:
+                entity = joined_entity
+                break
+        else:
+            depth = 0
+
+        if depth < len(relationship_path):
+            collected_rel_object, field = self.dive(
+                entity, list(relationship_path[depth:]) + [field]
+            )
+            for rel_info in collected_rel_object:
+                self.updated_base_query(**rel_info, isouter=isouter)
+
+            entity = collected_rel_object[-1]["model"]
+            self.joined_paths[relationship_path] = entity
+
+        column = getattr(entity, field, None)
+        if column is None:
+            raise InvalidRequestError(f"Unable to find {field} field in {entity}")
+
+        return column
+
     def dive(self, model, path: List, result: Union[List, None] = None) -> Tuple:
         """
         Given a path, dive in model which through we can reach the final column
@@ -223,7 +699,8 @@ class BaseQueryBuilder:
         if not result:
             result = []
 
-        simple_attrs, fk_attrs, many_to_many_rels = get_model_attrs(model).values()
+        metadata = model_registry.metadata(model)
+        simple_attrs, fk_attrs, many_to_many_rels = metadata.attrs_by_kind.values()
         field = path.pop(0) if path else ""
         column = getattr(model, field)
 
@@ -231,7 +708,7 @@ class BaseQueryBuilder:
             logging.error(f"Unable to find {column} in the model {model}")
             raise InvalidRequestError(f"No column named {field}")
 
-        if field in list(map(lambda col: col.key, simple_attrs + fk_attrs)):
+        if field in metadata.lookup_keys:
             next_model = _lookup_model_foreign_key(column)
         else:
             for relation_object in many_to_many_rels:
@@ -252,12 +729,14 @@ class BaseQueryBuilder:
 
         # When there's more than one foreign key in the model, we have to choose the correct one between them
         _, remote_fk_attrs, __ = get_model_attrs(next_model).values()
-        remote_explicit_join_column = list(inspect(next_model).primary_key)[0]
+        remote_explicit_join_column = model_registry.metadata(
+            next_model
+        ).primary_key_columns[0]
 
         if remote_fk_attrs:
             valid_fk = list(
                 filter(
-                    lambda fk: get_model_from_rel(fk.target.name) == model,
+                    lambda fk: get_model_from_table(fk.target) == model,
                     remote_fk_attrs,
                 ),
             )
@@ -276,6 +755,9 @@ class BaseQueryBuilder:
             ),
         )[0]
 
+        if isinstance(model, AliasedClass):
+            local_explicit_join_column = getattr(model, local_explicit_join_column.key)
+
         if next_model in self.discovered:
             aliased_model = aliased(next_model)
             local_explicit_join_column = getattr(model, local_explicit_join_column.key)
@@ -0,0 +1,485 @@
+from __future__ import annotations
+
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import literal_column
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import Session
+
+from sqlalchemy_wrapper.db.aggregates import Aggregate
+from sqlalchemy_wrapper.db.cache import clause_key
+from sqlalchemy_wrapper.db.cache import has_uncommitted_writes
+from sqlalchemy_wrapper.db.cache import result_cache
+from sqlalchemy_wrapper.db.cache import statement_tables
+from sqlalchemy_wrapper.db.operators import And
+from sqlalchemy_wrapper.db.operators import BooleanOperator
+from sqlalchemy_wrapper.db.operators import Not
+from sqlalchemy_wrapper.db.query import BaseQueryBuilder
+from sqlalchemy_wrapper.db.settings import ToManyStrategyEnum
+from sqlalchemy_wrapper.registry import model_registry
+
+
+class QuerySet:
+    """
+    Lazy filter of a model. Refining it (filter, exclude, order_by, slicing) returns a new QuerySet,
+    the SQL is only built and run when the results are needed: iteration, len, bool, indexing, first.
+    The results are then kept, evaluating the same QuerySet again doesn't hit the database.
+    Ex:
+        users = User.queryset(first_name="john").exclude(file__path="/tmp").order_by("-id")[:10]
+        for user in users: ...
+    """
+
+    def __init__(
+        self,
+        model,
+        bool_clause: Union[BooleanOperator, None] = None,
+        ordering: Tuple[str, ...] = (),
+        offset: int = 0,
+        limit: Union[int, None] = None,
+        force_primary: bool = False,
+        prefetch: Sequence[str] = (),
+        join_load: Sequence[str] = (),
+        annotations: Tuple[Tuple[str, Aggregate], ...] = (),
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
+    ):
+        self.model = model
+        self.bool_clause = bool_clause
+        self.ordering = tuple(ordering)
+        self.offset = offset
+        self.limit = limit
+        self.force_primary = force_primary
+        self.prefetch = tuple(prefetch)
+        self.join_load = tuple(join_load)
+        self.annotations = tuple(annotations)
+        self.to_many_strategy = ToManyStrategyEnum(to_many_strategy)
+        self._result_cache: Union[List, None] = None
+
+    def _clone(self, **changes) -> QuerySet:
+        attributes = {
+            "bool_clause": self.bool_clause,
+            "ordering": self.ordering,
+            "offset": self.offset,
+            "limit": self.limit,
+            "force_primary": self.force_primary,
+            "prefetch": self.prefetch,
+            "join_load": self.join_load,
+            "annotations": self.annotations,
+            "to_many_strategy": self.to_many_strategy,
+        }
+        attributes.update(changes)
+        return QuerySet(self.model, **attributes)
+
+    def _combine(self, clause: BooleanOperator) -> QuerySet:
+        if self.limit is not None or self.offset:
+            raise TypeError("Cannot filter a query once a slice has been taken")
+
+        if self.bool_clause is None:
+            return self._clone(bool_clause=clause)
+
+        return self._clone(bool_clause=And(self.bool_clause, clause))
+
+    def filter(self, *clauses: BooleanOperator, **conditions) -> QuerySet:
+        """
+        Keep the rows matching all the clauses and conditions, the same as Manager.filter takes
+        :return: QuerySet
+        """
+        return self._combine(And(*clauses, **conditions))
+
+    def exclude(self, *clauses: BooleanOperator, **conditions) -> QuerySet:
+        """
+        Drop the rows matching all the clauses and conditions.
+        Paths through relationships are joined as for filter: rows without related row are dropped too.
+        :return: QuerySet
+        """
+        return self._combine(Not(*clauses, **conditions))
+
+    def order_by(self, *paths: str) -> QuerySet:
+        """
+        Replace the ordering. Paths can go through relationships, prefix a path with "-" to sort descending
+        :param paths: ex: "-last_name", "file__path"
+        :return: QuerySet
+        """
+        return self._clone(ordering=paths)
+
+    def options(
+        self,
+        force_primary: Union[bool, None] = None,
+        prefetch: Sequence[str] = (),
+        join_load: Sequence[str] = (),
+        to_many_strategy: Union[ToManyStrategyEnum, None] = None,
+    ) -> QuerySet:
+        """
+        Add relationships to load with the rows, read from the primary, or change how to-many
+        relationships are filtered (see Manager.filter)
+        :return: QuerySet
+        """
+        return self._clone(
+            to_many_strategy=to_many_strategy or self.to_many_strategy,
+            force_primary=self.force_primary
+            if force_primary is None
+            else force_primary,
+            prefetch=self.prefetch + tuple(prefetch),
+            join_load=self.join_load + tuple(join_load),
+        )
+
+    def annotate(self, **aggregates: Aggregate) -> QuerySet:
+        """
+        Compute an aggregate per row, grouped by primary key, and set it as attribute of the objects.
+        The annotations can be used in order_by. As in aggregate, annotations over different to-many paths
+        are each computed in their own subquery, so that the joins of one don't repeat the rows of the others.
+        Ex:
+            User.queryset().annotate(addresses_count=Count("addresses")).order_by("-addresses_count")
+        :return: QuerySet
+        """
+        for name, aggregate in aggregates.items():
+            if not isinstance(aggregate, Aggregate):
+                raise TypeError(f"{name} is not an aggregate: {aggregate!r}")
+            if hasattr(self.model, name):
+                raise ValueError(f"{name} conflicts with an attribute of {self.model}")
+
+        return self._clone(annotations=self.annotations + tuple(aggregates.items()))
+
+    def count(self) -> int:
+        """
+        Number of rows, counted by the database (distinct primary keys when the filter joins)
+        :return: int
+        """
+        if self._result_cache is not None:
+            return len(self._result_cache)
+
+        sliced = self.limit is not None or bool(self.offset)
+        with self.model.db_context.replica_reads(self.force_primary) as session:
+            query_builder, query = self._build(
+                session, eager=False, annotate=sliced, ordered=sliced
+            )
+            if not sliced and not query_builder.joins:
+                return query.with_entities(func.count()).scalar()
+
+            primary_key = [
+                getattr(self.model, name)
+                for name in model_registry.metadata(self.model).primary_key_names
+            ]
+            query = query.with_entities(*primary_key)
+            if not sliced:
+                query = query.distinct()
+
+            return session.query(func.count()).select_from(query.subquery()).scalar()
+
+    def exists(self) -> bool:
+        """
+        Whether a row matches, by SELECT 1 ... LIMIT 1
+        :return: bool
+        """
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+        if self.limit == 0:
+            return False
+
+        sliced = bool(self.offset)
+        with self.model.db_context.replica_reads(self.force_primary) as session:
+            _, query = self._build(
+                session, eager=False, annotate=sliced, ordered=sliced
+            )
+            query = query.with_entities(literal_column("1")).limit(1)
+            return query.first() is not None
+
+    def aggregate(self, **aggregates: Aggregate) -> Dict:
+        """
+        Compute the aggregates over all the rows, in a single query.
+        When the aggregates join different to-many paths, or mix one with to-one paths, each aggregate is computed in
+        its own subquery, so that the rows repeated by a to-many join only count for the aggregates of that path
+        Ex:
+            User.queryset(first_name="john").aggregate(total=Sum("file__size"), files=Count("file"))
+            => {"total": 1024, "files": 3}
+        :return: dict keyed by the names of the aggregates
+        """
+        if self.limit is not None or self.offset:
+            raise TypeError("Cannot aggregate a query once a slice has been taken")
+        for name, aggregate in aggregates.items():
+            if not isinstance(aggregate, Aggregate):
+                raise TypeError(f"{name} is not an aggregate: {aggregate!r}")
+
+        with self.model.db_context.replica_reads(self.force_primary) as session:
+            query_builder, _ = self._build(
+                session, eager=False, annotate=False, ordered=False
+            )
+            to_many_paths = {
+                aggregate.to_many_path(query_builder)
+                for aggregate in aggregates.values()
+            }
+            if len(to_many_paths) > 1:
+                # a to-many join repeats the rows seen by the other aggregates: each one gets its own joins
+                subqueries = [
+                    self._aggregate_subquery(session, aggregate).label(name)
+                    for name, aggregate in aggregates.items()
+                ]
+                row = session.query(*subqueries).one()
+            else:
+                labels = [
+                    aggregate.expression(query_builder).label(name)
+                    for name, aggregate in aggregates.items()
+                ]
+                row = query_builder.base_query.with_entities(*labels).one()
+
+        return dict(zip(aggregates, row))
+
+    def _aggregate_subquery(self, session: Session, aggregate: Aggregate):
+        """
+        Scalar subquery computing aggregate alone over the rows of the queryset
+        """
+        query_builder, _ = self._build(
+            session, eager=False, annotate=False, ordered=False
+        )
+        # resolved before reading base_query, which gets the joins of the path
+        expression = aggregate.expression(query_builder)
+        return query_builder.base_query.with_entities(expression).scalar_subquery()
+
+    def first(self):
+        """
+        First row, ordered by primary key when no ordering is set
+        :return: object or None
+        """
+        if self._result_cache is not None:
+            return self._result_cache[0] if self._result_cache else None
+
+        queryset = (
+            self
+            if self.ordering
+            else self.order_by(*model_registry.metadata(self.model).primary_key_names)
+        )
+        data = list(queryset[:1])
+        return data[0] if data else None
+
+    def __getitem__(self, item: Union[int, slice]):
+        if isinstance(item, slice):
+            if item.step not in (None, 1):
+                raise ValueError("Slicing with a step is not supported")
+            if (item.start or 0) < 0 or (item.stop is not None and item.stop < 0):
+                raise ValueError("Negative indexing is not supported")
+
+            if self._result_cache is not None:
+                return self._result_cache[item]
+
+            start = item.start or 0
+            limit = self.limit
+            if item.stop is not None:
+                limit = item.stop - start
+                if self.limit is not None:
+                    limit = min(limit, self.limit - start)
+            elif self.limit is not None:
+                limit = self.limit - start
+
+            return self._clone(
+                offset=self.offset + start,
+                limit=None if limit is None else max(limit, 0),
+            )
+
+        if not isinstance(item, int):
+            raise TypeError(
+                f"QuerySet indices must be integers or slices, not {type(item).__name__}"
+            )
+        if item < 0:
+            raise ValueError("Negative indexing is not supported")
+
+        if self._result_cache is not None:
+            return self._result_cache[item]
+
+        data = list(self[item : item + 1])
+        if not data:
+            raise IndexError("QuerySet index out of range")
+
+        return data[0]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._fetch_all())
+
+    def __len__(self) -> int:
+        return len(self._fetch_all())
+
+    def __bool__(self) -> bool:
+        return bool(self._fetch_all())
+
+    def __repr__(self) -> str:
+        return f"<QuerySet of {self.model.__name__}>"
+
+    def build(self, session: Union[Session, None]) -> Query:
+        """
+        Build the query of the QuerySet, without running it
+        :param session: None to only get its statement
+        :return: Query
+        """
+        return self._build(session)[1]
+
+    def _build(
+        self,
+        session: Union[Session, None],
+        eager: bool = True,
+        annotate: bool = True,
+        ordered: bool = True,
+    ) -> Tuple[BaseQueryBuilder, Query]:
+        """
+        :param eager: add the loader options of prefetch / join_load
+        :param annotate: add the annotations as columns, grouped by primary key
+        :param ordered: add the ordering
+        :return: the builder, to resolve more paths on it, and its query
+        """
+        bool_clause = self.bool_clause.copy() if self.bool_clause else And()
+        query_builder = self.model._build_query(
+            session, bool_clause, {}, self.to_many_strategy
+        )
+
+        primary_key = [
+            getattr(self.model, name)
+            for name in model_registry.metadata(self.model).primary_key_names
+        ]
+        labels = {}
+        group_by = list(primary_key)
+        to_many_paths = {
+            aggregate.to_many_path(query_builder) for _, aggregate in self.annotations
+        }
+        if annotate and len(to_many_paths) > 1:
+            # a to-many join repeats the rows seen by the other annotations: each one is computed per primary key
+            # in its own subquery, joined on the primary key
+            for name, aggregate in self.annotations:
+                subquery = self._annotation_subquery(session, name, aggregate)
+                query_builder.base_query = query_builder.base_query.outerjoin(
+                    subquery,
+                    and_(
+                        *(
+                            column == subquery.c[f"_pk_{index}"]
+                            for index, column in enumerate(primary_key)
+                        )
+                    ),
+                )
+                labels[name] = subquery.c[name].label(name)
+                group_by.append(subquery.c[name])
+        elif annotate:
+            labels = {
+                name: aggregate.expression(query_builder).label(name)
+                for name, aggregate in self.annotations
+            }
+
+        order_by = []
+        for path in self.ordering if ordered else ():
+            descending = path.startswith("-")
+            name = path.lstrip("-")
+            column = labels.get(name)
+            if column is None:
+                # outer join: ordering must not drop the rows without related row
+                column = query_builder.resolve_column(name, isouter=True)
+            order_by.append(column.desc() if descending else column)
+
+        if eager:
+            query = query_builder.eager_load(self.prefetch, self.join_load)
+        else:
+            query = query_builder.base_query
+        if labels:
+            query = query.add_columns(*labels.values()).group_by(*group_by)
+        if order_by:
+            query = query.order_by(*order_by)
+        if self.offset:
+            query = query.offset(self.offset)
+        if self.limit is not None:
+            query = query.limit(self.limit)
+
+        return query_builder, query
+
+    def _annotation_subquery(
+        self, session: Union[Session, None], name: str, aggregate: Aggregate
+    ):
+        """
+        Subquery computing aggregate alone per primary key over the rows of the queryset,
+        with the primary key as _pk_0, _pk_1... and the aggregate as name
+        """
+        query_builder, _ = self._build(
+            session, eager=False, annotate=False, ordered=False
+        )
+        # resolved before reading base_query, which gets the joins of the path
+        expression = aggregate.expression(query_builder)
+        primary_key = [
+            getattr(self.model, pk_name)
+            for pk_name in model_registry.metadata(self.model).primary_key_names
+        ]
+        return (
+            query_builder.base_query.with_entities(
+                *(
+                    column.label(f"_pk_{index}")
+                    for index, column in enumerate(primary_key)
+                ),
+                expression.label(name),
+            )
+            .group_by(*primary_key)
+            .subquery()
+        )
+
+    @property
+    def query(self) -> Query:
+        return self.build(self.model.db_context.session)
+
+    def _fetch_all(self) -> List:
+        if self._result_cache is None:
+            self._result_cache = self._fetch()
+
+        return self._result_cache
+
+    def _rows(self, rows: List) -> List:
+        """
+        Set the annotations of each row on its object
+        """
+        if not self.annotations:
+            return rows
+
+        data = []
+        for obj, *values in rows:
+            for (name, _), value in zip(self.annotations, values):
+                setattr(obj, name, value)
+            data.append(obj)
+
+        return data
+
+    def _fetch(self) -> List:
+        """
+        Run the query, through the result cache if the model opted in.
+        The cache is skipped when the session has changes not committed yet, or to read from the primary.
+        """
+        with self.model.db_context.replica_reads(self.force_primary) as session:
+            if (
+                not self.model.__cache_results__
+                or self.force_primary
+                or self.prefetch
+                or self.join_load
+                or self.annotations
+                or session.new
+                or session.deleted
+                or session.dirty
+                or has_uncommitted_writes(session)
+            ):
+                return self._rows(self.build(session).all())
+
+            filter_key = (
+                clause_key(self.bool_clause) if self.bool_clause else (),
+                self.to_many_strategy.value,
+                self.ordering,
+                self.offset,
+                self.limit,
+            )
+            query = self.build(session)
+            key = result_cache.make_key(
+                self.model, filter_key, statement_tables(query.statement)
+            )
+            if key is None:
+                return query.all()
+
+            data = result_cache.get(key, session)
+            if data is None:
+                data = query.all()
+                result_cache.set(key, data)
+
+            return data
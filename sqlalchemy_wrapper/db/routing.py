@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import threading
+from typing import List
+from typing import Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import CompoundSelect
+from sqlalchemy.sql import Select
+
+from sqlalchemy_wrapper.db.pool import pool_stats
+from sqlalchemy_wrapper.db.settings import ReplicaStrategyEnum
+
+
+class ReplicaRouter:
+    """
+    Choose the replica engine serving a read
+    """
+
+    def __init__(
+        self,
+        engines: List[Engine],
+        strategy: ReplicaStrategyEnum = ReplicaStrategyEnum.ROUND_ROBIN,
+    ):
+        if not engines:
+            raise ValueError("At least one replica engine is needed")
+
+        self.engines = engines
+        self.strategy = ReplicaStrategyEnum(strategy)
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def _next_offset(self) -> int:
+        with self._lock:
+            offset = self._counter
+            self._counter = (self._counter + 1) % len(self.engines)
+
+        return offset
+
+    def choose(self) -> Engine:
+        offset = self._next_offset()
+        rotation = self.engines[offset:] + self.engines[:offset]
+        if self.strategy == ReplicaStrategyEnum.LEAST_CONNECTIONS:
+            # ties are spread by starting from the round-robin position
+            return min(rotation, key=lambda engine: pool_stats(engine.pool).checked_out)
+
+        return rotation[0]
+
+    def dispose(self) -> None:
+        for engine in self.engines:
+            engine.dispose()
+
+
+class RoutingSession(Session):
+    """
+    Session sending the SELECT of the read methods to the replicas.
+    A statement goes to the primary (the bind of the session) when:
+        - replica_reads is off, it is only on inside DBContext.replica_reads()
+        - force_primary is on, see DBContext.use_primary()
+        - it is not a SELECT (or is a SELECT ... FOR UPDATE)
+        - the current transaction has already written to the primary
+    """
+
+    def __init__(self, router: Union[ReplicaRouter, None] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.router = router
+        self.replica_reads = False
+        self.force_primary = False
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.router is None or self.force_primary:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+
+        is_select = isinstance(clause, (Select, CompoundSelect))
+        if self._flushing or (clause is not None and not is_select):
+            self.wrote = True
+
+        if (
+            not is_select
+            or not self.replica_reads
+            or self.wrote
+            or clause._for_update_arg is not None
+        ):
+            return super().get_bind(mapper, clause=clause, **kwargs)
+
+        return self.router.choose()
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_write_state(session: RoutingSession, transaction) -> None:
+    if transaction.parent is None:
+        session.wrote = False
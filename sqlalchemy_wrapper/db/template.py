@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import threading
+from logging import INFO
+from typing import Dict
+from typing import List
+from typing import Union
+
+from sqlalchemy import bindparam
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT
+from sqlalchemy.engine.default import CACHE_MISS
+from sqlalchemy.sql.elements import BindParameter
+
+from sqlalchemy_wrapper.db.operators import BooleanOperator
+from sqlalchemy_wrapper.db.query import BaseQueryBuilder
+from sqlalchemy_wrapper.db.settings import ToManyStrategyEnum
+from sqlalchemy_wrapper.logger import LazyStr
+from sqlalchemy_wrapper.logger import logger as logging
+from sqlalchemy_wrapper.logger import should_log_query
+from sqlalchemy_wrapper.utils import get_operator
+
+# operators taking a list of values, bound to an expanding parameter
+_EXPANDING_OPERATORS = ("in_", "notin_", "not_in")
+
+
+class Param:
+    """
+    Placeholder of a filter value given when the template is run
+    Ex:
+        User.prepare(last_name__in=Param("names")).run(names=["doe", "smith"])
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return f"Param({self.name!r})"
+
+
+class FilterTemplate:
+    """
+    Filter whose paths, joins and statement are resolved once, see Manager.prepare.
+    Running it only binds the values of its Params: the statement is the same object on every run,
+    so SQLAlchemy finds its compiled form in the compiled cache of the engine.
+    """
+
+    def __init__(
+        self,
+        model,
+        bool_clause: BooleanOperator,
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
+    ):
+        self.model = model
+        self.params: Dict[str, BindParameter] = {}
+        self.to_many_strategy = ToManyStrategyEnum(to_many_strategy)
+
+        query_builder = BaseQueryBuilder(
+            model,
+            self._bind_params(bool_clause),
+            None,
+            to_many_strategy=self.to_many_strategy,
+        )
+        # not make_filter: its log renders the values inline, there are none yet
+        expression = query_builder.build_final_filter_expression()
+        query = query_builder.base_query.filter(expression)
+        # the rows of a to-many JOIN are repeated for each matching related row
+        self.unique = self.to_many_strategy == ToManyStrategyEnum.JOIN and bool(
+            query_builder.joins
+        )
+        self.statement = query.statement
+
+        if should_log_query(INFO):
+            logging.info("Prepared query is: %s", LazyStr(lambda: str(self.statement)))
+
+    def _bind_params(self, operand: BooleanOperator) -> BooleanOperator:
+        """
+        Copy of the clause where each Param is replaced by a bind parameter of the same name
+        """
+        simple_expression = {}
+        for filter_path, value in operand.simple_expression.items():
+            expanding = (
+                get_operator(filter_path.split("__")[-1]) in _EXPANDING_OPERATORS
+            )
+            if isinstance(value, (list, tuple)):
+                value = type(value)(self._bindparam(item, False) for item in value)
+            else:
+                value = self._bindparam(value, expanding)
+
+            simple_expression[filter_path] = value
+
+        return type(operand)(
+            *[self._bind_params(wrapped) for wrapped in operand.wrapped_expression],
+            **simple_expression,
+        )
+
+    def _bindparam(self, value, expanding: bool):
+        if not isinstance(value, Param):
+            return value
+
+        parameter = self.params.get(value.name)
+        if parameter is None:
+            parameter = self.params[value.name] = bindparam(
+                value.name, expanding=expanding
+            )
+        elif parameter.expanding != expanding:
+            raise ValueError(f"{value} is used both as a list and as a single value")
+
+        return parameter
+
+    def _values(self, values: Dict) -> Dict:
+        missing = self.params.keys() - values.keys()
+        if missing:
+            raise TypeError(f"Missing values for {sorted(missing)}")
+
+        unknown = values.keys() - self.params.keys()
+        if unknown:
+            raise TypeError(f"{sorted(unknown)} are not parameters of the template")
+
+        for name, parameter in self.params.items():
+            if parameter.expanding and not isinstance(values[name], (list, set, tuple)):
+                raise ValueError(f"Iterable object expected for {name}")
+
+        return values
+
+    def run(self, force_primary: bool = False, **values) -> List:
+        """
+        :param force_primary: read from the primary even if replicas are set
+        :param values: value of each Param, by name
+        :return: List of instances
+        """
+        values = self._values(values)
+        with self.model.db_context.replica_reads(force_primary) as session:
+            result = session.execute(self.statement, values).scalars()
+            return (result.unique() if self.unique else result).all()
+
+    async def arun(self, **values) -> List:
+        """
+        asyncio version of run
+        """
+        values = self._values(values)
+        result = await self.model.async_db_context.session.execute(
+            self.statement, values
+        )
+        result = result.scalars()
+        return (result.unique() if self.unique else result).all()
+
+
+class CompiledCacheStats:
+    """
+    Hits and misses of the compiled cache of the engines, read from the execution context of each statement.
+    A statement which can't be cached (textual SQL, caching disabled) is counted as uncached.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        self._lock = threading.Lock()
+
+    def record(self, context) -> None:
+        if context is None or context.compiled is None:
+            return
+
+        with self._lock:
+            if context.cache_hit is CACHE_HIT:
+                self.hits += 1
+            elif context.cache_hit is CACHE_MISS:
+                self.misses += 1
+            else:
+                self.uncached += 1
+
+    def clear(self) -> None:
+        """
+        Reset the counters
+        :return:
+        """
+        with self._lock:
+            self.hits = self.misses = self.uncached = 0
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        cached = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "hit_rate": self.hits / cached if cached else 0.0,
+        }
+
+
+compiled_cache_stats = CompiledCacheStats()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_compiled_cache(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    compiled_cache_stats.record(context)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Sequence
+
+from sqlalchemy import literal_column
+from sqlalchemy import Table
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from sqlalchemy_wrapper.db.settings import DriverEnum
+
+
+class UpsertResult(NamedTuple):
+    """
+    Outcome of an upsert. Rows already there and left untouched (no update_fields) are in neither count
+    """
+
+    inserted: int
+    updated: int
+
+
+def build_upsert(
+    driver: DriverEnum,
+    table: Table,
+    rows: List[Dict],
+    conflict_on: Sequence[str],
+    update_fields: Sequence[str],
+):
+    """
+    Build the multi-values INSERT of rows which updates update_fields when a row already exists:
+    ON CONFLICT DO UPDATE on PostgreSQL / SQLite, ON DUPLICATE KEY UPDATE on MySQL.
+    On PostgreSQL the statement returns whether each row has been inserted (xmax = 0) or updated.
+    :param driver:
+    :param table:
+    :param rows: rows keyed by column key, all with the same keys
+    :param conflict_on: column keys of the unique constraint. MySQL always checks every unique key
+    :param update_fields: column keys to update on conflict, nothing is done on conflict if empty
+    :return: Insert statement
+    """
+    if driver == DriverEnum.MYSQL:
+        stmt = mysql_insert(table).values(rows)
+        if not update_fields:
+            # a no-op assignment rather than INSERT IGNORE, which would also turn NOT NULL, foreign key
+            # and truncation errors into warnings and drop the rows
+            primary_key = list(table.primary_key.columns)[0]
+            return stmt.on_duplicate_key_update({primary_key.key: primary_key})
+
+        return stmt.on_duplicate_key_update(
+            {field: stmt.inserted[field] for field in update_fields}
+        )
+
+    if driver == DriverEnum.POSTGRES:
+        stmt = postgresql_insert(table).values(rows)
+    else:
+        stmt = sqlite_insert(table).values(rows)
+
+    if update_fields:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(conflict_on),
+            set_={field: stmt.excluded[field] for field in update_fields},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_on))
+
+    if driver == DriverEnum.POSTGRES:
+        stmt = stmt.returning(literal_column("(xmax = 0)").label("inserted"))
+
+    return stmt
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import csv
+import datetime
+import io
+import os
+import time
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Sequence
+from typing import Union
+
+from sqlalchemy_wrapper.serializer import json_dumps
+from sqlalchemy_wrapper.serializer import stream_writer
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional, needed by the arrow format only
+    pyarrow = None
+
+EXPORT_FORMATS = ("csv", "jsonl", "arrow")
+
+
+class ExportStats(NamedTuple):
+    rows: int
+    bytes_written: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def check_format(format: str) -> None:
+    """
+    Raise ValueError when the rows can't be exported in format
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown export format {format}, expected one of {EXPORT_FORMATS}"
+        )
+    if format == "arrow" and pyarrow is None:
+        raise ValueError("The arrow format needs the pyarrow package")
+
+
+def export_rows(
+    chunks: Iterable[Sequence[Sequence]],
+    fields: Sequence[str],
+    output,
+    format: str = "csv",
+    columns: Union[Sequence, None] = None,
+) -> ExportStats:
+    """
+    Write chunks of row tuples as they come, so that only one chunk is held in memory
+    :param chunks: lists of row tuples, ex: result.partitions(1000)
+    :param fields: names of the values of a row, used as header
+    :param output: path, binary or text file, or socket
+    :param format: csv, jsonl (one JSON object per line) or arrow (Arrow IPC stream, needs pyarrow)
+    :param columns: columns of the rows, to type the arrow schema
+    :return: ExportStats
+    """
+    check_format(format)
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as file:
+            return export_rows(chunks, fields, file, format, columns)
+
+    raw_write = stream_writer(output)
+    bytes_written = rows = 0
+    started_at = time.perf_counter()
+
+    def write(data) -> None:
+        nonlocal bytes_written
+        raw_write(data)
+        bytes_written += len(data)
+
+    def counted(chunks: Iterable[Sequence[Sequence]]) -> Iterator[Sequence[Sequence]]:
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    if format == "arrow":
+        _write_arrow(counted(chunks), fields, columns, write)
+    else:
+        encode = _encode_csv if format == "csv" else _encode_jsonl
+        for data in encode(counted(chunks), fields):
+            write(data)
+
+    return ExportStats(rows, bytes_written, time.perf_counter() - started_at)
+
+
+def _encode_csv(
+    chunks: Iterable[Sequence[Sequence]], fields: Sequence[str]
+) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():  # header of an empty export
+        yield buffer.getvalue().encode()
+
+
+def _encode_jsonl(
+    chunks: Iterable[Sequence[Sequence]], fields: Sequence[str]
+) -> Iterator[bytes]:
+    dumps = json_dumps()
+    for chunk in chunks:
+        yield b"".join(dumps(dict(zip(fields, row))) + b"\n" for row in chunk)
+
+
+class _ArrowSink:
+    """
+    File-like object forwarding what pyarrow writes
+    """
+
+    closed = False
+
+    def __init__(self, write: Callable):
+        self._write = write
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._write(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def _arrow_type(column):
+    """
+    Arrow type of a column, None to let pyarrow infer it from the values
+    """
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+    for python_types, arrow_type in (
+        (bool, pyarrow.bool_()),
+        (int, pyarrow.int64()),
+        (float, pyarrow.float64()),
+        (str, pyarrow.string()),
+        (bytes, pyarrow.binary()),
+        (datetime.datetime, pyarrow.timestamp("us")),
+        (datetime.date, pyarrow.date32()),
+        (datetime.time, pyarrow.time64("us")),
+    ):
+        if issubclass(python_type, python_types):
+            return arrow_type
+
+    return None
+
+
+def _write_arrow(
+    chunks: Iterable[Sequence[Sequence]],
+    fields: Sequence[str],
+    columns: Union[Sequence, None],
+    write: Callable,
+) -> None:
+    types: List = [_arrow_type(column) for column in columns or [None] * len(fields)]
+    sink = _ArrowSink(write)
+    writer = None
+
+    for chunk in chunks:
+        arrays = [
+            pyarrow.array(values, type=arrow_type)
+            for values, arrow_type in zip(zip(*chunk), types)
+        ]
+        batch = pyarrow.RecordBatch.from_arrays(arrays, names=list(fields))
+        if writer is None:
+            # the types inferred from the first chunk are kept for the next ones
+            types = batch.schema.types
+            writer = pyarrow.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+
+    if writer is None:
+        schema = pyarrow.schema(
+            [
+                (field, arrow_type or pyarrow.null())
+                for field, arrow_type in zip(fields, types)
+            ]
+        )
+        writer = pyarrow.ipc.new_stream(sink, schema)
+    writer.close()
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import csv
+import datetime
+import decimal
+import io
+import json
+import os
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+from typing import Union
+
+from sqlalchemy import insert
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from sqlalchemy_wrapper.registry import model_registry
+from sqlalchemy_wrapper.serializer import json_dumps
+from sqlalchemy_wrapper.serializer import stream_writer
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# key of the values beyond the header of a csv line
+_REST_KEY = "__rest__"
+_TRUE = frozenset(("true", "t", "yes", "y", "1"))
+_FALSE = frozenset(("false", "f", "no", "n", "0"))
+
+
+class ImportStats(NamedTuple):
+    rows_read: int
+    rows_loaded: int
+    rows_failed: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+        return value.strip().lower() in _TRUE
+
+    raise ValueError(f"{value!r} is not a boolean")
+
+
+def _to_int(value) -> int:
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{value!r} is not an integer")
+
+    return int(value)
+
+
+def _to_decimal(value) -> decimal.Decimal:
+    try:
+        return decimal.Decimal(str(value))
+    except decimal.InvalidOperation:
+        raise ValueError(f"{value!r} is not a decimal")
+
+
+def _from_isoformat(python_type) -> Callable:
+    def convert(value):
+        return (
+            value
+            if isinstance(value, python_type)
+            else python_type.fromisoformat(value)
+        )
+
+    return convert
+
+
+# checked in order: bool is an int, datetime is a date
+_CONVERTERS = (
+    (bool, _to_bool),
+    (int, _to_int),
+    (float, float),
+    (decimal.Decimal, _to_decimal),
+    (datetime.datetime, _from_isoformat(datetime.datetime)),
+    (datetime.date, _from_isoformat(datetime.date)),
+    (datetime.time, _from_isoformat(datetime.time)),
+    (str, str),
+)
+
+
+def column_converter(column) -> Callable[[Any], Any]:
+    """
+    Function converting a value read from a file to the python type of column.
+    An empty string is NULL, except for string columns. It raises ValueError for an invalid value.
+    :param column:
+    :return: function
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = None
+
+    convert = None
+    for converter_type, converter in _CONVERTERS:
+        if python_type is not None and issubclass(python_type, converter_type):
+            convert = converter
+            break
+
+    is_string = convert is str
+    length = getattr(column.type, "length", None) if is_string else None
+
+    def _convert(value):
+        if value is None or (value == "" and not is_string):
+            if not column.nullable:
+                raise ValueError(f"{column.key} is required")
+            return None
+
+        if convert is not None:
+            try:
+                value = convert(value)
+            except (TypeError, ValueError) as error:
+                raise ValueError(f"{column.key}: {error}")
+
+        if length is not None and len(value) > length:
+            raise ValueError(f"{column.key}: longer than {length} characters")
+
+        return value
+
+    return _convert
+
+
+def _records(file, format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    (line number, raw record) of the file: a dict for csv, the line for jsonl
+    """
+    if format == "csv":
+        reader = csv.DictReader(file, restkey=_REST_KEY)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(file, 1):
+            if line.strip():
+                yield line_number, line.rstrip("\r\n")
+
+
+def _parse(raw, format: str) -> Dict:
+    if format == "csv":
+        if _REST_KEY in raw:
+            raise ValueError("more values than columns")
+        return raw
+
+    record = json.loads(raw)
+    if not isinstance(record, dict):
+        raise ValueError("a line must hold a JSON object")
+
+    return record
+
+
+def _copy_value(value) -> str:
+    """
+    Value in the text format of COPY: \\N for NULL, backslash escaped
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        value = "t" if value else "f"
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, bytes):
+        value = "\\x" + value.hex()
+    else:
+        value = str(value)
+
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class _Loader:
+    """
+    Insert chunks of rows, by COPY FROM STDIN on PostgreSQL (psycopg2) and executemany elsewhere.
+    Each chunk runs in a SAVEPOINT: when it fails, its rows are inserted one by one to find the bad ones.
+    """
+
+    def __init__(self, session: Session, table, columns: List):
+        self.session = session
+        self.table = table
+        self.columns = columns
+        bind = session.get_bind()
+        self.use_copy = (
+            bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+        )
+        # COPY goes through the DBAPI cursor, its errors are not wrapped by sqlalchemy
+        self.errors = (SQLAlchemyError, bind.dialect.dbapi.Error)
+
+    def load(self, chunk: List[Tuple[int, Any, Dict]]) -> List[Tuple[int, Any, str]]:
+        """
+        :param chunk: (line number, raw record, values) of the rows
+        :return: (line number, raw record, error) of the rows which couldn't be inserted
+        """
+        try:
+            with self.session.begin_nested():
+                self._insert([values for _, _, values in chunk])
+            return []
+        except self.errors as error:
+            if len(chunk) == 1:
+                line_number, raw, _ = chunk[0]
+                return [(line_number, raw, str(getattr(error, "orig", error)))]
+
+        failures = []
+        for line_number, raw, values in chunk:
+            try:
+                with self.session.begin_nested():
+                    self.session.execute(insert(self.table), values)
+            except self.errors as error:
+                failures.append((line_number, raw, str(getattr(error, "orig", error))))
+
+        return failures
+
+    def _insert(self, rows: List[Dict]) -> None:
+        if not self.use_copy:
+            self.session.execute(insert(self.table), rows)
+            return
+
+        keys = [column.key for column in self.columns]
+        buffer = io.StringIO(
+            "".join(
+                "\t".join(_copy_value(row[key]) for key in keys) + "\n" for row in rows
+            )
+        )
+
+        preparer = self.session.get_bind().dialect.identifier_preparer
+        statement = "COPY {} ({}) FROM STDIN".format(
+            preparer.format_table(self.table),
+            ", ".join(preparer.quote(column.name) for column in self.columns),
+        )
+        cursor = self.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        finally:
+            cursor.close()
+
+
+def import_rows(
+    session: Session,
+    model,
+    input,
+    format: str = "csv",
+    mapping: Union[Dict[str, str], None] = None,
+    chunk_size: int = 1000,
+    progress: Union[Callable[[ImportStats], Any], None] = None,
+    quarantine=None,
+) -> ImportStats:
+    """
+    Parse, validate and insert the records of a file chunk by chunk in the transaction of session,
+    which the caller commits. Invalid records are written to quarantine instead of stopping the load.
+    :param session:
+    :param model:
+    :param input: path, binary or text file
+    :param format: csv (with a header line) or jsonl (one JSON object per line)
+    :param mapping: source field -> model column, the other source fields are ignored.
+    Without mapping, the columns are the csv header, or the keys of the first JSON line.
+    :param chunk_size: rows inserted at once
+    :param progress: called with the ImportStats so far after each chunk
+    :param quarantine: path, binary or text file, receiving a JSON line per rejected record:
+    {"line": 12, "error": "...", "record": ...}
+    :return: ImportStats
+    """
+    if format not in IMPORT_FORMATS:
+        raise ValueError(
+            f"Unknown import format {format}, expected one of {IMPORT_FORMATS}"
+        )
+
+    if isinstance(input, (str, os.PathLike)):
+        with open(input, encoding="utf-8", newline="") as file:
+            return import_rows(
+                session, model, file, format, mapping, chunk_size, progress, quarantine
+            )
+    if isinstance(quarantine, (str, os.PathLike)):
+        with open(quarantine, "wb") as file:
+            return import_rows(
+                session, model, input, format, mapping, chunk_size, progress, file
+            )
+    if not isinstance(input, io.TextIOBase):
+        wrapper = io.TextIOWrapper(input, encoding="utf-8", newline="")
+        try:
+            return import_rows(
+                session,
+                model,
+                wrapper,
+                format,
+                mapping,
+                chunk_size,
+                progress,
+                quarantine,
+            )
+        finally:
+            wrapper.detach()
+
+    columns_by_attr = model_registry.metadata(model).columns_by_attr
+    dumps = json_dumps()
+    write_quarantine = stream_writer(quarantine) if quarantine is not None else None
+    table = inspect(model).local_table
+    loader = converters = None
+    chunk: List[Tuple[int, Any, Dict]] = []
+    rows_read = rows_loaded = rows_failed = 0
+    started_at = time.perf_counter()
+
+    def reject(failures: List[Tuple[int, Any, str]]) -> None:
+        nonlocal rows_failed
+        rows_failed += len(failures)
+        if write_quarantine is not None and failures:
+            write_quarantine(
+                b"".join(
+                    dumps({"line": line_number, "error": error, "record": raw}) + b"\n"
+                    for line_number, raw, error in failures
+                )
+            )
+
+    def flush() -> None:
+        nonlocal rows_loaded
+        failures = loader.load(chunk)
+        rows_loaded += len(chunk) - len(failures)
+        reject(failures)
+        chunk.clear()
+
+        if progress is not None:
+            progress(current_stats())
+
+    def current_stats() -> ImportStats:
+        return ImportStats(
+            rows_read, rows_loaded, rows_failed, time.perf_counter() - started_at
+        )
+
+    for line_number, raw in _records(input, format):
+        rows_read += 1
+        try:
+            record = _parse(raw, format)
+        except ValueError as error:
+            reject([(line_number, raw, str(error))])
+            continue
+
+        if converters is None:
+            fields = mapping or {field: field for field in record}
+            unknown = set(fields.values()) - set(columns_by_attr)
+            if unknown:
+                raise ValueError(
+                    f"{sorted(unknown)} are not columns of {model.__name__}"
+                )
+
+            converters = {
+                field: (key, column_converter(columns_by_attr[key]))
+                for field, key in fields.items()
+            }
+            loader = _Loader(
+                session, table, [columns_by_attr[key] for key in fields.values()]
+            )
+
+        try:
+            if mapping is None:
+                unknown = set(record) - set(converters)
+                if unknown:
+                    raise ValueError(f"unknown fields {sorted(unknown)}")
+
+            values = {
+                columns_by_attr[key].key: convert(record.get(field))
+                for field, (key, convert) in converters.items()
+            }
+        except ValueError as error:
+            reject([(line_number, raw, str(error))])
+            continue
+
+        chunk.append((line_number, raw, values))
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+
+    return current_stats()
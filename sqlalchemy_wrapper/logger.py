@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import itertools
 import logging
 from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import Union
 
 from jsonformatter import JsonFormatter
 
@@ -28,3 +34,89 @@ json_handler.setFormatter(formatter)
 
 logger.addHandler(json_handler)
 logger.setLevel(logging.INFO)
+
+
+class QueryLogConfig:
+    """
+    How queries and their results are logged on the hot path.
+    sample_rate: log 1 query in sample_rate
+    max_length: rendered SQL and payloads are truncated beyond this many characters
+    """
+
+    def __init__(
+        self, enabled: bool = True, sample_rate: int = 1, max_length: int = 2000
+    ):
+        self.enabled = enabled
+        self.sample_rate = max(sample_rate, 1)
+        self.max_length = max_length
+        self._counter = itertools.count()
+
+    def should_log(self, level: int) -> bool:
+        """
+        Cheap check made before rendering anything for a query log line
+        :param level: logging level of the line
+        :return: bool
+        """
+        if not self.enabled or not logger.isEnabledFor(level):
+            return False
+
+        return self.sample_rate == 1 or next(self._counter) % self.sample_rate == 0
+
+
+query_log_config = QueryLogConfig()
+
+
+def configure_query_logging(
+    enabled: bool = True, sample_rate: int = 1, max_length: int = 2000
+) -> None:
+    query_log_config.enabled = enabled
+    query_log_config.sample_rate = max(sample_rate, 1)
+    query_log_config.max_length = max_length
+
+
+def should_log_query(level: int) -> bool:
+    return query_log_config.should_log(level)
+
+
+def truncate(text: str, max_length: Union[int, None] = None) -> str:
+    max_length = query_log_config.max_length if max_length is None else max_length
+    if max_length and len(text) > max_length:
+        return f"{text[:max_length]}... ({len(text) - max_length} more characters)"
+
+    return text
+
+
+def truncate_payload(items: Iterable, max_length: Union[int, None] = None) -> List[str]:
+    """
+    Stringify items until max_length characters have been rendered, the rest is only counted
+    :param items:
+    :param max_length:
+    :return: List
+    """
+    max_length = query_log_config.max_length if max_length is None else max_length
+    rendered = []
+    budget = max_length
+    items = list(items)
+
+    for index, item in enumerate(items):
+        if max_length and budget <= 0:
+            rendered.append(f"... ({len(items) - index} more)")
+            break
+
+        text = truncate(str(item), budget or None)
+        budget -= len(text)
+        rendered.append(text)
+
+    return rendered
+
+
+class LazyStr:
+    """
+    Defer an expensive rendering to the moment the log record is actually formatted
+    """
+
+    def __init__(self, render: Callable[[], Any]):
+        self.render = render
+
+    def __str__(self):
+        return truncate(str(self.render()))
@@ -1,26 +1,69 @@
 from __future__ import annotations
 
-from typing import Dict, Type
+from logging import DEBUG
+from logging import INFO
+from typing import Any
+from typing import Callable
+from typing import Dict
 from typing import List
 from typing import Tuple
+from typing import Type
 from typing import Union
 
-from sqlalchemy.inspection import inspect
-from sqlalchemy.orm import declarative_base, DeclarativeMeta
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy import tuple_
+from sqlalchemy import update
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import ColumnProperty
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import DeclarativeMeta
 
-from easy_sqla.context import DBContext
-from easy_sqla.db.operators import And
-from easy_sqla.db.operators import Or
-from easy_sqla.db.query import BaseQueryBuilder
-from easy_sqla.db.selector import CompositePK
-from easy_sqla.db.settings import DBSettings
-from easy_sqla.logger import logger as logging
-from easy_sqla.utils import _lookup_model_foreign_key
-from easy_sqla.utils import get_primary_key
+from sqlalchemy_wrapper.context import AsyncDBContext
+from sqlalchemy_wrapper.context import DBContext
+from sqlalchemy_wrapper.db.aggregates import Aggregate
+from sqlalchemy_wrapper.db.operators import And
+from sqlalchemy_wrapper.db.operators import BooleanOperator
+from sqlalchemy_wrapper.db.pagination import decode_cursor
+from sqlalchemy_wrapper.db.pagination import encode_cursor
+from sqlalchemy_wrapper.db.pagination import keyset_order_by
+from sqlalchemy_wrapper.db.pagination import keyset_predicate
+from sqlalchemy_wrapper.db.pagination import Page
+from sqlalchemy_wrapper.db.query import BaseQueryBuilder
+from sqlalchemy_wrapper.db.queryset import QuerySet
+from sqlalchemy_wrapper.db.selector import CompositePK
+from sqlalchemy_wrapper.db.settings import DBSettings
+from sqlalchemy_wrapper.db.settings import DriverEnum
+from sqlalchemy_wrapper.db.settings import MAX_BIND_PARAMS
+from sqlalchemy_wrapper.db.settings import ToManyStrategyEnum
+from sqlalchemy_wrapper.db.template import FilterTemplate
+from sqlalchemy_wrapper.db.upsert import build_upsert
+from sqlalchemy_wrapper.db.upsert import UpsertResult
+from sqlalchemy_wrapper.export import check_format
+from sqlalchemy_wrapper.export import export_rows
+from sqlalchemy_wrapper.export import ExportStats
+from sqlalchemy_wrapper.importer import import_rows
+from sqlalchemy_wrapper.importer import ImportStats
+from sqlalchemy_wrapper.logger import logger as logging
+from sqlalchemy_wrapper.logger import should_log_query
+from sqlalchemy_wrapper.logger import truncate
+from sqlalchemy_wrapper.logger import truncate_payload
+from sqlalchemy_wrapper.registry import model_registry
+from sqlalchemy_wrapper.serializer import ModelSerializer
+from sqlalchemy_wrapper.serializer import serializer_for
+from sqlalchemy_wrapper.utils import _lookup_model_foreign_key
+from sqlalchemy_wrapper.utils import get_primary_key
+from sqlalchemy_wrapper.utils import is_integer_column
 
 
 class Manager:
     db_context: DBContext
+    async_db_context: AsyncDBContext
+    # Cache the results of filter, see db.cache.ResultCache
+    __cache_results__: bool = False
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -37,33 +80,46 @@ class Manager:
     def set_db_context(cls, context: DBContext):
         cls.db_context = context
 
+    @classmethod
+    def set_async_db_context(cls, context: AsyncDBContext):
+        """
+        Enable the asyncio methods (afilter, acreate, ...) of the models
+        Ex:
+            Manager.set_async_db_context(AsyncDBContext(settings))
+        """
+        cls.async_db_context = context
+
     @classmethod
     def get_simple_column(cls):
         """
         Simple mapper that return field of the model without relationship
         :return:
         """
-        return [col.key for col in inspect(cls).mapper.column_attrs]
+        return model_registry.metadata(cls).column_keys
 
     @classmethod
     def as_base_model(cls, settings: DBSettings):
         cls.set_db_context(DBContext(settings))
         return declarative_base(cls=cls)
 
-    def as_json(self, include_rel: bool):
+    @classmethod
+    def serializer(cls) -> ModelSerializer:
         """
-        Convert primary field of the object to json, that can be sent back to a request
+        Serializer of the model, to convert many objects at once or write them as JSON Lines
+        Ex:
+            User.serializer().dump_many(User.filter(first_name="john"), include_rel=2)
+            User.serializer().write_jsonl(User.iter_filter(first_name="john"), output)
+        :return: ModelSerializer
+        """
+        return serializer_for(cls)
+
+    def as_json(self, include_rel: Union[bool, int] = False):
+        """
+        Convert the columns of the object to json, that can be sent back to a request
+        :param include_rel: serialize the relationships too, to this depth when an int (True is 1)
         :return: dict
         """
-        result = {}
-        [
-            result.update({col: getattr(self, col)})
-            for col in self.get_class().get_simple_column()
-        ]
-        if include_rel:
-            # TODO: Implement the method in the next release
-            pass
-        return result
+        return serializer_for(type(self)).dump(self, include_rel)
 
     @classmethod
     def create(cls, **values):
@@ -72,21 +128,33 @@ class Manager:
         :param values:
         :return: The instance of the cls
         """
-        logging.info(
-            f"Adding object {cls} to db",
-            extra={
-                "data": values,
-            },
-        )
+        # sampled once for the whole creation, the objects are only rendered when the lines are emitted
+        log = should_log_query(INFO)
+        if log:
+            logging.info(
+                "Adding object %s to db",
+                cls,
+                extra={
+                    "data": truncate_payload(
+                        f"{key}={value!r}" for key, value in values.items()
+                    ),
+                },
+            )
         values = cls.get_foreign_model_creation_data(values)
         obj = cls(**values)
-        logging.info(f"{cls} is being add to the DB", extra={"objects": [str(obj)]})
+        if log:
+            logging.info(
+                "%s is being add to the DB",
+                cls,
+                extra={"objects": [truncate(str(obj))]},
+            )
         cls.db_context.session.add(obj)
 
         if cls.db_context.settings.get("auto_commit"):
             cls.db_context.session.commit()
 
-        logging.info(f"{obj} added with success")
+        if log:
+            logging.info("%s added with success", truncate(str(obj)))
 
         return obj
 
@@ -126,67 +194,546 @@ class Manager:
                     objekt = remote_field_model.get_by_pks(int(field_value))
 
                 if len(objekt.pks) > 1:
-                    raise NotImplemented("Multiple primary key relation object creation not supported yet.")
+                    raise NotImplemented(
+                        "Multiple primary key relation object creation not supported yet."
+                    )
 
                 data.update({field_name: list(objekt.pks.values())[0]})
 
         return data
 
     @classmethod
-    def create_multiple(cls, data_collections: Union[List[Dict], Tuple[Dict]]) -> None:
+    def create_multiple(
+        cls,
+        data_collections: Union[List[Dict], Tuple[Dict]],
+        chunk_size: Union[int, None] = None,
+        return_pks: bool = False,
+    ) -> Union[List, None]:
         """
-        Add the same time, multiple instance of the current model
+        Add the same time, multiple instance of the current model.
+        Rows are inserted with Core executemany by chunks, without building any ORM object.
+        As in create, a foreign key field can hold the payload of a new related object (dict) or the primary key
+        of an existing one (int, str or CompositePK). They are resolved for the whole batch at once: one bulk insert
+        or one select per related model.
+        The rows setting a relationship (or any attribute which isn't a column) are created as ORM objects instead,
+        as create does. The rows are committed when auto_commit is set, as in create.
         :param data_collections:
-        :return:
+        :param chunk_size: rows sent per statement, default to DBSettings.bulk_chunk_size
+        :param return_pks: return the primary keys of the new rows, in the order of data_collections.
+        They come from RETURNING when the dialect supports it with executemany, otherwise rows missing
+        their primary key are inserted one by one.
+        :return: List of primary keys (a tuple for composite keys) if return_pks else None
         """
-        if data_collections:
-            obj_collections = list(map(lambda data: cls(**data), data_collections))
-            cls.db_context.session.bulk_save_objects(obj_collections)
-        else:
+        if not data_collections:
             logging.info("No data to add")
+            return [] if return_pks else None
+
+        session = cls.db_context.session
+        pks = cls._create_multiple(
+            session,
+            data_collections,
+            chunk_size or cls.db_context.settings.get("bulk_chunk_size"),
+            return_pks,
+        )
+
+        if cls.db_context.settings.get("auto_commit"):
+            session.commit()
+
+        return pks if return_pks else None
+
+    @classmethod
+    def _create_multiple(
+        cls, session, data_collections, chunk_size: int, return_pks: bool
+    ) -> List:
+        metadata = model_registry.metadata(cls)
+        # relationships, synonyms... are only understood by the ORM objects
+        orm_fields = set(metadata.attrs).difference(metadata.columns_by_attr)
+        orm_indexes = [
+            index
+            for index, data in enumerate(data_collections)
+            if orm_fields.intersection(data)
+        ]
+        if not orm_indexes:
+            rows = cls._resolve_foreign_models(
+                session, [dict(data) for data in data_collections], chunk_size
+            )
+            return cls._bulk_insert(session, rows, chunk_size, return_pks)
+
+        logging.info(
+            "%s rows of %s set relationships, they are created as ORM objects",
+            len(orm_indexes),
+            cls.__name__,
+        )
+        orm_pks = cls._create_objects(
+            session, [data_collections[index] for index in orm_indexes]
+        )
+        bulk_indexes = sorted(set(range(len(data_collections))) - set(orm_indexes))
+        bulk_pks = []
+        if bulk_indexes:
+            rows = cls._resolve_foreign_models(
+                session,
+                [dict(data_collections[index]) for index in bulk_indexes],
+                chunk_size,
+            )
+            bulk_pks = cls._bulk_insert(session, rows, chunk_size, return_pks)
+
+        if not return_pks:
+            return []
+
+        pks: List = [None] * len(data_collections)
+        for indexes, new_pks in ((orm_indexes, orm_pks), (bulk_indexes, bulk_pks)):
+            for index, pk in zip(indexes, new_pks):
+                pks[index] = pk
+
+        return pks
+
+    @classmethod
+    def _create_objects(cls, session, data_collections) -> List:
+        """
+        Create the rows as ORM objects, like create, and flush them
+        :return: primary keys of the new objects (a tuple for composite keys)
+        """
+        columns_by_attr = model_registry.metadata(cls).columns_by_attr
+        objects = []
+        for data in data_collections:
+            # only the foreign key columns take payloads or primary keys, the relationships take objects
+            values = cls.get_foreign_model_creation_data(
+                {key: value for key, value in data.items() if key in columns_by_attr}
+            )
+            values.update(
+                (key, value)
+                for key, value in data.items()
+                if key not in columns_by_attr
+            )
+            objects.append(cls(**values))
+        session.add_all(objects)
+        session.flush()
+
+        pks = [inspect(obj).identity for obj in objects]
+        return [pk[0] if len(pk) == 1 else tuple(pk) for pk in pks]
+
+    @classmethod
+    def _resolve_foreign_models(
+        cls, session, rows: List[Dict], chunk_size: int
+    ) -> List[Dict]:
+        """
+        Batch version of get_foreign_model_creation_data: replace, in every row, the related payloads by the
+        primary key of the object created for them and check that the related primary keys exist.
+        :param session:
+        :param rows:
+        :param chunk_size:
+        :return: rows keyed by column key
+        """
+        columns_by_attr = model_registry.metadata(cls).columns_by_attr
+        fields = {field for row in rows for field in row}
+
+        unknown_fields = fields.difference(columns_by_attr)
+        if unknown_fields:
+            raise TypeError(
+                f"{sorted(unknown_fields)} are not columns of {cls.__name__}"
+            )
+
+        for field_name in fields:
+            remote_field_model = _lookup_model_foreign_key(columns_by_attr[field_name])
+            if not remote_field_model:
+                continue
+
+            remote_metadata = model_registry.metadata(remote_field_model)
+            if len(remote_metadata.primary_key_names) > 1:
+                raise NotImplementedError(
+                    "Multiple primary key relation object creation not supported yet."
+                )
+            pk_name = remote_metadata.primary_key_names[0]
+            pk_column = remote_metadata.primary_key_columns[0]
+
+            payloads = [
+                (row, row[field_name])
+                for row in rows
+                if isinstance(row.get(field_name), dict)
+                and not isinstance(row[field_name], CompositePK)
+            ]
+            if payloads:
+                logging.info(
+                    f"Remote field detected: {remote_field_model.__name__}. "
+                    f"Creating {len(payloads)} new {remote_field_model.__name__} objects"
+                )
+                created_pks = remote_field_model._create_multiple(
+                    session, [payload for _, payload in payloads], chunk_size, True
+                )
+                for (row, _), pk in zip(payloads, created_pks):
+                    row[field_name] = pk
+
+            references = {}
+            for row in rows:
+                value = row.get(field_name)
+                if isinstance(value, CompositePK):
+                    value = value[pk_name]
+                elif isinstance(value, str) and is_integer_column(pk_column):
+                    value = int(value)
+                elif not isinstance(value, (str, int)):
+                    continue
+
+                row[field_name] = value
+                references[value] = True
+
+            references = list(references)
+            found = set()
+            for start in range(0, len(references), chunk_size):
+                found.update(
+                    session.execute(
+                        select(pk_column).where(
+                            pk_column.in_(references[start : start + chunk_size])
+                        )
+                    ).scalars()
+                )
+
+            missing = [value for value in references if value not in found]
+            if missing:
+                raise ValueError(
+                    f"No {remote_field_model.__name__} found for {field_name}: {missing}"
+                )
+
+        return [
+            {columns_by_attr[field].key: value for field, value in row.items()}
+            for row in rows
+        ]
+
+    @classmethod
+    def _bulk_insert(
+        cls, session, rows: List[Dict], chunk_size: int, return_pks: bool
+    ) -> List:
+        """
+        Insert rows (keyed by column key) by chunks with executemany
+        :return: primary keys of the rows if return_pks else an empty list
+        """
+        metadata = model_registry.metadata(cls)
+        table = inspect(cls).local_table
+        pk_keys = [column.key for column in metadata.primary_key_columns]
+        returning = (
+            return_pks and session.get_bind().dialect.insert_executemany_returning
+        )
+        pks: List = [None] * len(rows) if return_pks else []
+
+        for start in range(0, len(rows), chunk_size):
+            # executemany needs the same keys on every row
+            groups: Dict[frozenset, List[int]] = {}
+            for index in range(start, min(start + chunk_size, len(rows))):
+                groups.setdefault(frozenset(rows[index]), []).append(index)
+
+            for keys, indexes in groups.items():
+                group = [rows[index] for index in indexes]
+
+                if not return_pks:
+                    session.execute(insert(table), group)
+                    continue
+
+                if keys.issuperset(pk_keys):
+                    session.execute(insert(table), group)
+                    new_pks = [tuple(row[key] for key in pk_keys) for row in group]
+                elif returning:
+                    new_pks = session.execute(
+                        insert(table).returning(*metadata.primary_key_columns), group
+                    ).all()
+                else:
+                    new_pks = [
+                        session.execute(insert(table), row).inserted_primary_key
+                        for row in group
+                    ]
+
+                for index, pk in zip(indexes, new_pks):
+                    pks[index] = pk[0] if len(pk_keys) == 1 else tuple(pk)
+
+        return pks
 
     @classmethod
-    def all(cls):
-        return cls.db_context.session.query(cls).all()
+    def import_file(
+        cls,
+        input,
+        format: str = "csv",
+        mapping: Union[Dict[str, str], None] = None,
+        chunk_size: Union[int, None] = None,
+        progress: Union[Callable[[ImportStats], Any], None] = None,
+        quarantine=None,
+    ) -> ImportStats:
+        """
+        Load a csv / JSON Lines file into the table, without building ORM objects. The file is parsed as a stream,
+        each value is converted and validated against the type of its column, then the rows are inserted by chunks:
+        COPY FROM STDIN on PostgreSQL, executemany elsewhere, all in one transaction.
+        A record which can't be parsed, converted or inserted is written to quarantine and the load goes on.
+        Ex:
+            User.import_file("users.csv", mapping={"First name": "first_name"}, quarantine="rejected.jsonl")
+        :param input: path, binary or text file
+        :param format: csv (with a header line) or jsonl (one JSON object per line)
+        :param mapping: source field -> model column, the other source fields are ignored.
+        Without mapping, the columns are the csv header, or the keys of the first JSON line.
+        :param chunk_size: rows inserted at once, default to DBSettings.bulk_chunk_size
+        :param progress: called with the ImportStats so far after each chunk
+        :param quarantine: path or file receiving a JSON line per rejected record: {"line", "error", "record"}
+        :return: ImportStats
+        """
+        session = cls.db_context.session
+        try:
+            stats = import_rows(
+                session,
+                cls,
+                input,
+                format,
+                mapping,
+                chunk_size or cls.db_context.settings.get("bulk_chunk_size"),
+                progress,
+                quarantine,
+            )
+        except Exception:
+            session.rollback()
+            raise
+
+        if cls.db_context.settings.get("auto_commit"):
+            session.commit()
+
+        logging.info(
+            f"{stats.rows_loaded} {cls.__name__} imported, {stats.rows_failed} rejected, "
+            f"{stats.rows_per_second:.0f} rows/s"
+        )
+        return stats
 
     @classmethod
-    def get_by_pks(cls, *args, **kwargs):
+    def upsert_many(
+        cls,
+        rows: Union[List[Dict], Tuple[Dict]],
+        conflict_on: Union[List[str], Tuple[str, ...]],
+        update_fields: Union[List[str], Tuple[str, ...], None] = None,
+        chunk_size: Union[int, None] = None,
+    ) -> UpsertResult:
         """
-        Used to get unique row by name:value or only by value
+        Insert rows, or update the ones which already exist, with INSERT ... ON CONFLICT DO UPDATE
+        (ON DUPLICATE KEY UPDATE on MySQL). Chunks are sized to stay under the bind parameters limit of the driver.
+        Ex:
+            House.upsert_many([{"label": "h1", "address": "..."}, ...], conflict_on=["label"], update_fields=["address"])
+
+        When several rows have the same conflict_on values, the last one wins.
+        :param rows:
+        :param conflict_on: fields of the unique constraint used to detect existing rows
+        :param update_fields: fields updated on existing rows, default to every field of the rows but conflict_on.
+        Pass an empty list to leave existing rows untouched
+        :param chunk_size: maximum rows per statement, default to DBSettings.bulk_chunk_size
+        :return: UpsertResult(inserted, updated)
         """
-        pks = get_primary_key(cls)
-        undefined_pks = set(pks.keys()).difference(kwargs.keys())
+        if not rows:
+            logging.info("No data to add")
+            return UpsertResult(0, 0)
+
+        driver = DriverEnum(cls.db_context.settings.get("driver"))
+        columns_by_attr = model_registry.metadata(cls).columns_by_attr
+        table = inspect(cls).local_table
+        session = cls.db_context.session
 
-        if len(pks) > 1:
-            if undefined_pks:
-                raise ValueError(f'While using this method, you should specify all pks to be sure at 100% to return only '
-                                 f'one row. Not defined {list(undefined_pks)}')
+        unknown_fields = (
+            {field for row in rows for field in row}
+            .union(conflict_on, update_fields or ())
+            .difference(columns_by_attr)
+        )
+        if unknown_fields:
+            raise TypeError(
+                f"{sorted(unknown_fields)} are not columns of {cls.__name__}"
+            )
+
+        for index, row in enumerate(rows):
+            missing_fields = [field for field in conflict_on if field not in row]
+            if missing_fields:
+                raise ValueError(
+                    f"Row {index} has no value for the conflict_on fields {missing_fields}"
+                )
+
+        conflict_columns = [columns_by_attr[field] for field in conflict_on]
+        unique_rows = {
+            tuple(row[field] for field in conflict_on): {
+                columns_by_attr[field].key: value for field, value in row.items()
+            }
+            for row in rows
+        }
+
+        # a multi-values insert needs the same keys on every row
+        groups: Dict[frozenset, List[Dict]] = {}
+        for row in unique_rows.values():
+            groups.setdefault(frozenset(row), []).append(row)
+
+        inserted = updated = 0
+        for keys, group in groups.items():
+            if update_fields is None:
+                update_keys = [
+                    key
+                    for key in keys
+                    if key not in {column.key for column in conflict_columns}
+                ]
+            else:
+                update_keys = [columns_by_attr[field].key for field in update_fields]
+
+            group_size = min(
+                chunk_size or cls.db_context.settings.get("bulk_chunk_size"),
+                max(MAX_BIND_PARAMS[driver] // len(keys), 1),
+            )
+            for start in range(0, len(group), group_size):
+                chunk = group[start : start + group_size]
+                stmt = build_upsert(
+                    driver,
+                    table,
+                    chunk,
+                    [column.key for column in conflict_columns],
+                    update_keys,
+                )
+
+                if driver == DriverEnum.POSTGRES:
+                    flags = session.execute(stmt).scalars().all()
+                    inserted += sum(flags)
+                    updated += len(flags) - sum(flags) if update_keys else 0
+                    continue
+
+                existing = cls._count_existing(session, conflict_columns, chunk)
+                session.execute(stmt)
+                inserted += len(chunk) - existing
+                updated += existing if update_keys else 0
+
+        if cls.db_context.settings.get("auto_commit"):
+            session.commit()
+
+        return UpsertResult(inserted, updated)
+
+    @staticmethod
+    def _count_existing(session, columns: List, rows: List[Dict]) -> int:
+        """
+        Count the rows whose values on columns are already in the table
+        """
+        if len(columns) == 1:
+            condition = columns[0].in_([row[columns[0].key] for row in rows])
         else:
-            # update the kwargs to set the value of the pk field
-            kwargs = dict(zip(pks.keys(), args))
-        return cls.get_one(**kwargs)
+            condition = tuple_(*columns).in_(
+                [tuple(row[column.key] for column in columns) for row in rows]
+            )
+
+        return session.execute(select(func.count()).where(condition)).scalar()
 
+    @classmethod
+    def all(cls, force_primary: bool = False):
+        """
+        :param force_primary: read from the primary even if replicas are set
+        """
+        with cls.db_context.replica_reads(force_primary) as session:
+            return session.query(cls).all()
+
+    @classmethod
+    def iter_all(cls, batch_size: Union[int, None] = None, expunge: bool = True):
+        """
+        Same as all, but stream the rows instead of loading them at once
+        :param batch_size: rows fetched per round trip, default to DBSettings.stream_batch_size
+        :param expunge: remove the objects from the session after each batch to keep memory flat
+        :return: Generator of instances
+        """
+        return cls._iter_query(cls.db_context.session.query(cls), batch_size, expunge)
+
+    @classmethod
+    def get_by_pks(cls, *args, force_primary: bool = False, **kwargs):
+        """
+        Used to get unique row by name:value or only by value.
+        The session identity map is looked up first, so that no SQL is emitted for an object already loaded.
+        Composite primary keys are given by name, or by value in the order of the table primary key.
+        :param force_primary: read from the primary even if replicas are set
+        """
+        with cls.db_context.replica_reads(force_primary) as session:
+            return session.get(cls, cls._pk_identity(*args, **kwargs))
 
+    @classmethod
+    def _pk_identity(cls, *args, **kwargs) -> Tuple:
+        """
+        Primary key values given to get_by_pks, in the order of the table primary key
+        """
+        pk_names = model_registry.metadata(cls).primary_key_names
+        kwargs.update(zip(pk_names, args))
+
+        undefined_pks = set(pk_names).difference(kwargs.keys())
+        if undefined_pks:
+            raise ValueError(
+                f"While using this method, you should specify all pks to be sure at 100% to return only "
+                f"one row. Not defined {list(undefined_pks)}"
+            )
+
+        return tuple(kwargs[name] for name in pk_names)
 
     @classmethod
-    def get_one(cls, **conditions):
+    def get_one(
+        cls,
+        force_primary: bool = False,
+        prefetch: Union[List[str], None] = None,
+        join_load: Union[List[str], None] = None,
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
+        **conditions,
+    ):
         """
         Return a single object from the db.
         Be aware. You'd better use this one to fetch data by only the primary key in order to be sure
         that the object is unique in database. Otherwise, an error will be thrown back
+        :param force_primary: read from the primary even if replicas are set
+        :param prefetch: relationship paths to load with the object, see filter
+        :param join_load: relationship paths to load with the object, see filter
+        :param to_many_strategy: see filter
         :param conditions: dict with condition
         :return:
         """
-        data = cls.filter(**conditions)
+        # Two rows are enough to know whether the result is unique
+        data = list(
+            cls.queryset(
+                force_primary=force_primary,
+                prefetch=prefetch,
+                join_load=join_load,
+                to_many_strategy=to_many_strategy,
+                **conditions,
+            )[:2]
+        )
         if data:
             if len(data) > 1:
                 raise ValueError(
                     "The conditions provided has returned multiple result. It's not allowed",
                 )
 
-            logging.debug(f"Found : {data[0]}")
+            logging.debug("Found : %s", data[0])
             return data[0]
 
+    @classmethod
+    def _query_builder(
+        cls,
+        bool_clause=None,
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
+        **conditions,
+    ) -> BaseQueryBuilder:
+        """
+        Build the filter of query.py in db, so that the caller can still refine the query
+        :param bool_clause: the operator used for filtering
+        :param to_many_strategy: see filter
+        :param conditions: Clause expression
+        :return: BaseQueryBuilder whose base_query is filtered
+        """
+
+        return cls._build_query(
+            cls.db_context.session, bool_clause, conditions, to_many_strategy
+        )
+
+    @classmethod
+    def _build_query(
+        cls,
+        session,
+        bool_clause,
+        conditions: Dict,
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
+    ) -> BaseQueryBuilder:
+        if not bool_clause or not isinstance(bool_clause, BooleanOperator):
+            bool_clause = And(**conditions)
+
+        query_build = BaseQueryBuilder(
+            cls, bool_clause, session, to_many_strategy=to_many_strategy
+        )
+        query_build.make_filter()
+
+        return query_build
+
     @classmethod
     def _filter(cls, bool_clause=None, **conditions):
         """
@@ -196,32 +743,480 @@ class Manager:
         :return: SQLAlchemy query.py object
         """
 
-        if not bool_clause or not isinstance(bool_clause, (Or, And)):
-            bool_clause = And(**conditions)
-
-        query_build = BaseQueryBuilder(cls, bool_clause, cls.db_context.session)
-        query = query_build.make_filter()
-
-        return query
+        return cls._query_builder(bool_clause, **conditions).base_query
 
     @classmethod
-    def filter(cls, bool_clause=And, **conditions):
+    def filter(
+        cls,
+        bool_clause=And,
+        force_primary: bool = False,
+        prefetch: Union[List[str], None] = None,
+        join_load: Union[List[str], None] = None,
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
+        **conditions,
+    ):
         """
         Dummy wrapper for filtering. For now use the default session of SQLAlchemy.
         :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param force_primary: read from the primary even if replicas are set
+        :param prefetch: relationship paths (ex: ["addresses", "houses__house"]) loaded by one
+        SELECT ... IN per relationship instead of one query per row
+        :param join_load: relationship paths loaded in the same query by a LEFT OUTER JOIN.
+        A relationship already joined by the filter is loaded from that join, so with the matching rows only.
+        :param to_many_strategy: how paths through one-to-many / many-to-many relationships are filtered:
+        by correlated EXISTS subqueries (default), or by JOIN (the rows matching several times are then
+        de-duplicated in python)
         :param conditions:
         :return:
         """
 
-        data = cls._filter(bool_clause, **conditions).all()
-        logging.debug(
-            f"{len(data)} {str(cls)} retrieved from database.",
-            extra={
-                "data_retrieved": list(map(str, data)),
-            },
+        data = list(
+            cls.queryset(
+                bool_clause,
+                force_primary=force_primary,
+                prefetch=prefetch,
+                join_load=join_load,
+                to_many_strategy=to_many_strategy,
+                **conditions,
+            )
         )
+        if should_log_query(DEBUG):
+            logging.debug(
+                f"{len(data)} {str(cls)} retrieved from database.",
+                extra={
+                    "data_retrieved": truncate_payload(data),
+                },
+            )
         return data
 
+    @classmethod
+    def queryset(
+        cls,
+        bool_clause=And,
+        force_primary: bool = False,
+        prefetch: Union[List[str], None] = None,
+        join_load: Union[List[str], None] = None,
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
+        **conditions,
+    ) -> QuerySet:
+        """
+        Lazy version of filter: nothing is run until the QuerySet is evaluated, and it can still be refined
+        Ex:
+            User.queryset(first_name="john").exclude(last_name="doe").order_by("-id")[:20]
+        :return: QuerySet
+        """
+        if not isinstance(bool_clause, BooleanOperator):
+            bool_clause = And(**conditions)
+
+        return QuerySet(
+            cls,
+            bool_clause,
+            force_primary=force_primary,
+            prefetch=prefetch or (),
+            join_load=join_load or (),
+            to_many_strategy=to_many_strategy,
+        )
+
+    @classmethod
+    def prepare(
+        cls,
+        bool_clause=And,
+        to_many_strategy: ToManyStrategyEnum = ToManyStrategyEnum.EXISTS,
+        **conditions,
+    ) -> FilterTemplate:
+        """
+        Resolve a filter once, with Param placeholders instead of values, to run it many times
+        Ex:
+            by_names = User.prepare(last_name__in=Param("names"), file__path__startswith=Param("path"))
+            by_names.run(names=["doe", "smith"], path="/var")
+        A Param of an in / not_in filter takes a list, whose length may change from a run to the other.
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param to_many_strategy: see filter
+        :param conditions: same filter syntax as filter(), values may be Param
+        :return: FilterTemplate
+        """
+        if not isinstance(bool_clause, BooleanOperator):
+            bool_clause = And(**conditions)
+
+        return FilterTemplate(cls, bool_clause, to_many_strategy)
+
+    @classmethod
+    def count(cls, bool_clause=And, force_primary: bool = False, **conditions) -> int:
+        """
+        Number of rows matching the filter, counted by the database instead of len(filter(...))
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param force_primary: read from the primary even if replicas are set
+        :param conditions:
+        :return: int
+        """
+        return cls.queryset(
+            bool_clause, force_primary=force_primary, **conditions
+        ).count()
+
+    @classmethod
+    def exists(cls, bool_clause=And, force_primary: bool = False, **conditions) -> bool:
+        """
+        Whether a row matches the filter, by SELECT 1 ... LIMIT 1
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param force_primary: read from the primary even if replicas are set
+        :param conditions:
+        :return: bool
+        """
+        return cls.queryset(
+            bool_clause, force_primary=force_primary, **conditions
+        ).exists()
+
+    @classmethod
+    def aggregate(cls, bool_clause=And, force_primary: bool = False, **kwargs) -> Dict:
+        """
+        Compute aggregates over the rows matching the filter, in the database.
+        Keyword arguments whose value is an Aggregate are computed, the others filter.
+        Ex:
+            User.aggregate(total=Sum("file__size"), users=Count("id"), first_name="john")
+            => {"total": 1024, "users": 3}
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param force_primary: read from the primary even if replicas are set
+        :param kwargs: aggregates and conditions
+        :return: dict keyed by the names of the aggregates
+        """
+        aggregates, conditions = cls._split_aggregates(kwargs)
+        return cls.queryset(
+            bool_clause, force_primary=force_primary, **conditions
+        ).aggregate(**aggregates)
+
+    @classmethod
+    def annotate(
+        cls, bool_clause=And, force_primary: bool = False, **kwargs
+    ) -> QuerySet:
+        """
+        Filter and compute an aggregate per row, grouped by primary key, set as attribute of the objects.
+        Keyword arguments whose value is an Aggregate are computed, the others filter.
+        Ex:
+            User.annotate(addresses_count=Count("addresses")).order_by("-addresses_count")[:10]
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param force_primary: read from the primary even if replicas are set
+        :param kwargs: aggregates and conditions
+        :return: QuerySet
+        """
+        aggregates, conditions = cls._split_aggregates(kwargs)
+        return cls.queryset(
+            bool_clause, force_primary=force_primary, **conditions
+        ).annotate(**aggregates)
+
+    @staticmethod
+    def _split_aggregates(kwargs: Dict) -> Tuple[Dict, Dict]:
+        aggregates = {}
+        conditions = {}
+        for key, value in kwargs.items():
+            if isinstance(value, Aggregate):
+                aggregates[key] = value
+            else:
+                conditions[key] = value
+
+        return aggregates, conditions
+
+    @classmethod
+    def values(
+        cls, *fields: str, bool_clause=And, force_primary: bool = False, **conditions
+    ) -> List[Dict]:
+        """
+        Same as filter, but select only the given columns and return them as dicts, without building objects
+        Ex:
+            User.values("id", "file__path", first_name="john")
+            => [{"id": 1, "file__path": "/c/mnt"}, ...]
+        :param fields: column names or paths through relationships, every column of the model by default
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param force_primary: read from the primary even if replicas are set
+        :param conditions:
+        :return: List of dict keyed by field
+        """
+        fields = fields or model_registry.metadata(cls).column_keys
+        rows = cls._values_rows(fields, bool_clause, force_primary, conditions)
+        return [dict(zip(fields, row)) for row in rows]
+
+    @classmethod
+    def values_list(
+        cls,
+        *fields: str,
+        flat: bool = False,
+        bool_clause=And,
+        force_primary: bool = False,
+        **conditions,
+    ) -> List:
+        """
+        Same as values, but return tuples, or the values themselves with flat=True and a single field
+        Ex:
+            User.values_list("id", flat=True, first_name="john")
+            => [1, 4]
+        :param fields: column names or paths through relationships, every column of the model by default
+        :param flat:
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param force_primary: read from the primary even if replicas are set
+        :param conditions:
+        :return: List
+        """
+        if flat and len(fields) != 1:
+            raise TypeError("flat is only allowed with a single field")
+
+        fields = fields or model_registry.metadata(cls).column_keys
+        rows = cls._values_rows(fields, bool_clause, force_primary, conditions)
+        if flat:
+            return [row[0] for row in rows]
+
+        return [tuple(row) for row in rows]
+
+    @classmethod
+    def _values_rows(
+        cls, fields, bool_clause, force_primary: bool, conditions: Dict
+    ) -> List:
+        stmt, _ = cls._values_statement(fields, bool_clause, conditions)
+        with cls.db_context.replica_reads(force_primary) as session:
+            return session.execute(stmt).all()
+
+    @classmethod
+    def _values_statement(cls, fields, bool_clause, conditions: Dict) -> Tuple:
+        """
+        :return: the filtered SELECT of the fields, and their columns
+        """
+        query_builder = cls._query_builder(bool_clause, **conditions)
+        columns = []
+        for field in fields:
+            # outer join: a row without related row is kept, with None for the path
+            column = query_builder.resolve_column(field, isouter=True)
+            if not isinstance(getattr(column, "property", None), ColumnProperty):
+                raise InvalidRequestError(f"{field} is not a column of {cls.__name__}")
+
+            columns.append(column)
+
+        return query_builder.base_query.with_entities(*columns).statement, columns
+
+    @classmethod
+    def export(
+        cls,
+        output,
+        format: str = "csv",
+        fields: Union[List[str], None] = None,
+        chunk_size: Union[int, None] = None,
+        bool_clause=And,
+        force_primary: bool = False,
+        **conditions,
+    ) -> ExportStats:
+        """
+        Write the columns of the filtered rows to a file or a stream, chunk by chunk from a server side cursor,
+        without building objects: memory stays bounded whatever the number of rows.
+        Ex:
+            User.export("users.csv", fields=["id", "file__path"], file__item__content__contains="tag")
+        :param output: path, binary or text file, or socket
+        :param format: csv, jsonl or arrow (Arrow IPC stream, needs pyarrow)
+        :param fields: column names or paths through relationships, every column of the model by default
+        :param chunk_size: rows fetched and written at once, default to DBSettings.stream_batch_size
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param force_primary: read from the primary even if replicas are set
+        :param conditions:
+        :return: ExportStats, with the number of rows, bytes written and rows per second
+        """
+        check_format(format)
+        fields = tuple(fields or model_registry.metadata(cls).column_keys)
+        chunk_size = chunk_size or cls.db_context.settings.get("stream_batch_size")
+        stmt, columns = cls._values_statement(fields, bool_clause, conditions)
+
+        with cls.db_context.replica_reads(force_primary) as session:
+            result = session.execute(stmt, execution_options={"stream_results": True})
+            stats = export_rows(
+                result.partitions(chunk_size), fields, output, format, columns
+            )
+
+        logging.info(
+            f"{stats.rows} {cls.__name__} exported as {format}: {stats.bytes_written} bytes, "
+            f"{stats.rows_per_second:.0f} rows/s"
+        )
+        return stats
+
+    @classmethod
+    def iter_filter(
+        cls,
+        bool_clause=And,
+        batch_size: Union[int, None] = None,
+        expunge: bool = True,
+        **conditions,
+    ):
+        """
+        Same as filter, but stream the rows through a server side cursor (chunked fetch on SQLite)
+        instead of loading them at once
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param batch_size: rows fetched per round trip, default to DBSettings.stream_batch_size
+        :param expunge: remove the objects from the session after each batch to keep memory flat.
+        Changes made on an object after its batch is done are not tracked anymore.
+        :param conditions:
+        :return: Generator of instances
+        """
+        return cls._iter_query(
+            cls._filter(bool_clause, **conditions), batch_size, expunge
+        )
+
+    @classmethod
+    def _iter_query(cls, query, batch_size: Union[int, None], expunge: bool):
+        batch_size = batch_size or cls.db_context.settings.get("stream_batch_size")
+        session = cls.db_context.session
+        batch = []
+
+        for obj in query.execution_options(stream_results=True).yield_per(batch_size):
+            yield obj
+
+            if expunge:
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    cls._expunge(session, batch)
+
+        if expunge:
+            cls._expunge(session, batch)
+
+    @staticmethod
+    def _expunge(session, objects: List) -> None:
+        for obj in objects:
+            if obj in session:
+                session.expunge(obj)
+
+        objects.clear()
+
+    @classmethod
+    def update_where(
+        cls,
+        values: Dict,
+        bool_clause=And,
+        synchronize_session: Union[str, bool] = False,
+        **conditions,
+    ) -> int:
+        """
+        Update every row matching the filter with a single UPDATE statement, without loading them
+        Ex:
+            User.update_where({"last_name": "archived"}, file__path__startswith="/tmp")
+
+        :param values: fields to set on the matching rows
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param synchronize_session: how the objects already in the session are updated: False (not at all),
+        "fetch" or "evaluate" (only for filters without relationship path)
+        :param conditions: same filter syntax as filter()
+        :return: number of updated rows
+        """
+        stmt = update(cls).where(cls._where_clause(bool_clause, **conditions))
+        return cls._execute_write(stmt.values(values), synchronize_session)
+
+    @classmethod
+    def delete_where(
+        cls,
+        bool_clause=And,
+        synchronize_session: Union[str, bool] = False,
+        **conditions,
+    ) -> int:
+        """
+        Delete every row matching the filter with a single DELETE statement, without loading them
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param synchronize_session: how the objects already in the session are updated: False (not at all),
+        "fetch" or "evaluate" (only for filters without relationship path)
+        :param conditions: same filter syntax as filter()
+        :return: number of deleted rows
+        """
+        stmt = delete(cls).where(cls._where_clause(bool_clause, **conditions))
+        return cls._execute_write(stmt, synchronize_session)
+
+    @classmethod
+    def _where_clause(cls, bool_clause=None, **conditions):
+        """
+        Turn a filter into a WHERE clause on the table of the model only, for UPDATE / DELETE statements.
+        When the filter goes through relationships, the joins are moved in a subquery: pk IN (SELECT pk FROM (...))
+        The subquery is wrapped in a derived table, as MySQL can't select from the table being updated
+        :return: SQLAlchemy Expression
+        """
+        query_build = cls._query_builder(bool_clause, **conditions)
+        if not query_build.joins:
+            return query_build.base_query.whereclause
+
+        pk_columns = model_registry.metadata(cls).primary_key_columns
+        subquery = query_build.base_query.with_entities(*pk_columns).subquery()
+        matching_pks = select(*subquery.c)
+
+        if len(pk_columns) == 1:
+            return pk_columns[0].in_(matching_pks)
+
+        return tuple_(*pk_columns).in_(matching_pks)
+
+    @classmethod
+    def _execute_write(cls, stmt, synchronize_session: Union[str, bool]) -> int:
+        session = cls.db_context.session
+        result = session.execute(
+            stmt.execution_options(synchronize_session=synchronize_session)
+        )
+
+        if cls.db_context.settings.get("auto_commit"):
+            session.commit()
+
+        return result.rowcount
+
+    @classmethod
+    def paginate(
+        cls,
+        order_by: Union[List[str], Tuple[str, ...]] = (),
+        after: Union[str, None] = None,
+        limit: int = 50,
+        bool_clause=And,
+        **conditions,
+    ) -> Page:
+        """
+        Keyset (seek) pagination: instead of an OFFSET, each page starts strictly after the last row of the previous one,
+        so that every page costs the same whatever its position.
+        Ex:
+            page = User.paginate(order_by=["-last_name", "file__path"], limit=100, first_name__startswith="a")
+            next_page = User.paginate(order_by=["-last_name", "file__path"], after=page.next_cursor, limit=100, ...)
+
+        The primary key is appended to the ordering as a tie-breaker. NULL is sorted after every value (before them
+        in descending order), and the rows without related row of a relationship path are kept. The NOT NULL columns
+        are compared and ordered as is, so that an index on them serves the pages.
+        :param order_by: paths to order on, prefixed by "-" for descending order. Relationship paths are allowed
+        :param after: next_cursor of the previous page, None for the first page
+        :param limit: maximum number of items in the page, at least 1
+        :param bool_clause: operator to use by default when multiple kwargs are passed
+        :param conditions: same filter syntax as filter()
+        :return: Page(items, next_cursor)
+        """
+        if limit < 1:
+            raise ValueError(f"limit must be at least 1, got {limit}")
+
+        query_build = cls._query_builder(bool_clause, **conditions)
+
+        ordering = [(path.lstrip("-"), path.startswith("-")) for path in order_by]
+        ordered_paths = {path for path, _ in ordering}
+        ordering += [
+            (pk_name, False)
+            for pk_name in get_primary_key(cls)
+            if pk_name not in ordered_paths
+        ]
+        columns = []
+        for path, descending in ordering:
+            column = query_build.resolve_column(path, isouter=True)
+            # a relationship path is outer joined: it's NULL for the rows without related row
+            nullable = "__" in path or column.expression.nullable
+            columns.append((column, descending, nullable))
+
+        query = query_build.base_query
+        if after:
+            query = query.filter(
+                keyset_predicate(columns, decode_cursor(after, ordering))
+            )
+
+        rows = (
+            query.add_columns(*[column for column, _, __ in columns])
+            .order_by(*keyset_order_by(columns))
+            .limit(limit + 1)
+            .all()
+        )
+
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(list(rows[limit - 1])[1:], ordering)
+
+        return Page([row[0] for row in rows[:limit]], next_cursor)
+
     def get_class(self):
         """
         Return the class of the calling model
@@ -243,10 +1238,12 @@ class Manager:
         :param field_to_update: all fields that you want update in target model
         :return:
         """
+        self._set_fields(filter_none, field_to_update)
+        self.db_context.session.flush()
+
+    def _set_fields(self, filter_none: bool, field_to_update: Dict) -> None:
         if filter_none:
-            logging.debug(
-                f"Filtering None values in filter to get {self.__str__()} object",
-            )
+            logging.debug("Filtering None values in filter to get %s object", self)
             field_to_update = {
                 k: v for k, v in field_to_update.items() if v is not None
             }
@@ -261,4 +1258,152 @@ class Manager:
             logging.debug(f"Setting attribute {field}:{value}")
             setattr(self, field, value)
 
-        self.db_context.session.flush()
+    # asyncio API: same behaviour as the methods above, through Manager.async_db_context
+
+    @classmethod
+    async def afilter(cls, bool_clause=And, **conditions) -> List:
+        """
+        asyncio version of filter
+        """
+        stmt = cls._build_query(None, bool_clause, conditions).base_query.statement
+        result = await cls.async_db_context.session.execute(stmt)
+        return result.scalars().all()
+
+    @classmethod
+    async def aiter_filter(
+        cls,
+        bool_clause=And,
+        batch_size: Union[int, None] = None,
+        expunge: bool = True,
+        **conditions,
+    ):
+        """
+        asyncio version of iter_filter: stream the rows through a server side cursor
+        :return: AsyncGenerator of instances
+        """
+        batch_size = batch_size or cls.async_db_context.settings.get(
+            "stream_batch_size"
+        )
+        stmt = cls._build_query(None, bool_clause, conditions).base_query.statement
+        session = cls.async_db_context.session
+
+        result = await session.stream(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.scalars().partitions(batch_size):
+            for obj in partition:
+                yield obj
+
+            if expunge:
+                cls._expunge(session.sync_session, partition)
+
+    @classmethod
+    async def aget_one(cls, **conditions):
+        """
+        asyncio version of get_one
+        """
+        stmt = cls._build_query(None, None, conditions).base_query.statement
+        result = await cls.async_db_context.session.execute(stmt.limit(2))
+        data = result.scalars().all()
+        if data:
+            if len(data) > 1:
+                raise ValueError(
+                    "The conditions provided has returned multiple result. It's not allowed",
+                )
+
+            return data[0]
+
+    @classmethod
+    async def aget_by_pks(cls, *args, **kwargs):
+        """
+        asyncio version of get_by_pks
+        """
+        return await cls.async_db_context.session.get(
+            cls, cls._pk_identity(*args, **kwargs)
+        )
+
+    @classmethod
+    async def acreate(cls, **values):
+        """
+        asyncio version of create
+        """
+        values = await cls.aget_foreign_model_creation_data(values)
+        obj = cls(**values)
+        session = cls.async_db_context.session
+        session.add(obj)
+
+        if cls.async_db_context.settings.get("auto_commit"):
+            await session.commit()
+
+        return obj
+
+    @classmethod
+    async def aget_foreign_model_creation_data(cls, data: dict):
+        """
+        asyncio version of get_foreign_model_creation_data
+        """
+        for field_name, field_value in data.items():
+            remote_field_model: Type[DeclarativeMeta] = _lookup_model_foreign_key(
+                getattr(cls, field_name, None)
+            )
+            if not remote_field_model:
+                continue
+
+            if isinstance(field_value, CompositePK):
+                objekt = await remote_field_model.aget_by_pks(**field_value)
+            elif isinstance(field_value, dict):
+                objekt = await remote_field_model.acreate(**field_value)
+            elif isinstance(field_value, (str, int)):
+                objekt = await remote_field_model.aget_by_pks(int(field_value))
+            else:
+                continue
+
+            if len(objekt.pks) > 1:
+                raise NotImplementedError(
+                    "Multiple primary key relation object creation not supported yet."
+                )
+
+            data.update({field_name: list(objekt.pks.values())[0]})
+
+        return data
+
+    @classmethod
+    async def acreate_multiple(
+        cls,
+        data_collections: Union[List[Dict], Tuple[Dict]],
+        chunk_size: Union[int, None] = None,
+        return_pks: bool = False,
+    ) -> Union[List, None]:
+        """
+        asyncio version of create_multiple
+        """
+        if not data_collections:
+            logging.info("No data to add")
+            return [] if return_pks else None
+
+        settings = cls.async_db_context.settings
+        session = cls.async_db_context.session
+        pks = await session.run_sync(
+            lambda sync_session: cls._create_multiple(
+                sync_session,
+                data_collections,
+                chunk_size or settings.get("bulk_chunk_size"),
+                return_pks,
+            )
+        )
+
+        if settings.get("auto_commit"):
+            await session.commit()
+
+        return pks if return_pks else None
+
+    async def aupdate(self, filter_none=True, **field_to_update):
+        """
+        asyncio version of update
+        """
+        self._set_fields(filter_none, field_to_update)
+        await self.async_db_context.session.flush()
+
+    async def adelete(self) -> None:
+        """
+        asyncio version of delete
+        """
+        await self.async_db_context.session.delete(self)
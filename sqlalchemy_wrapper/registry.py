@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import FrozenSet
+from typing import Mapping
+from typing import NamedTuple
+from typing import Tuple
+from typing import Type
+from typing import Union
+from weakref import WeakKeyDictionary
+from weakref import WeakSet
+from weakref import WeakValueDictionary
+
+from sqlalchemy import Column
+from sqlalchemy import event
+from sqlalchemy import inspect
+from sqlalchemy import Table
+from sqlalchemy.orm import DeclarativeMeta
+from sqlalchemy.orm import Mapper
+from sqlalchemy.orm import RelationshipProperty
+
+
+class ModelMetadata(NamedTuple):
+    """
+    Introspection result of a mapped class, computed once after its mapper is configured
+    """
+
+    simple_attrs: Tuple
+    fk_attrs: Tuple
+    many_to_many_rel: Tuple
+    # get_model_attrs() view of the three tuples above
+    attrs_by_kind: Mapping[str, Tuple]
+    # keys of simple_attrs + fk_attrs, the attributes dive can follow as a foreign key
+    lookup_keys: FrozenSet[str]
+    attrs: Mapping
+    primary_keys: Mapping[str, Column]
+    primary_key_columns: Tuple[Column, ...]
+    # attribute names of primary_key_columns, in the same order
+    primary_key_names: Tuple[str, ...]
+    column_keys: Tuple[str, ...]
+    # attribute name -> column of the mapped table, for the Core statements
+    columns_by_attr: Mapping[str, Column]
+
+
+def build_model_metadata(mapper: Mapper) -> ModelMetadata:
+    """
+    Sort the attrs of a mapper as follows: (Simple_column, Foreign, MTM) and collect its keys
+    :param mapper:
+    :return: ModelMetadata
+    """
+    all_attrs = tuple(mapper.attrs)
+    many_to_many_rels = tuple(
+        attr for attr in all_attrs if getattr(attr, "secondary", None) is not None
+    )
+    fk_attrs = tuple(
+        attr
+        for attr in all_attrs
+        if getattr(attr, "secondary", None) is None
+        and isinstance(attr, RelationshipProperty)
+        or getattr(attr, "foreign_keys", None)
+    )
+    simple_attrs = tuple(
+        attr
+        for attr in all_attrs
+        if attr not in fk_attrs and attr not in many_to_many_rels
+    )
+
+    # column attributes only: relationships, synonyms and composites have no columns of their own
+    primary_keys = {
+        attr.key: attr.columns[0]
+        for attr in mapper.column_attrs
+        if attr.columns[0].primary_key
+    }
+
+    return ModelMetadata(
+        simple_attrs=simple_attrs,
+        fk_attrs=fk_attrs,
+        many_to_many_rel=many_to_many_rels,
+        attrs_by_kind=MappingProxyType(
+            OrderedDict(
+                [
+                    ("simple_attrs", simple_attrs),
+                    ("fk_attrs", fk_attrs),
+                    ("many_to_many_rel", many_to_many_rels),
+                ]
+            )
+        ),
+        lookup_keys=frozenset(attr.key for attr in simple_attrs + fk_attrs),
+        attrs=MappingProxyType({attr.key: attr for attr in all_attrs}),
+        primary_keys=MappingProxyType(primary_keys),
+        primary_key_columns=tuple(mapper.primary_key),
+        primary_key_names=tuple(
+            name
+            for column in mapper.primary_key
+            for name, pk_column in primary_keys.items()
+            if pk_column is column
+        ),
+        column_keys=tuple(attr.key for attr in mapper.column_attrs),
+        columns_by_attr=MappingProxyType(
+            {attr.key: attr.columns[0] for attr in mapper.column_attrs}
+        ),
+    )
+
+
+class ModelRegistry:
+    """
+    Index of mapped models by table name and by Table object.
+    It is filled by the mapper "instrument_class" event, so every mapped class is registered
+    whatever its depth in the class hierarchy. Abstract bases and mixins are never mapped, so never registered.
+    """
+
+    def __init__(self):
+        self._by_tablename: WeakValueDictionary = WeakValueDictionary()
+        self._by_table: WeakValueDictionary = WeakValueDictionary()
+        self._metadata: WeakKeyDictionary = WeakKeyDictionary()
+        self._pending_metadata: WeakSet = WeakSet()
+
+    def register(self, mapper: Mapper, class_: Type[DeclarativeMeta]) -> None:
+        """
+        Register a freshly mapped class.
+        Single table inheritance children share the table of their parent: the parent keeps the table.
+        :param mapper:
+        :param class_:
+        :return:
+        """
+        self._pending_metadata.add(class_)
+
+        if mapper.single:
+            return
+
+        table = mapper.local_table
+        self._by_table[table] = class_
+
+        tablename = getattr(table, "name", None)
+        if tablename:
+            self._by_tablename[tablename] = class_
+
+    def get_by_tablename(self, tablename: str) -> Union[Type[DeclarativeMeta], None]:
+        return self._by_tablename.get(tablename)
+
+    def get_by_table(self, table: Table) -> Union[Type[DeclarativeMeta], None]:
+        try:
+            return self._by_table.get(table) or self.get_by_tablename(table.name)
+        except (AttributeError, TypeError):
+            return None
+
+    def metadata(self, model) -> ModelMetadata:
+        """
+        Get the precomputed metadata of a model (or of an aliased model)
+        :param model:
+        :return: ModelMetadata
+        """
+        metadata = self._metadata.get(model)
+        if metadata is not None:
+            return metadata
+
+        mapper = inspect(model).mapper
+        metadata = self._metadata.get(mapper.class_)
+        if metadata is None:
+            metadata = build_model_metadata(mapper)
+            self._metadata[mapper.class_] = metadata
+
+        return metadata
+
+    def build_pending_metadata(self) -> None:
+        """
+        Compute the metadata of every class mapped since the last mapper configuration
+        :return:
+        """
+        for class_ in list(self._pending_metadata):
+            mapper = inspect(class_)
+            if mapper.configured:
+                self._metadata[class_] = build_model_metadata(mapper)
+                self._pending_metadata.discard(class_)
+
+    def clear(self) -> None:
+        self._by_tablename.clear()
+        self._by_table.clear()
+        self._metadata.clear()
+        self._pending_metadata.clear()
+
+
+model_registry = ModelRegistry()
+
+event.listen(Mapper, "instrument_class", model_registry.register)
+event.listen(Mapper, "after_configured", model_registry.build_pending_metadata)
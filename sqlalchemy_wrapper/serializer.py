@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import base64
+import datetime
+import decimal
+import enum
+import io
+import json
+import uuid
+from operator import attrgetter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Sequence
+from typing import Set
+from typing import Union
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import inspect
+
+from sqlalchemy_wrapper.registry import model_registry
+
+try:
+    import orjson
+except ImportError:  # optional, fast JSON backend of write_jsonl
+    orjson = None
+
+
+def json_default(value: Any):
+    """
+    JSON value of the column types the JSON encoders don't know
+    :param value:
+    :return: str
+    """
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_dumps(backend: str = "auto") -> Callable[[Any], bytes]:
+    """
+    :param backend: "json", "orjson", or "auto" for orjson when it's installed
+    :return: function encoding a value to JSON bytes
+    """
+    if backend == "auto":
+        backend = "json" if orjson is None else "orjson"
+
+    if backend == "orjson":
+        if orjson is None:
+            raise ValueError("The orjson backend needs the orjson package")
+
+        return lambda value: orjson.dumps(value, default=json_default)
+
+    if backend == "json":
+        encoder = json.JSONEncoder(default=json_default, separators=(",", ":"))
+        return lambda value: encoder.encode(value).encode()
+
+    raise ValueError(f"Unknown JSON backend {backend}")
+
+
+def stream_writer(output) -> Callable[[bytes], Any]:
+    """
+    :param output: binary or text file, or socket
+    :return: function writing bytes to output
+    """
+    if hasattr(output, "sendall"):  # socket
+        return output.sendall
+    if isinstance(output, io.TextIOBase):
+        return lambda data: output.write(data.decode())
+
+    return output.write
+
+
+class ModelSerializer:
+    """
+    Converter of the objects of a model to dicts. Its column accessors and relationships are resolved
+    once, get it with serializer_for(model) or Model.serializer().
+    Relationships are serialized to include_rel levels of depth. An object met again inside its own
+    serialization (user.addresses[0].user) only keeps its primary key.
+    Load the relationships with the rows (prefetch / join_load of filter) to avoid a query per object.
+    """
+
+    def __init__(self, model):
+        metadata = model_registry.metadata(model)
+        self.model = model
+        self.fields = metadata.column_keys
+        self.primary_key_names = metadata.primary_key_names
+        self.relationships = tuple(
+            (relationship.key, relationship.uselist)
+            for relationship in inspect(model).relationships
+        )
+
+        getter = attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            self._values = lambda obj: (getter(obj),)
+        else:
+            self._values = getter
+
+    def dump(self, obj, include_rel: Union[bool, int] = False) -> Dict:
+        """
+        :param obj:
+        :param include_rel: depth of the relationships to serialize, True is 1
+        :return: dict
+        """
+        return self._dump(obj, int(include_rel), set())
+
+    def dump_many(
+        self, objects: Iterable, include_rel: Union[bool, int] = False
+    ) -> List[Dict]:
+        """
+        Same as dump, for a list of objects
+        :return: List of dict
+        """
+        depth = int(include_rel)
+        if depth <= 0 or not self.relationships:
+            fields, values = self.fields, self._values
+            return [dict(zip(fields, values(obj))) for obj in objects]
+
+        return [self._dump(obj, depth, set()) for obj in objects]
+
+    def dump_rows(
+        self, rows: Iterable[Sequence], fields: Union[Sequence[str], None] = None
+    ) -> List[Dict]:
+        """
+        Convert row tuples, such as the rows of values_list or of session.execute, to dicts
+        :param rows:
+        :param fields: names of the values of a row, by default the keys of the rows or the model columns
+        :return: List of dict
+        """
+        data = []
+        for row in rows:
+            if fields is None:
+                fields = getattr(row, "_fields", None) or self.fields
+            data.append(dict(zip(fields, row)))
+
+        return data
+
+    def write_jsonl(
+        self,
+        items: Iterable,
+        output,
+        include_rel: Union[bool, int] = False,
+        backend: str = "auto",
+        batch_size: int = 1000,
+    ) -> int:
+        """
+        Write objects or row tuples as JSON Lines, one line per item, batch_size lines per write.
+        Pass an iterator (iter_filter) to stream rows which don't fit in memory.
+        :param items: objects of the model or row tuples
+        :param output: binary or text file, or socket
+        :param include_rel: see dump
+        :param backend: see json_dumps
+        :param batch_size:
+        :return: number of lines written
+        """
+        dumps = json_dumps(backend)
+        write = stream_writer(output)
+        depth = int(include_rel)
+        lines = []
+        count = 0
+
+        for item in items:
+            if isinstance(item, self.model):
+                data = self._dump(item, depth, set())
+            else:
+                data = dict(zip(getattr(item, "_fields", None) or self.fields, item))
+
+            lines.append(dumps(data))
+            if len(lines) >= batch_size:
+                write(b"\n".join(lines) + b"\n")
+                count += len(lines)
+                lines.clear()
+
+        if lines:
+            write(b"\n".join(lines) + b"\n")
+            count += len(lines)
+
+        return count
+
+    def _dump(self, obj, depth: int, path: Set[int]) -> Dict:
+        data = dict(zip(self.fields, self._values(obj)))
+        if depth <= 0 or not self.relationships:
+            return data
+
+        path.add(id(obj))
+        for key, uselist in self.relationships:
+            related = getattr(obj, key)
+            if uselist:
+                data[key] = [_dump_related(item, depth - 1, path) for item in related]
+            else:
+                data[key] = (
+                    None if related is None else _dump_related(related, depth - 1, path)
+                )
+        path.discard(id(obj))
+
+        return data
+
+
+def _dump_related(obj, depth: int, path: Set[int]) -> Dict:
+    serializer = serializer_for(type(obj))
+    if id(obj) in path:
+        return {name: getattr(obj, name) for name in serializer.primary_key_names}
+
+    return serializer._dump(obj, depth, path)
+
+
+_serializers: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def serializer_for(model) -> ModelSerializer:
+    """
+    Serializer of a model, built on first use
+    :param model:
+    :return: ModelSerializer
+    """
+    serializer = _serializers.get(model)
+    if serializer is None:
+        serializer = _serializers[model] = ModelSerializer(model)
+
+    return serializer
@@ -1,43 +1,41 @@
 from __future__ import annotations
 
 import logging
-from collections import OrderedDict
-from typing import Dict, Tuple
+from functools import lru_cache
+from typing import Dict
+from typing import Mapping
 from typing import Type
 
 from sqlalchemy import Column
 from sqlalchemy import inspect
 from sqlalchemy import Table
 from sqlalchemy.orm import DeclarativeMeta
-from sqlalchemy.orm import RelationshipProperty
 from sqlalchemy.orm.util import AliasedClass
 from sqlalchemy.sql.operators import ColumnOperators
 
+from sqlalchemy_wrapper.registry import model_registry
+
 
 def get_model_from_rel(relation_name: str):
     """
     Given a name of column that contains a relationship field (ForeignKeyRel),
     Make an introspection ang get the model that hold the field.
 
-    :param relation_name:
-    :return: List of model
+    :param relation_name: table name, optionally followed by the column name (table.column)
+    :return: The model mapped on the table or None
     """
 
-    from easy_sqla.manager import Manager
-
-    all_models = Manager.__subclasses__()[0].__subclasses__()
+    return model_registry.get_by_tablename(relation_name.split(".")[0])
 
-    table_name = relation_name.split(".")[0]
-    found = [
-        model
-        for model in all_models
-        if getattr(model, "__tablename__", None) == table_name
-    ]
 
-    if found:
-        return found.pop()
+def get_model_from_table(table: Table):
+    """
+    Same as get_model_from_rel, but from the Table object itself
+    :param table:
+    :return: The model mapped on the table or None
+    """
 
-    return
+    return model_registry.get_by_table(table)
 
 
 def get_aliased_model_attrs(aliased_model: AliasedClass, only_fk=False, only_pk=False):
@@ -62,43 +60,14 @@ def get_aliased_model_attrs(aliased_model: AliasedClass, only_fk=False, only_pk=
     return aliased_model_attrs
 
 
-def get_model_attrs(model) -> Dict:
+def get_model_attrs(model) -> Mapping:
     """
     get all attrs from a model sorted as follows: (Simple_column, Foreign, MTM)
     :param model:
-    :return: Dict
+    :return: read-only mapping of tuples, computed once per model
     """
 
-    inspection = inspect(model)
-    current_all_fields = set(
-        getattr(inspection, "attrs", None) or get_aliased_model_attrs(model),
-    )
-    many_to_many_rels = set(
-        filter(
-            lambda rel: getattr(rel, "secondary", None) is not None,
-            current_all_fields,
-        ),
-    )
-
-    fk_attrs = set(
-        filter(
-            lambda rel: getattr(rel, "secondary", None) is None
-            and isinstance(rel, RelationshipProperty)
-            or getattr(rel, "foreign_keys", None),
-            current_all_fields,
-        ),
-    )
-
-    # update current_available_field to remove many_to_many_rel field from it
-    simple_attrs = current_all_fields.difference(fk_attrs).difference(many_to_many_rels)
-
-    return OrderedDict(
-        {
-            "simple_attrs": list(simple_attrs),
-            "fk_attrs": list(fk_attrs),
-            "many_to_many_rel": list(many_to_many_rels),
-        },
-    )
+    return model_registry.metadata(model).attrs_by_kind
 
 
 def _lookup_model_manytomany_rel(ref_key: Column) -> Dict[str, Table]:
@@ -108,7 +77,7 @@ def _lookup_model_manytomany_rel(ref_key: Column) -> Dict[str, Table]:
     :return: Dict
     """
     return {
-        "target": get_model_from_rel(ref_key.target.name),
+        "target": get_model_from_table(ref_key.target),
         "secondary": ref_key.secondary,  # Association table are not derived from Base. So use them as they are
     }
 
@@ -120,31 +89,34 @@ def _lookup_model_foreign_key(column: Column) -> Table | Type[DeclarativeMeta] |
 
     if getattr(column, "foreign_keys", None):
         field = list(column.foreign_keys).pop()
-        field_name = field.column.table.name
+        table = field.column.table
     else:
         try:
-            field_name = column.prop.target.name
+            table = column.prop.target
         except AttributeError:
             logging.debug(f"Column {column} has no remote field")
             return None
 
-    return get_model_from_rel(field_name)
+    return get_model_from_table(table)
 
 
-def get_primary_key(model_class: Type[DeclarativeMeta]) -> Dict:
-    try:
-        mapper_attrs = dict(inspect(model_class).attrs)
-        for column_attr_name, column_object in mapper_attrs.items():
-            # Discard relationship field
-            if not hasattr(column_object, "target"):
-                mapper_attrs.update({column_attr_name: column_object.columns[0]})
+def get_primary_key(model_class: Type[DeclarativeMeta]) -> Mapping:
+    """
+    Primary key columns of a model by attribute name
+    :param model_class:
+    :return: read-only mapping, computed once per model
+    """
+    return model_registry.metadata(model_class).primary_keys
 
-        return {attr_name: column for attr_name, column in mapper_attrs.items() if getattr(column, "primary_key", False)}
-    except (AttributeError, IndexError) as e:
-        logging.error(f"{model_class} has no primary key")
-        logging.exception(e)
+
+def is_integer_column(column: Column) -> bool:
+    try:
+        return issubclass(column.type.python_type, int)
+    except NotImplementedError:
+        return False
 
 
+@lru_cache(maxsize=None)
 def get_operator(operator):
     """
     Given a filtering_path, return the intended operator
@@ -15,8 +15,7 @@ test_settings = DBSettings(
 with open("." + test_settings.sqlite_db_path, "w") as f:
     pass
 
-# noinspection PyProtectedMember
-base_model.metadata.create_all(base_model.db_context._engine)
+base_model.metadata.create_all(base_model.db_context.engine)
 
 
 @pytest.fixture(scope="class")
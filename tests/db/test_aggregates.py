@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+from sqlalchemy_wrapper.db.aggregates import Count
+from sqlalchemy_wrapper.db.aggregates import Max
+from sqlalchemy_wrapper.db.aggregates import Min
+from sqlalchemy_wrapper.db.aggregates import Sum
+from tests.models import Email
+from tests.models import HouseAssociation
+from tests.models import User
+
+
+@pytest.fixture
+def first_name(test_context, request):
+    """
+    Three users named after the test: last_name is their number of addresses, file paths /agg/0 ... /agg/2
+    """
+    name = request.node.name
+    for index in range(3):
+        user = User.create(
+            first_name=name, last_name=str(index), file={"path": f"/agg/{index}"}
+        )
+        Email.create_multiple(
+            [
+                {"address": f"{name}-{index}-{number}@agg", "user_id": user.id}
+                for number in range(index)
+            ]
+        )
+
+    return name
+
+
+@pytest.fixture
+def statements(test_context):
+    executed = []
+
+    def count(*args):
+        executed.append(args[2])
+
+    event.listen(test_context.engine, "before_cursor_execute", count)
+    yield executed
+
+    event.remove(test_context.engine, "before_cursor_execute", count)
+
+
+class TestAggregates:
+    def test_count(self, first_name, statements):
+        assert User.count(first_name=first_name) == 3
+        assert (
+            User.count(first_name=first_name, addresses__address__contains="@agg") == 2
+        )
+        assert User.count(first_name="no one") == 0
+        assert (
+            User.queryset(first_name=first_name).order_by("last_name")[1:].count() == 2
+        )
+        assert len(statements) == 4
+        assert all("count(" in statement for statement in statements)
+
+    def test_exists(self, first_name, statements):
+        assert User.exists(first_name=first_name, file__path="/agg/1")
+        assert not User.exists(first_name=first_name, file__path="/agg/3")
+        assert not User.queryset(first_name=first_name)[3:].exists()
+        assert "LIMIT" in statements[0] and statements[0].startswith("SELECT 1")
+
+    def test_aggregate(self, first_name):
+        assert User.aggregate(
+            first_name=first_name,
+            users=Count("id", distinct=True),
+            addresses=Count("addresses"),
+            first=Min("file__path"),
+            last=Max("file__path"),
+        ) == {"users": 3, "addresses": 3, "first": "/agg/0", "last": "/agg/2"}
+
+        with pytest.raises(TypeError):
+            User.queryset(first_name=first_name)[:1].aggregate(users=Count())
+
+    def test_aggregate_to_many_with_to_one(self, first_name, statements):
+        ids = [user.id for user in User.filter(first_name=first_name)]
+        assert User.aggregate(
+            first_name=first_name,
+            ids=Sum("id"),
+            users=Count(),
+            addresses=Count("addresses"),
+            paths=Count("file__path"),
+        ) == {"ids": sum(ids), "users": 3, "addresses": 3, "paths": 3}
+        assert len(statements) == 2
+
+    def test_annotate(self, first_name):
+        users = User.annotate(
+            first_name=first_name, addresses_count=Count("addresses")
+        ).order_by("-addresses_count")
+        assert [(user.last_name, user.addresses_count) for user in users] == [
+            ("2", 2),
+            ("1", 1),
+            ("0", 0),
+        ]
+
+        with pytest.raises(ValueError):
+            User.annotate(first_name=Count("addresses"))
+
+    def test_annotate_two_to_many_paths(self, first_name):
+        for user in User.filter(first_name=first_name):
+            HouseAssociation.create_multiple(
+                [{"user_id": user.id, "extra": "annotate"} for _ in range(2)]
+            )
+
+        users = User.annotate(
+            first_name=first_name,
+            n_addresses=Count("addresses"),
+            n_houses=Count("houses"),
+            ids=Sum("id"),
+        ).order_by("last_name")
+        assert [(u.n_addresses, u.n_houses, u.ids) for u in users] == [
+            (index, 2, user.id) for index, user in enumerate(users)
+        ]
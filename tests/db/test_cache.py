@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from sqlalchemy import event
+
+from sqlalchemy_wrapper.db.cache import MemoryCacheBackend
+from sqlalchemy_wrapper.db.cache import result_cache
+from sqlalchemy_wrapper.db.cache import ResultCache
+from tests.models import Email
+from tests.models import House
+from tests.models import User
+
+
+class TestMemoryCacheBackend:
+    def test_lru(self):
+        backend = MemoryCacheBackend(maxsize=2, ttl=None)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        assert backend.get("a") == 1
+        backend.set("c", 3)
+
+        assert backend.get("b") is None
+        assert backend.get("a") == 1 and backend.get("c") == 3
+        assert backend.stats()["evictions"] == 1
+
+    def test_ttl(self):
+        backend = MemoryCacheBackend(ttl=0.01)
+        backend.set("a", 1)
+        time.sleep(0.02)
+        assert backend.get("a") is None
+
+
+@pytest.fixture
+def cached_models(test_context, monkeypatch):
+    monkeypatch.setattr(House, "__cache_results__", True)
+    monkeypatch.setattr(User, "__cache_results__", True)
+    result_cache.clear()
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    event.listen(test_context.engine, "before_cursor_execute", count)
+    yield statements
+
+    event.remove(test_context.engine, "before_cursor_execute", count)
+    result_cache.clear()
+
+
+class TestResultCache:
+    def test_filter_hit(self, cached_models):
+        House.create(label="cached house", address="cache street")
+        first = House.filter(address="cache street")
+        cached_models.clear()
+
+        assert House.filter(address="cache street") == first
+        assert not cached_models
+        assert result_cache.stats()["hits"] == 1
+        assert result_cache.stats()["misses"] == 1
+
+    def test_invalidated_by_create_and_bulk_write(self, cached_models):
+        House.create(label="invalidated 1", address="invalidated street")
+        assert len(House.filter(address="invalidated street")) == 1
+
+        House.create(label="invalidated 2", address="invalidated street")
+        assert len(House.filter(address="invalidated street")) == 2
+
+        House.update_where({"address": "moved"}, label="invalidated 1")
+        assert len(House.filter(address="invalidated street")) == 1
+        assert result_cache.stats()["hits"] == 0
+
+    def test_invalidated_by_joined_table(self, cached_models):
+        user = User.create(first_name="cached join")
+        assert User.filter(addresses__address="join@cache") == []
+
+        Email.create_multiple([{"address": "join@cache", "user_id": user.id}])
+        assert User.filter(addresses__address="join@cache") == [user]
+
+    def test_not_cached_with_pending_changes(self, cached_models, test_context):
+        House.filter(address="pending street")
+        test_context.session.add(House(label="pending", address="pending street"))
+
+        assert len(House.filter(address="pending street")) == 1
+        test_context.session.commit()
+
+    def test_not_cached_with_flushed_changes(self, cached_models, test_context):
+        session = test_context.session
+        session.add(House(label="flushed", address="flushed street"))
+        session.flush()
+
+        assert len(House.filter(address="flushed street")) == 1
+        assert result_cache.stats()["size"] == 0
+
+        session.rollback()
+        assert House.filter(address="flushed street") == []
+
+    def test_versions_shared_through_backend(self):
+        backend = MemoryCacheBackend()
+        first, second = ResultCache(backend), ResultCache(backend)
+        key = second.make_key(House, ("filter",), ["house"])
+
+        first.invalidate(["house"])
+        assert second.make_key(House, ("filter",), ["house"]) != key
+        assert backend.get_versions(["house", "user_account"]) == {
+            "house": 1,
+            "user_account": 0,
+        }
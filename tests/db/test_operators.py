@@ -2,6 +2,10 @@ from __future__ import annotations
 
 from unittest import TestCase
 
+from sqlalchemy_wrapper.db.operators import And
+from sqlalchemy_wrapper.db.operators import Not
+from sqlalchemy_wrapper.db.operators import Or
+
 
 class Test(TestCase):
     def test_base_filter(self):
@@ -15,3 +19,15 @@ class Test(TestCase):
 
     def test_or(self):
         pass
+
+    def test_not(self):
+        clause = ~And(first_name="a", last_name="b")
+        assert isinstance(clause, Not)
+        assert isinstance(clause.wrapped_expression[0], And)
+
+    def test_copy(self):
+        clause = And(Or(first_name="a"), last_name="b")
+        copy = clause.copy()
+        assert copy is not clause and copy.simple_expression == {"last_name": "b"}
+        assert copy.wrapped_expression[0].simple_expression == {"first_name": "a"}
+        assert isinstance(copy.wrapped_expression[0], Or)
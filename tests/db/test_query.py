@@ -10,6 +10,13 @@ from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy_wrapper.db.operators import And
 from sqlalchemy_wrapper.db.operators import Or
 from sqlalchemy_wrapper.db.query import BaseQueryBuilder
+from sqlalchemy_wrapper.db.query import FilterPlanCache
+from sqlalchemy_wrapper.db.settings import ToManyStrategyEnum
+from tests.models import Email
+from tests.models import File
+from tests.models import House
+from tests.models import HouseAssociation
+from tests.models import Item
 from tests.models import User
 
 
@@ -101,3 +108,158 @@ class TestBaseQueryBuilder:
 
     def test_dive(self):
         pass
+
+
+@pytest.mark.usefixtures("test_context")
+class TestFilterPlanCache:
+    def test_plan_reused_for_same_shape(self, test_context):
+        cache = FilterPlanCache()
+        queries = [
+            BaseQueryBuilder(
+                User,
+                And(Or(last_name=name), addresses__address__contains="@"),
+                test_context.session,
+                plan_cache=cache,
+            ).make_filter()
+            for name in ("first", "second")
+        ]
+
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 1
+        assert str(queries[0]) == str(queries[1])
+        assert queries[1].statement.compile().params["last_name_1"] == "second"
+
+    def test_plan_skip_dive_on_hit(self, test_context):
+        cache = FilterPlanCache()
+        BaseQueryBuilder(
+            User, And(addresses__address="a"), test_context.session, plan_cache=cache
+        ).make_filter()
+
+        with patch("sqlalchemy_wrapper.db.query.BaseQueryBuilder.dive") as dive:
+            BaseQueryBuilder(
+                User,
+                And(addresses__address="b"),
+                test_context.session,
+                plan_cache=cache,
+            ).make_filter()
+            dive.assert_not_called()
+
+    def test_plan_hit_then_joined_path(self, test_context):
+        """
+        A cached plan restores the joins it made, so ordering or selecting on them doesn't join again
+        """
+        file = File.create(
+            path="/plan/joined", item=Item.create(content="plan").item_id
+        )
+        user = User.create(first_name="plan", last_name="joined", file=file.id)
+
+        for _ in range(2):
+            queryset = User.queryset(file__item__content="plan").order_by("file__path")
+            assert list(queryset) == [user]
+            assert User.values("file__path", file__item__content="plan") == [
+                {"file__path": "/plan/joined"}
+            ]
+
+        builder = BaseQueryBuilder(
+            User, And(file__item__content="plan"), test_context.session
+        )
+        builder.make_filter()
+        builder.resolve_column("file__path")
+        assert "file_1" not in str(builder.base_query)
+
+    def test_plan_cache_eviction_and_clear(self, test_context):
+        cache = FilterPlanCache(maxsize=1)
+        for clause in (And(last_name="a"), And(first_name="a")):
+            BaseQueryBuilder(
+                User, clause, test_context.session, plan_cache=cache
+            ).make_filter()
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["size"] == 1
+
+        cache.clear()
+        assert cache.stats() == {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "size": 0,
+            "maxsize": 1,
+        }
+
+
+@pytest.mark.usefixtures("test_context")
+class TestToManyStrategy:
+    @pytest.fixture
+    def users(self, request):
+        """
+        Users named after the test: one with three addresses @<test name>, and one without address
+        """
+        name = request.node.name
+        many = User.create(first_name=name, last_name="many")
+        Email.create_multiple(
+            [{"address": f"{i}@{name}", "user_id": many.id} for i in range(3)]
+        )
+        none = User.create(first_name=name, last_name="none")
+        return many, none
+
+    def test_exists_by_default(self, test_context, users):
+        query = BaseQueryBuilder(
+            User,
+            And(addresses__address__contains=f"@{users[0].first_name}"),
+            test_context.session,
+        ).make_filter()
+        statement = str(query)
+
+        assert "JOIN" not in statement and "EXISTS" in statement
+        assert query.with_entities(User.id).all() == [(users[0].id,)]
+
+    def test_exists_inside_or(self, test_context, users):
+        query = BaseQueryBuilder(
+            User,
+            And(
+                Or(
+                    addresses__address__contains=f"@{users[0].first_name}",
+                    last_name="none",
+                ),
+                first_name=users[0].first_name,
+            ),
+            test_context.session,
+        ).make_filter()
+
+        assert sorted(user.last_name for user in query) == ["many", "none"]
+
+    def test_to_one_prefix_is_joined(self, test_context):
+        query = BaseQueryBuilder(
+            User, And(file__user__first_name="prefix"), test_context.session
+        ).make_filter()
+        statement = str(query)
+
+        assert statement.count("JOIN file") == 1 and "EXISTS" in statement
+
+    def test_many_to_many_and_nested(self, test_context):
+        user = User.create(first_name="nested exists")
+        House.create(label="nested exists", address="nested street")
+        test_context.session.add(
+            HouseAssociation(user_id=user.id, house_id="nested exists")
+        )
+        test_context.session.commit()
+
+        assert User.filter(houses__house__address="nested street") == [user]
+        assert User.filter(houses__house__users__user__first_name="nested exists") == [
+            user
+        ]
+
+    def test_join_strategy(self, test_context, users):
+        query = BaseQueryBuilder(
+            User,
+            And(addresses__address__contains=f"@{users[0].first_name}"),
+            test_context.session,
+            to_many_strategy=ToManyStrategyEnum.JOIN,
+        ).make_filter()
+
+        assert "JOIN" in str(query) and "EXISTS" not in str(query)
+        assert len(query.with_entities(User.id).all()) == 3
+        assert User.filter(
+            addresses__address__contains=f"@{users[0].first_name}",
+            to_many_strategy="join",
+        ) == [users[0]]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+from sqlalchemy_wrapper.db.operators import Or
+from tests.models import User
+
+
+@pytest.fixture
+def first_name(test_context, request):
+    """
+    Four users named after the test: last_name is their index, file paths /qs/c, /qs/a, /qs/b, /other/d
+    """
+    name = request.node.name
+    for index, path in enumerate(["/qs/c", "/qs/a", "/qs/b", "/other/d"]):
+        User.create(first_name=name, last_name=str(index), file={"path": path})
+
+    return name
+
+
+@pytest.fixture
+def statements(test_context):
+    executed = []
+
+    def count(*args):
+        executed.append(args[2])
+
+    event.listen(test_context.engine, "before_cursor_execute", count)
+    yield executed
+
+    event.remove(test_context.engine, "before_cursor_execute", count)
+
+
+class TestQuerySet:
+    def test_lazy_and_cached(self, first_name, statements):
+        queryset = User.queryset(first_name=first_name).filter(
+            file__path__startswith="/qs/"
+        )
+        assert not statements
+
+        assert len(queryset) == 3
+        assert {user.last_name for user in queryset} == {"0", "1", "2"}
+        assert queryset[0] in list(queryset)
+        assert len(statements) == 1
+
+    def test_exclude_and_order_by(self, first_name):
+        queryset = (
+            User.queryset(first_name=first_name)
+            .exclude(Or(file__path="/qs/a", file__path__startswith="/other/"))
+            .order_by("-file__path")
+        )
+        assert [user.last_name for user in queryset] == ["0", "2"]
+        assert "ORDER BY file.path DESC" in str(queryset.query.statement)
+
+    def test_order_by_nullable_relationship(self, first_name):
+        User.create(first_name=first_name, last_name="no file")
+        queryset = User.queryset(first_name=first_name).order_by("file__path")
+
+        assert len(queryset) == 5
+        assert "LEFT OUTER JOIN file" in str(queryset.query.statement)
+        # NULL first on SQLite
+        assert [user.last_name for user in queryset] == ["no file", "3", "1", "2", "0"]
+
+    def test_slicing(self, first_name):
+        queryset = User.queryset(first_name=first_name).order_by("file__path")
+        assert [user.last_name for user in queryset[1:3]] == ["1", "2"]
+        assert [user.last_name for user in queryset[1:][1:2]] == ["2"]
+        assert queryset[3].last_name == "0"
+        assert queryset.first().last_name == "3"
+        assert User.queryset(first_name=first_name).first().last_name == "0"
+        assert User.queryset(first_name="no one").first() is None
+
+        with pytest.raises(IndexError):
+            User.queryset(first_name="no one")[0]
+        with pytest.raises(ValueError):
+            queryset[-1]
+        with pytest.raises(TypeError):
+            queryset[:2].filter(last_name="0")
+
+    def test_filter_is_a_wrapper(self, first_name):
+        assert (
+            len(User.filter(first_name=first_name, file__path__startswith="/qs/")) == 3
+        )
+        assert sorted(
+            user.last_name
+            for user in User.filter(
+                Or(last_name="1", file__path="/qs/b"), first_name=first_name
+            )
+            if user.first_name == first_name
+        ) == ["1", "2"]
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import insert
+
+from sqlalchemy_wrapper.db.pool import TimedQueuePool
+from sqlalchemy_wrapper.db.routing import ReplicaRouter
+from sqlalchemy_wrapper.db.routing import RoutingSession
+from sqlalchemy_wrapper.db.settings import ReplicaStrategyEnum
+from tests.models import Item
+
+REPLICA_ITEM_IDS = [1_000_001, 1_000_002]
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    """
+    Two SQLite files standing in for replicas, each with one item the primary does not have
+    """
+    engines = []
+    for index, item_id in enumerate(REPLICA_ITEM_IDS):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / f'replica_{index}.sqlite3'}",
+            poolclass=TimedQueuePool,
+        )
+        Item.__table__.create(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(Item.__table__).values(item_id=item_id, content="replica")
+            )
+        engines.append(engine)
+
+    yield engines
+
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def routed_context(test_context, replicas):
+    session = RoutingSession(bind=test_context.engine, router=ReplicaRouter(replicas))
+    test_context.session = session
+    yield test_context
+
+    session.close()
+    test_context.session = None
+
+
+@pytest.mark.usefixtures("test_context")
+class TestRoutingSession:
+    def test_reads_round_robin(self, routed_context):
+        assert [item.item_id for item in Item.all()] == REPLICA_ITEM_IDS[:1]
+        assert [item.item_id for item in Item.filter(content="replica")] == [
+            REPLICA_ITEM_IDS[1]
+        ]
+
+    def test_force_primary(self, routed_context):
+        assert Item.get_by_pks(REPLICA_ITEM_IDS[0], force_primary=True) is None
+        with routed_context.use_primary():
+            assert Item.get_one(item_id=REPLICA_ITEM_IDS[1]) is None
+
+        assert Item.get_one(item_id=REPLICA_ITEM_IDS[0])
+
+    def test_write_transaction_stays_on_primary(self, routed_context):
+        session = routed_context.session
+        session.add(Item(content="routed write"))
+        session.flush()
+        assert Item.filter(content="routed write")
+        assert not Item.filter(content="replica")
+
+        session.commit()
+        assert Item.filter(content="replica")
+
+    def test_no_replica_reads_outside_read_methods(self, routed_context):
+        assert Item.get_by_pks(REPLICA_ITEM_IDS[0])
+        assert routed_context.session.query(Item).get(REPLICA_ITEM_IDS[1]) is None
+
+
+class TestReplicaRouter:
+    def test_least_connections(self, replicas):
+        router = ReplicaRouter(replicas, ReplicaStrategyEnum.LEAST_CONNECTIONS)
+        with replicas[0].connect():
+            assert [router.choose() for _ in range(3)] == [replicas[1]] * 3
+
+    def test_without_replicas(self):
+        with pytest.raises(ValueError):
+            ReplicaRouter([])
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pytest
+
+from sqlalchemy_wrapper.db.operators import And
+from sqlalchemy_wrapper.db.operators import Or
+from sqlalchemy_wrapper.db.settings import ToManyStrategyEnum
+from sqlalchemy_wrapper.db.template import compiled_cache_stats
+from sqlalchemy_wrapper.db.template import Param
+from tests.models import Email
+from tests.models import File
+from tests.models import User
+
+
+@pytest.fixture
+def user(test_context, request):
+    file = File.create(path=f"/var/{request.node.name}")
+    user = User.create(first_name=request.node.name, last_name="template", file=file.id)
+    Email.create_multiple(
+        [{"address": f"{i}@{request.node.name}", "user_id": user.id} for i in range(2)]
+    )
+    return user
+
+
+class TestFilterTemplate:
+    def test_run_binds_values(self, user):
+        template = User.prepare(
+            first_name__in=Param("names"), file__path__startswith=Param("path")
+        )
+        assert "JOIN file" in str(template.statement)
+
+        assert template.run(names=[user.first_name, "other"], path="/var") == [user]
+        assert template.run(names=[user.first_name], path="/tmp") == []
+        assert template.run(names=[], path="/var") == []
+
+    def test_compiled_cache_hits(self, user):
+        template = User.prepare(first_name__in=Param("names"), last_name=Param("last"))
+        compiled_cache_stats.clear()
+
+        for names in ([user.first_name], [user.first_name, "a", "b"], ["c"]):
+            template.run(names=names, last="template")
+
+        stats = compiled_cache_stats.stats()
+        assert stats["misses"] <= 1
+        assert stats["hits"] >= 2
+
+    def test_nested_clause_and_between(self, user):
+        template = User.prepare(
+            And(
+                Or(last_name__not_in=Param("excluded"), first_name=Param("name")),
+                id__between=[Param("low"), Param("high")],
+            )
+        )
+        assert template.params.keys() == {"excluded", "name", "low", "high"}
+        assert template.run(
+            excluded=["template"], name=user.first_name, low=user.id, high=user.id
+        ) == [user]
+
+    def test_to_many_path(self, user):
+        for strategy in ToManyStrategyEnum:
+            template = User.prepare(
+                addresses__address__endswith=Param("domain"), to_many_strategy=strategy
+            )
+            assert template.run(domain=f"@{user.first_name}") == [user]
+
+    def test_invalid_values(self, user):
+        template = User.prepare(first_name__in=Param("names"), last_name=Param("last"))
+        with pytest.raises(TypeError):
+            template.run(names=[user.first_name])
+        with pytest.raises(TypeError):
+            template.run(names=[user.first_name], last="template", other=1)
+        with pytest.raises(ValueError):
+            template.run(names=user.first_name, last="template")
+        with pytest.raises(ValueError):
+            User.prepare(first_name__in=Param("name"), last_name=Param("name"))
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
+
+from sqlalchemy_wrapper.db.settings import DriverEnum
+from sqlalchemy_wrapper.db.upsert import build_upsert
+from tests.models import House
+
+
+class TestBuildUpsert:
+    @pytest.mark.parametrize(
+        "driver,dialect,expected",
+        [
+            (
+                DriverEnum.POSTGRES,
+                postgresql.dialect(),
+                "ON CONFLICT (label) DO UPDATE SET address = excluded.address "
+                "RETURNING (xmax = 0) AS inserted",
+            ),
+            (
+                DriverEnum.MYSQL,
+                mysql.dialect(),
+                "ON DUPLICATE KEY UPDATE address = VALUES(address)",
+            ),
+        ],
+    )
+    def test_build_upsert(self, driver, dialect, expected):
+        stmt = build_upsert(
+            driver,
+            House.__table__,
+            [{"label": "a", "address": "b"}, {"label": "c", "address": "d"}],
+            ["label"],
+            ["address"],
+        )
+
+        sql = " ".join(str(stmt.compile(dialect=dialect)).split())
+        assert sql.endswith(expected)
+
+    def test_build_upsert_do_nothing(self):
+        stmt = build_upsert(
+            DriverEnum.MYSQL, House.__table__, [{"label": "a"}], ["label"], []
+        )
+        sql = str(stmt.compile(dialect=mysql.dialect()))
+        # INSERT IGNORE would also drop the rows failing on NOT NULL, foreign keys or truncation
+        assert not sql.startswith("INSERT IGNORE")
+        assert sql.endswith("ON DUPLICATE KEY UPDATE label = house.label")
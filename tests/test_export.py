@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+
+import pytest
+
+from sqlalchemy_wrapper import export as export_module
+from tests.models import User
+
+
+@pytest.fixture
+def first_name(test_context, request):
+    name = request.node.name
+    for index in range(3):
+        User.create(
+            first_name=name, last_name=str(index), file={"path": f"/export/{index}"}
+        )
+
+    return name
+
+
+class Output(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+
+class TestExport:
+    def test_csv_to_path(self, first_name, tmp_path):
+        path = tmp_path / "users.csv"
+        stats = User.export(
+            path, fields=["last_name", "file__path"], first_name=first_name
+        )
+
+        with open(path, newline="") as file:
+            rows = list(csv.reader(file))
+        assert rows[0] == ["last_name", "file__path"]
+        assert sorted(rows[1:]) == [[str(i), f"/export/{i}"] for i in range(3)]
+        assert stats.rows == 3
+        assert stats.bytes_written == path.stat().st_size
+        assert stats.rows_per_second > 0
+
+    def test_jsonl_in_chunks(self, first_name):
+        output = Output()
+        stats = User.export(output, format="jsonl", chunk_size=2, first_name=first_name)
+
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert sorted(line["last_name"] for line in lines) == ["0", "1", "2"]
+        assert set(lines[0]) == {"id", "first_name", "last_name", "file"}
+        assert output.writes == 2
+        assert stats.bytes_written == len(output.getvalue())
+
+    def test_path_of_missing_relationship(self, first_name):
+        User.create(first_name=first_name, last_name="no file")
+        output = io.BytesIO()
+        stats = User.export(
+            output,
+            format="jsonl",
+            fields=["last_name", "file__path"],
+            first_name=first_name,
+        )
+
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert stats.rows == 4
+        assert {"last_name": "no file", "file__path": None} in lines
+
+    def test_empty_and_text_output(self):
+        output = io.StringIO()
+        stats = User.export(output, fields=["id"], first_name="nobody exported")
+
+        assert output.getvalue() == "id\r\n"
+        assert stats.rows == 0
+
+    def test_invalid_format(self, monkeypatch):
+        with pytest.raises(ValueError):
+            User.export(io.BytesIO(), format="xml")
+
+        monkeypatch.setattr(export_module, "pyarrow", None)
+        with pytest.raises(ValueError):
+            User.export(io.BytesIO(), format="arrow")
+
+    def test_arrow(self, first_name):
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+
+        output = io.BytesIO()
+        stats = User.export(
+            output,
+            format="arrow",
+            fields=["id", "file__path"],
+            chunk_size=2,
+            first_name=first_name,
+        )
+
+        table = pyarrow.ipc.open_stream(output.getvalue()).read_all()
+        assert table.schema.types == [pyarrow.int64(), pyarrow.string()]
+        assert sorted(table.column("file__path").to_pylist()) == [
+            f"/export/{i}" for i in range(3)
+        ]
+        assert stats.rows == 3 and stats.bytes_written == len(output.getvalue())
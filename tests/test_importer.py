@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from tests.models import House
+from tests.models import User
+
+
+class TestImportFile:
+    def test_csv_with_quarantine(self, test_context, tmp_path):
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "Name,Last name,File\n"
+            "import csv,ok,\n"
+            "import csv,bad file,abc\n"
+            f"{'x' * 51},too long,\n"
+            "import csv,too many,,values\n"
+            "import csv,ok too,\n"
+        )
+        quarantine = tmp_path / "rejected.jsonl"
+
+        stats = User.import_file(
+            path,
+            mapping={"Name": "first_name", "Last name": "last_name", "File": "file"},
+            quarantine=quarantine,
+        )
+
+        assert (stats.rows_read, stats.rows_loaded, stats.rows_failed) == (5, 2, 3)
+        assert sorted(
+            user.last_name for user in User.filter(first_name="import csv")
+        ) == ["ok", "ok too"]
+
+        rejected = [json.loads(line) for line in quarantine.read_text().splitlines()]
+        assert [row["line"] for row in rejected] == [3, 4, 5]
+        assert [row["record"]["Last name"] for row in rejected] == [
+            "bad file",
+            "too long",
+            "too many",
+        ]
+        assert rejected[1]["error"] == "first_name: longer than 50 characters"
+
+    def test_jsonl_with_progress(self, test_context):
+        House.create(label="import jsonl 3")
+        lines = [
+            {"label": f"import jsonl {i}", "address": "jsonl street"} for i in range(5)
+        ]
+        data = "\n".join(json.dumps(line) for line in lines) + "\n[1]\n"
+        calls = []
+        quarantine = io.StringIO()
+
+        stats = House.import_file(
+            io.BytesIO(data.encode()),
+            format="jsonl",
+            chunk_size=2,
+            progress=calls.append,
+            quarantine=quarantine,
+        )
+
+        assert (stats.rows_loaded, stats.rows_failed) == (4, 2)
+        assert [call.rows_loaded for call in calls] == [2, 3, 4]
+        assert len(House.filter(address="jsonl street")) == 4
+        assert [
+            json.loads(line)["line"] for line in quarantine.getvalue().splitlines()
+        ] == [4, 6]
+
+    def test_unknown_column(self, test_context):
+        with pytest.raises(ValueError):
+            House.import_file(io.StringIO("label,color\nimport unknown,red\n"))
+
+        assert House.filter(label="import unknown") == []
+        with pytest.raises(ValueError):
+            House.import_file(io.StringIO(""), format="xml")
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from sqlalchemy_wrapper.db.operators import And
+from sqlalchemy_wrapper.db.query import BaseQueryBuilder
+from sqlalchemy_wrapper.logger import configure_query_logging
+from sqlalchemy_wrapper.logger import logger
+from sqlalchemy_wrapper.logger import query_log_config
+from sqlalchemy_wrapper.logger import truncate
+from sqlalchemy_wrapper.logger import truncate_payload
+from tests.models import User
+
+
+@pytest.fixture
+def restore_query_logging():
+    level = logger.level
+    yield
+    logger.setLevel(level)
+    configure_query_logging()
+
+
+@pytest.mark.usefixtures("test_context", "restore_query_logging")
+class TestQueryLogging:
+    def test_sql_not_rendered_when_level_disabled(self, test_context):
+        logger.setLevel(logging.WARNING)
+
+        with patch("sqlalchemy_wrapper.db.query.render_sql") as render_sql:
+            BaseQueryBuilder(User, And(id=1), test_context.session).make_filter()
+            render_sql.assert_not_called()
+
+    def test_sampling(self):
+        configure_query_logging(sample_rate=3)
+
+        logged = [query_log_config.should_log(logging.INFO) for _ in range(9)]
+        assert logged.count(True) == 3
+
+    def test_truncate(self):
+        assert truncate("abcdef", 3).startswith("abc...")
+        assert truncate("abc", 3) == "abc"
+
+    def test_truncate_payload(self):
+        payload = truncate_payload(range(1000), max_length=10)
+
+        assert len(payload) < 20
+        assert payload[-1].endswith("more)")
+
+    def test_create_not_rendered_when_level_disabled(self):
+        logger.setLevel(logging.ERROR)
+
+        with patch.object(User, "__repr__", side_effect=AssertionError):
+            user = User.create(first_name="silent", last_name="create")
+
+        assert user.id
+        logger.setLevel(logging.INFO)
+        payload = []
+        with patch.object(
+            logger, "info", lambda *args, **kwargs: payload.append(kwargs)
+        ):
+            User.create(first_name="x" * 5000, last_name="create")
+
+        assert len(payload[0]["extra"]["data"][0]) < 5000
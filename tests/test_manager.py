@@ -2,7 +2,15 @@ from __future__ import annotations
 
 from unittest import TestCase
 
+from sqlalchemy import event
+from sqlalchemy import inspect
+from sqlalchemy.exc import InvalidRequestError
+
+from sqlalchemy_wrapper.db.settings import ToManyStrategyEnum
+from tests.models import Email
 from tests.models import File
+from tests.models import House
+from tests.models import HouseAssociation
 from tests.models import Item
 from tests.models import User
 
@@ -25,3 +33,360 @@ class TestManager(TestCase):
         assert Item.all()
         assert user.file
         assert File.get_one(id=user.file).pks.get("id") == user.file
+
+    def test_iter_filter(self):
+        User.create_multiple(
+            [
+                {"first_name": f"stream {i}", "last_name": "iter_filter"}
+                for i in range(5)
+            ]
+        )
+        User.db_context.session.commit()
+
+        streamed = User.iter_filter(last_name="iter_filter", batch_size=2)
+        first = next(streamed)
+        rest = list(streamed)
+
+        assert len(rest) == 4
+        assert inspect(first).detached
+        assert {user.first_name for user in [first, *rest]} == {
+            f"stream {i}" for i in range(5)
+        }
+
+    def test_iter_all(self):
+        assert len(list(Item.iter_all(batch_size=1))) == len(Item.all())
+
+    def test_paginate(self):
+        User.create_multiple(
+            [{"first_name": f"page {i % 3}", "last_name": "paginate"} for i in range(7)]
+        )
+        User.db_context.session.commit()
+
+        pages, cursor = [], None
+        while True:
+            page = User.paginate(
+                order_by=["-first_name"], after=cursor, limit=3, last_name="paginate"
+            )
+            pages.append(page.items)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+
+        users = [user for items in pages for user in items]
+        assert [len(items) for items in pages] == [3, 3, 1]
+        assert len({user.id for user in users}) == 7
+        assert [(u.first_name, u.id) for u in users] == sorted(
+            [(u.first_name, u.id) for u in users], key=lambda t: (-int(t[0][-1]), t[1])
+        )
+
+    def test_paginate_on_relationship_path(self):
+        for path in ("/b", "/c", "/a"):
+            User.create(last_name="paginate_rel", file={"path": path})
+
+        first = User.paginate(
+            order_by=["file__path"], limit=2, last_name="paginate_rel"
+        )
+        second = User.paginate(
+            order_by=["file__path"],
+            after=first.next_cursor,
+            limit=2,
+            last_name="paginate_rel",
+        )
+
+        paths = [File.get_by_pks(u.file).path for u in first.items + second.items]
+        assert paths == ["/a", "/b", "/c"]
+        assert second.next_cursor is None
+
+        with self.assertRaises(ValueError):
+            User.paginate(order_by=["first_name"], after=first.next_cursor)
+
+    def test_paginate_not_null_columns_use_plain_seek(self):
+        User.create_multiple(
+            [{"first_name": "seek", "last_name": "paginate_seek"} for _ in range(3)]
+        )
+        User.db_context.session.commit()
+        statements = []
+
+        def record(*args):
+            statements.append(args[2])
+
+        event.listen(User.db_context.engine, "before_cursor_execute", record)
+        first = User.paginate(limit=2, last_name="paginate_seek")
+        second = User.paginate(
+            after=first.next_cursor, limit=2, last_name="paginate_seek"
+        )
+        event.remove(User.db_context.engine, "before_cursor_execute", record)
+
+        assert len(first.items + second.items) == 3
+        assert "user_account.id > ?" in statements[-1]
+        assert "IS NULL" not in statements[-1] and "CASE" not in statements[-1]
+
+        with self.assertRaises(ValueError):
+            User.paginate(limit=0)
+        with self.assertRaises(ValueError):
+            User.paginate(limit=-1)
+
+    def test_paginate_nullable_relationship_path(self):
+        for path in ("/b", None, "/a", None, "/c"):
+            User.create(
+                last_name="paginate_null", **({"file": {"path": path}} if path else {})
+            )
+
+        for order_by, expected in (
+            ("file__path", ["/a", "/b", "/c", None, None]),
+            ("-file__path", [None, None, "/c", "/b", "/a"]),
+        ):
+            users, cursor = [], None
+            while True:
+                page = User.paginate(
+                    order_by=[order_by],
+                    after=cursor,
+                    limit=2,
+                    last_name="paginate_null",
+                )
+                users += page.items
+                cursor = page.next_cursor
+                if not cursor:
+                    break
+
+            assert len({user.id for user in users}) == 5
+            paths = [u.file and File.get_by_pks(u.file).path for u in users]
+            assert paths == expected
+
+    def test_get_by_pks_use_identity_map(self):
+        user = User.create(first_name="identity", last_name="map")
+        session = User.db_context.session
+        session.refresh(user)
+        statements = []
+        event.listen(
+            session.get_bind(),
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+        assert User.get_by_pks(user.id) is user
+        assert User.get_by_pks(id=user.id) is user
+        assert not statements
+
+        assert User.get_by_pks(-1) is None
+        assert len(statements) == 1
+
+        with self.assertRaises(ValueError):
+            User.get_by_pks()
+
+    def test_get_one_limit(self):
+        User.create_multiple(
+            [{"first_name": "duplicate", "last_name": "get_one"} for _ in range(3)]
+        )
+        User.db_context.session.commit()
+
+        with self.assertRaises(ValueError):
+            User.get_one(last_name="get_one")
+        assert User.get_one(last_name="get_one", first_name="missing") is None
+
+    def test_create_multiple_nested_objects(self):
+        item = Item.create(content="shared item")
+        pks = User.create_multiple(
+            [
+                {
+                    "first_name": f"bulk {i}",
+                    "last_name": "create_multiple",
+                    "file": {"path": f"/bulk/{i}", "item": {"content": f"c{i}"}},
+                }
+                for i in range(3)
+            ]
+            + [
+                {
+                    "first_name": "bulk 3",
+                    "last_name": "create_multiple",
+                    "file": {"path": "/bulk/3", "item": str(item.item_id)},
+                }
+            ],
+            chunk_size=2,
+            return_pks=True,
+        )
+
+        users = [User.get_by_pks(pk) for pk in pks]
+        assert [user.first_name for user in users] == [f"bulk {i}" for i in range(4)]
+        files = [File.get_by_pks(user.file) for user in users]
+        assert [file.path for file in files] == [f"/bulk/{i}" for i in range(4)]
+        assert Item.get_by_pks(files[0].item).content == "c0"
+        assert files[3].item == item.item_id
+
+    def test_create_multiple_missing_reference(self):
+        with self.assertRaises(ValueError):
+            User.create_multiple([{"first_name": "orphan", "file": -1}])
+
+        with self.assertRaises(TypeError):
+            User.create_multiple([{"first_name": "bulk", "unknown": 1}])
+
+    def test_create_multiple_with_relationships(self):
+        pks = User.create_multiple(
+            [
+                {"first_name": "bulk orm 0", "last_name": "create_multiple_orm"},
+                {
+                    "first_name": "bulk orm 1",
+                    "last_name": "create_multiple_orm",
+                    "file": {"path": "/bulk/orm"},
+                    "addresses": [Email(address="orm@bulk")],
+                },
+                {"first_name": "bulk orm 2", "last_name": "create_multiple_orm"},
+            ],
+            return_pks=True,
+        )
+
+        users = [User.get_by_pks(pk) for pk in pks]
+        assert [user.first_name for user in users] == [
+            f"bulk orm {i}" for i in range(3)
+        ]
+        assert [email.address for email in users[1].addresses] == ["orm@bulk"]
+        assert File.get_by_pks(users[1].file).path == "/bulk/orm"
+
+    def test_upsert_many(self):
+        first = House.upsert_many(
+            [{"label": f"upsert {i}", "address": "old"} for i in range(3)],
+            conflict_on=["label"],
+        )
+        second = House.upsert_many(
+            [{"label": f"upsert {i}", "address": "new"} for i in range(1, 4)],
+            conflict_on=["label"],
+            update_fields=["address"],
+            chunk_size=2,
+        )
+
+        assert first == (3, 0)
+        assert second == (1, 2)
+        assert {
+            h.label: h.address for h in House.filter(label__startswith="upsert ")
+        } == {
+            "upsert 0": "old",
+            "upsert 1": "new",
+            "upsert 2": "new",
+            "upsert 3": "new",
+        }
+
+    def test_upsert_many_ignore_existing(self):
+        House.upsert_many([{"label": "upsert ignore", "address": "old"}], ["label"])
+        result = House.upsert_many(
+            [{"label": "upsert ignore", "address": "new"}], ["label"], update_fields=[]
+        )
+
+        assert result == (0, 0)
+        assert House.get_by_pks("upsert ignore").address == "old"
+
+    def test_upsert_many_missing_conflict_field(self):
+        with self.assertRaisesRegex(ValueError, "label"):
+            House.upsert_many(
+                [{"label": "upsert missing", "address": "a"}, {"address": "b"}],
+                conflict_on=["label"],
+            )
+
+    def test_update_where(self):
+        for path in ("/update/a", "/update/b", "/other"):
+            User.create(first_name="update_where", file={"path": path})
+
+        updated = User.update_where(
+            {"last_name": "updated"},
+            first_name="update_where",
+            file__path__startswith="/update/",
+        )
+
+        assert updated == 2
+        assert sorted(
+            user.last_name or "" for user in User.filter(first_name="update_where")
+        ) == ["", "updated", "updated"]
+
+    def test_delete_where(self):
+        user = User.create(first_name="delete_where")
+        Email.create_multiple(
+            [{"address": f"{i}@delete.where", "user_id": user.id} for i in range(3)]
+        )
+
+        assert Email.delete_where(user__first_name="delete_where") == 3
+        assert Email.delete_where(address__endswith="@delete.where") == 0
+
+    def test_filter_prefetch(self):
+        user = User.create(first_name="prefetch")
+        Email.create_multiple(
+            [{"address": f"{i}@pre.fetch", "user_id": user.id} for i in range(2)]
+        )
+        session = User.db_context.session
+        session.add(HouseAssociation(user_id=user.id, house=House(label="prefetch")))
+        session.commit()
+        statements = []
+        event.listen(
+            session.get_bind(),
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+        (user,) = User.filter(
+            first_name="prefetch", prefetch=["addresses", "houses__house"]
+        )
+        assert len(statements) == 4
+        assert len(user.addresses) == 2
+        assert [association.house.label for association in user.houses] == ["prefetch"]
+        assert len(statements) == 4
+
+        session.expire_all()
+        user = User.get_one(first_name="prefetch", join_load=["addresses"])
+        assert len(user.addresses) == 2
+        assert len(statements) == 5
+
+    def test_filter_join_load_reuse_filter_join(self):
+        user = User.create(first_name="contains eager")
+        Email.create_multiple(
+            [{"address": f"{i}@contains.eager", "user_id": user.id} for i in range(2)]
+        )
+        User.db_context.session.expire_all()
+
+        query = User._query_builder(
+            None,
+            to_many_strategy=ToManyStrategyEnum.JOIN,
+            addresses__address="0@contains.eager",
+        ).eager_load(join_load=["addresses"])
+        assert str(query.statement).count("JOIN") == 1
+
+        (user,) = query.all()
+        assert [email.address for email in user.addresses] == ["0@contains.eager"]
+
+        with self.assertRaises(InvalidRequestError):
+            User.filter(first_name="contains eager", prefetch=["file"])
+
+    def test_values(self):
+        for path in ("/values/a", "/values/b"):
+            User.create(first_name="values", last_name=path, file={"path": path})
+
+        assert User.values(
+            "last_name", "file__path", first_name="values", file__path__endswith="a"
+        ) == [{"last_name": "/values/a", "file__path": "/values/a"}]
+        assert sorted(
+            User.values_list("file__path", flat=True, first_name="values")
+        ) == ["/values/a", "/values/b"]
+        assert set(
+            User.values_list("first_name", "last_name", first_name="values")
+        ) == {
+            ("values", "/values/a"),
+            ("values", "/values/b"),
+        }
+        assert set(User.values(first_name="values")[0]) == {
+            "id",
+            "first_name",
+            "last_name",
+            "file",
+        }
+
+        User.create(first_name="values", last_name="no file")
+        assert sorted(
+            User.values_list("last_name", "file__path", first_name="values"),
+            key=lambda row: row[0],
+        ) == [
+            ("/values/a", "/values/a"),
+            ("/values/b", "/values/b"),
+            ("no file", None),
+        ]
+
+        with self.assertRaises(TypeError):
+            User.values_list("id", "first_name", flat=True)
+        with self.assertRaises(InvalidRequestError):
+            User.values("addresses", first_name="values")
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from sqlalchemy import Column
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy.orm import composite
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import synonym
+
+from sqlalchemy_wrapper.registry import model_registry
+from sqlalchemy_wrapper.registry import ModelRegistry
+
+
+class TestModelRegistry:
+    def test_register_whole_hierarchy(self):
+        base = declarative_base()
+
+        class TimestampMixin:
+            created = Column(String)
+
+        class AbstractBase(TimestampMixin, base):
+            __abstract__ = True
+            id = Column(Integer, primary_key=True)
+
+        class Vehicle(AbstractBase):
+            __tablename__ = "registry_vehicle"
+            kind = Column(String)
+            __mapper_args__ = {"polymorphic_on": kind, "polymorphic_identity": "v"}
+
+        class Car(Vehicle):
+            __mapper_args__ = {"polymorphic_identity": "car"}
+
+        class Truck(Vehicle):
+            __tablename__ = "registry_truck"
+            id = Column(Integer, ForeignKey(Vehicle.id), primary_key=True)
+            __mapper_args__ = {"polymorphic_identity": "truck"}
+
+        assert model_registry.get_by_tablename("registry_vehicle") is Vehicle
+        assert model_registry.get_by_table(Vehicle.__table__) is Vehicle
+        assert model_registry.get_by_tablename("registry_truck") is Truck
+        assert model_registry.get_by_table(Truck.__table__) is Truck
+        assert AbstractBase not in model_registry._by_table.values()
+
+    def test_unknown_table(self):
+        registry = ModelRegistry()
+        assert registry.get_by_tablename("nothing") is None
+        assert registry.get_by_table(None) is None
+
+    def test_metadata_with_synonym_and_composite(self):
+        base = declarative_base()
+
+        class Point:
+            def __init__(self, x, y):
+                self.x, self.y = x, y
+
+            def __composite_values__(self):
+                return self.x, self.y
+
+        class Shape(base):
+            __tablename__ = "registry_shape"
+            id = Column(Integer, primary_key=True)
+            label = Column(String)
+            name = synonym("label")
+            x = Column(Integer)
+            y = Column(Integer)
+            point = composite(Point, x, y)
+
+        configure_mappers()
+        metadata = model_registry.metadata(Shape)
+
+        assert metadata.primary_key_names == ("id",)
+        assert dict(metadata.primary_keys) == {"id": Shape.__table__.c.id}
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import datetime
+import decimal
+import io
+import json
+import socket
+
+import pytest
+
+from sqlalchemy_wrapper import serializer as serializer_module
+from sqlalchemy_wrapper.serializer import json_dumps
+from sqlalchemy_wrapper.serializer import serializer_for
+from tests.models import Email
+from tests.models import User
+
+
+@pytest.fixture
+def user(test_context, request):
+    user = User.create(first_name=request.node.name, last_name="serialized")
+    Email.create_multiple(
+        [{"address": f"{i}@{request.node.name}", "user_id": user.id} for i in range(2)]
+    )
+    test_context.session.expire_all()
+    return user
+
+
+class TestSerializer:
+    def test_as_json(self, user):
+        assert user.as_json(False) == {
+            "id": user.id,
+            "first_name": user.first_name,
+            "last_name": "serialized",
+            "file": None,
+        }
+        assert User.serializer() is serializer_for(User)
+
+    def test_include_rel_depth_and_cycles(self, user):
+        data = user.as_json(include_rel=True)
+        assert sorted(email["address"] for email in data["addresses"]) == [
+            f"0@{user.first_name}",
+            f"1@{user.first_name}",
+        ]
+        assert "user" not in data["addresses"][0]
+        assert data["houses"] == []
+
+        data = User.serializer().dump(user, include_rel=3)
+        assert data["addresses"][0]["user"] == {"id": user.id}
+
+    def test_dump_many_and_rows(self, user):
+        users = User.filter(first_name=user.first_name)
+        assert User.serializer().dump_many(users) == [user.as_json()]
+
+        rows = User.values_list("id", "last_name", first_name=user.first_name)
+        assert User.serializer().dump_rows(rows, ["id", "last_name"]) == [
+            {"id": user.id, "last_name": "serialized"}
+        ]
+
+    def test_write_jsonl(self, user):
+        output = io.BytesIO()
+        count = User.serializer().write_jsonl(
+            User.iter_filter(first_name=user.first_name), output, include_rel=1
+        )
+        (line,) = output.getvalue().decode().splitlines()
+        assert count == 1
+        assert len(json.loads(line)["addresses"]) == 2
+
+        text = io.StringIO()
+        User.serializer().write_jsonl([user, user], text, batch_size=1)
+        assert text.getvalue().count("\n") == 2
+
+        sender, receiver = socket.socketpair()
+        with sender, receiver:
+            User.serializer().write_jsonl([user], sender)
+            assert json.loads(receiver.recv(4096))["id"] == user.id
+
+    def test_json_backends(self, monkeypatch):
+        value = {"at": datetime.date(2022, 1, 2), "price": decimal.Decimal("1.50")}
+        assert json_dumps("json")(value) == b'{"at":"2022-01-02","price":"1.50"}'
+
+        monkeypatch.setattr(serializer_module, "orjson", None)
+        with pytest.raises(ValueError):
+            json_dumps("orjson")
+        assert json_dumps("auto")(value) == json_dumps("json")(value)
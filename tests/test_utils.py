@@ -5,14 +5,42 @@ from sqlalchemy.orm import Query
 from sqlalchemy.sql.elements import BinaryExpression
 
 from sqlalchemy_wrapper.db.query import BaseQueryBuilder
-from tests.models import User
+from sqlalchemy_wrapper.utils import get_model_attrs
+from sqlalchemy_wrapper.utils import get_model_from_rel
+from sqlalchemy_wrapper.utils import get_model_from_table
 from sqlalchemy_wrapper.utils import get_operator
+from sqlalchemy_wrapper.utils import get_primary_key
+from tests.models import Email
+from tests.models import User
 
 
 # noinspection PyTypeChecker
 class TestUtils:
     def test_get_model_from_rel(self):
-        pass
+        assert get_model_from_rel("user_account.id") is User
+        assert get_model_from_rel("email_address") is Email
+        assert get_model_from_rel("unknown_table") is None
+
+    def test_get_model_from_table(self):
+        assert get_model_from_table(User.__table__) is User
+
+    def test_get_model_attrs(self):
+        simple_attrs, fk_attrs, many_to_many_rels = get_model_attrs(User).values()
+
+        assert {attr.key for attr in simple_attrs} == {
+            "id",
+            "first_name",
+            "last_name",
+            "file",
+        }
+        assert {attr.key for attr in fk_attrs} == {"addresses", "houses"}
+        assert not many_to_many_rels
+        assert get_model_attrs(User) is get_model_attrs(User)
+
+    def test_get_primary_key(self):
+        assert dict(get_primary_key(User)) == {"id": User.__table__.c.id}
+        assert list(get_primary_key(Email)) == ["card_number"]
+        assert User.get_simple_column() == ("id", "first_name", "last_name", "file")
 
     @pytest.mark.parametrize(
         "operator,expected",